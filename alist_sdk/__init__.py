@@ -1,28 +1,62 @@
-from .client import Client
-from .async_client import AsyncClient
-from .models import *
+from typing import TYPE_CHECKING
+
 from .err import *
 from .version import __version__
-from .path_lib import (
-    AlistPath,
-    PureAlistPath,
-    AlistServer,
-    login_server,
-    AlistPathType,
-    AbsAlistPathType,
-)
-
-
-__all__ = [
-    "Client",
-    "AsyncClient",
-    "AlistPath",
-    "PureAlistPath",
-    "AlistServer",
-    "login_server",
-    "AlistPathType",
-    "AbsAlistPathType",
-    "__version__",
-    *models.__all__,
-    *err.__all__,
-]
+
+if TYPE_CHECKING:
+    from .models import *
+    from .client import Client
+    from .async_client import AsyncClient
+    from .path_lib import (
+        AlistPath,
+        PureAlistPath,
+        AlistServer,
+        login_server,
+        AlistPathType,
+        AbsAlistPathType,
+    )
+
+# 模型依赖pydantic，客户端和AlistPath依赖httpx，第一次使用时才导入，
+# 以加快CLI等只需要部分功能时的启动速度（转发到守护进程时完全不需要导入它们）
+_LAZY_IMPORTS = {
+    "Client": ".client",
+    "AsyncClient": ".async_client",
+    "AlistPath": ".path_lib",
+    "PureAlistPath": ".path_lib",
+    "AlistServer": ".path_lib",
+    "login_server": ".path_lib",
+    "AlistPathType": ".path_lib",
+    "AbsAlistPathType": ".path_lib",
+}
+
+
+def _all():
+    from . import models
+
+    return [
+        *_LAZY_IMPORTS,
+        "__version__",
+        *models.__all__,
+        *err.__all__,
+    ]
+
+
+def __getattr__(name):
+    import importlib
+
+    if name == "__all__":
+        value = _all()
+    elif name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    elif name in importlib.import_module(".models", __name__).__all__:
+        value = getattr(globals()["models"], name)
+    elif name in globals():  # 例如 alist_sdk.models 子模块本身
+        return globals()[name]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_all()})
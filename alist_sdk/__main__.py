@@ -6,6 +6,6 @@
 @Date-Time  : 2024/8/23 23:42
 """
 
-from alist_sdk.cmd.app import app
+from alist_sdk.cmd.session import main
 
-app()
+main()
@@ -4,12 +4,18 @@ import time
 import urllib.parse
 from functools import cached_property
 from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Iterable
 
-from httpx import AsyncClient as HttpClient, Response
+from httpx import AsyncClient as HttpClient, Response, TimeoutException, HTTPError, URL
 
 from alist_sdk.models import *
+from alist_sdk.err import AlistError
 from alist_sdk.verify import async_verify as verify
-from alist_sdk.client import Client as SyncClient
+from alist_sdk.metrics import MetricsHook, endpoint_of
+from alist_sdk.tracing import Tracer, trace_span
+from alist_sdk.replay import RecordingTransport
+from alist_sdk.profiling import enable as enable_profiling, get_profiler
+from alist_sdk.client import Client as SyncClient, _page_query, _task_some_errors
 from alist_sdk.version import __version__
 
 logger = logging.getLogger("alist-sdk.async-client")
@@ -26,11 +32,31 @@ class AsyncClientBase(HttpClient):
         password=None,
         has_opt=False,
         max_connect=30,
+        trusted_server=False,
+        metrics: MetricsHook = None,
+        tracer: Tracer = None,
+        record: str | Path = None,
+        profile: bool | str | Path = False,
         **kwargs,
     ):
+        """
+        :param trusted_server: 受信任的服务端，响应按照接口确定的类型快速解码，
+            不再逐个尝试Resp.data的全部类型。调试时可以设置为False以完整校验。
+        :param metrics: 指标回调，见 alist_sdk.metrics
+        :param tracer: 请求追踪，见 alist_sdk.tracing
+        :param record: 把请求和响应录制到该文件，用于离线回放，见 alist_sdk.replay
+        :param profile: 启用全局性能分析，为路径时退出时写入该文件，见 alist_sdk.profiling
+        """
         kwargs.setdefault("timeout", 30)
         super().__init__(**kwargs)
         self.base_url = base_url
+        self.trusted_server = trusted_server
+        self.metrics = metrics
+        self.tracer = tracer
+        if record:
+            self._transport = RecordingTransport(self._transport, record)
+        if profile:
+            enable_profiling(None if profile is True else profile)
         self.headers.setdefault("User-Agent", f"Alist-SDK/{__version__}")
         self.request_semaphore = asyncio.Semaphore(max_connect)
         if token or username:
@@ -80,8 +106,35 @@ class AsyncClientBase(HttpClient):
         return self.base_url.scheme, self.base_url.host, self.base_url.port
 
     async def request(self, method: str, url, **kwargs) -> "Response":
-        async with self.request_semaphore:
-            return await super().request(method, url, **kwargs)
+        profiler = get_profiler()
+        if self.metrics is None and self.tracer is None and profiler is None:
+            async with self.request_semaphore:
+                return await super().request(method, url, **kwargs)
+
+        with trace_span(
+            self.tracer, f"HTTP {method} {endpoint_of(URL(url).path)}"
+        ) as span:
+            start = time.perf_counter()
+            async with self.request_semaphore:
+                begin = time.perf_counter()
+                if self.metrics is not None:
+                    self.metrics.on_semaphore_wait(begin - start)
+                if profiler is not None:
+                    profiler.add("semaphore", begin - start)
+                try:
+                    res = await super().request(method, url, **kwargs)
+                except HTTPError as e:
+                    if self.metrics is not None:
+                        self.metrics.observe_response(method, url, begin, error=e)
+                    raise
+                finally:
+                    if profiler is not None:
+                        profiler.add("network", time.perf_counter() - begin)
+            if self.metrics is not None:
+                self.metrics.observe_response(method, url, begin, res)
+            if span is not None:
+                span.set(status=res.status_code, wait=round(begin - start, 6))
+            return res
 
     @verify()
     async def verify_request(
@@ -436,14 +489,181 @@ class _AsyncAdminTask(AsyncClientBase):
             f"/api/admin/task/{task_type}/retry", params={"tid": task_id}
         )
 
+    async def _list_tasks(
+        self, func, task_types: list[TaskTypeModify]
+    ) -> dict[str, Task]:
+        tasks = {}
+        for _res in await asyncio.gather(*[func(_t) for _t in task_types]):
+            if _res.code != 200:
+                raise AlistError(_res.message)
+            tasks.update({t.id: t for t in _res.data or []})
+        return tasks
+
+    async def wait_for_tasks(
+        self,
+        tasks: Iterable[str | Task],
+        task_type: TaskTypeModify | list[TaskTypeModify] = None,
+        timeout: float = None,
+        poll_interval: float = 1,
+        max_interval: float = 30,
+        max_missing: int = 3,
+    ) -> AsyncIterator[Task]:
+        """等待任务完成，每个任务完成后立即产出其最终状态
+
+        与Client.wait_for_tasks相同，不同任务类型的undone/done并发请求。
+        """
+        pending = {t.id if isinstance(t, Task) else t for t in tasks}
+        if task_type is None:
+            task_types = list(TaskType)
+        elif isinstance(task_type, str):
+            task_types = [task_type]
+        else:
+            task_types = list(task_type)
+        for _t in task_types:
+            self.task_type_verify(_t)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = poll_interval
+        last_seen = {}
+        missing = {}  # 任务ID -> 连续不存在的轮数
+        while pending:
+            undone = await self._list_tasks(self.task_undone, task_types)
+            changed = False
+            done = {}
+            if pending - undone.keys():
+                done = await self._list_tasks(self.task_done, task_types)
+                for task_id in pending - undone.keys():
+                    if task_id in done:
+                        pending.discard(task_id)
+                        changed = True
+                        yield done[task_id]
+
+            absent = pending - undone.keys() - done.keys()
+            missing = {i: missing.get(i, 0) + 1 for i in absent}
+            if lost := sorted(i for i, n in missing.items() if n >= max_missing):
+                raise AlistError(f"任务不存在（任务类型错误或已被删除、清除）: {lost}")
+
+            seen = {
+                i: (undone[i].state, undone[i].progress)
+                for i in pending & undone.keys()
+            }
+            if seen != last_seen:
+                changed = True
+            last_seen = seen
+
+            if not pending:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"等待任务超时: {sorted(pending)}")
+            interval = poll_interval if changed else min(interval * 1.5, max_interval)
+            if deadline is not None:
+                interval = min(interval, max(deadline - time.monotonic(), 0))
+            await asyncio.sleep(interval)
+
+    async def task_bulk(
+        self,
+        action: TaskBulkActionModify,
+        task_type: TaskTypeModify,
+        task_ids: Iterable[str] = None,
+        state: TaskStateModify | Iterable[TaskStateModify] = None,
+        error: str = None,
+        name: str = None,
+        max_workers: int = 10,
+        chunk_size: int = 100,
+    ) -> BulkTaskResult:
+        """批量 取消/重试/删除 任务，各组批量请求并发执行，参数见Client.task_bulk"""
+        self.task_type_verify(task_type)
+        if action not in ("cancel", "retry", "delete"):
+            raise ValueError(f"不支持的操作: {action}")
+        if task_ids is None and state is None and error is None and name is None:
+            raise ValueError("至少需要一个task_ids或筛选条件")
+
+        if state is None and error is None and name is None:
+            selected = list(dict.fromkeys(task_ids))
+        else:
+            sources = {
+                "cancel": [self.task_undone],
+                "retry": [self.task_done],
+                "delete": [self.task_undone, self.task_done],
+            }[action]
+            tasks = {}
+            for source in sources:
+                tasks.update(await self._list_tasks(source, [task_type]))
+            selected = [
+                t.id
+                for t in SyncClient.filter_tasks(
+                    tasks.values(), task_ids, state, error, name
+                )
+            ]
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _run_one(task_id):
+            async with semaphore:
+                return await self._task_one(action, task_type, task_id)
+
+        async def _run_chunk(chunk):
+            async with semaphore:
+                res = await self.post(
+                    f"/api/admin/task/{task_type}/{action}_some", json=chunk
+                )
+            errors = _task_some_errors(res, chunk)
+            if errors is not None:
+                return errors
+            errors = {}
+            for task_id, _res in zip(
+                chunk, await asyncio.gather(*[_run_one(i) for i in chunk])
+            ):
+                if _res.code != 200:
+                    errors[task_id] = _res.message
+            return errors
+
+        chunks = [
+            selected[i : i + chunk_size] for i in range(0, len(selected), chunk_size)
+        ]
+        failed = {}
+        for errors in await asyncio.gather(*[_run_chunk(c) for c in chunks]):
+            failed.update(errors)
+        result = BulkTaskResult(action=action, task_type=task_type)
+        result.succeeded = [i for i in selected if i not in failed]
+        result.failed = {i: failed[i] for i in selected if i in failed}
+        return result
+
+    @verify()
+    async def _task_one(self, action: str, task_type: TaskTypeModify, task_id: str):
+        """task_cancel/task_retry/task_delete，不再重复校验任务类型"""
+        return locals(), await self.post(
+            f"/api/admin/task/{task_type}/{action}", params={"tid": task_id}
+        )
+
+    async def task_cancel_many(
+        self, task_type: TaskTypeModify, task_ids=None, **filters
+    ):
+        """批量取消任务，参数见Client.task_bulk"""
+        return await self.task_bulk("cancel", task_type, task_ids, **filters)
+
+    async def task_retry_many(
+        self, task_type: TaskTypeModify, task_ids=None, **filters
+    ):
+        """批量重试任务，参数见Client.task_bulk"""
+        return await self.task_bulk("retry", task_type, task_ids, **filters)
+
+    async def task_delete_many(
+        self, task_type: TaskTypeModify, task_ids=None, **filters
+    ):
+        """批量删除任务，参数见Client.task_bulk"""
+        return await self.task_bulk("delete", task_type, task_ids, **filters)
+
     # ================= admin/storages 相关 ==========================
 
 
 class _AsyncAdminStorage(AsyncClientBase):
     @verify()
-    async def admin_storage_list(self):
-        """列出存储器列表"""
-        return locals(), await self.get("/api/admin/storage/list")
+    async def admin_storage_list(self, page: int = None, per_page: int = None):
+        """列出存储器列表，不指定page时返回全部"""
+        return locals(), await self.get(
+            "/api/admin/storage/list", params=_page_query(page, per_page)
+        )
 
     @verify()
     async def admin_storage_create(self, storage: dict | Storage):
@@ -455,13 +675,69 @@ class _AsyncAdminStorage(AsyncClientBase):
             json=storage.model_dump(exclude={"id", "modified"}),
         )
 
+    async def _probe_storage(self, storage: Storage, timeout: float) -> StorageProbe:
+        probe = StorageProbe(
+            mount_path=str(storage.mount_path),
+            driver=storage.driver,
+            status=storage.status,
+            ok=False,
+        )
+        start = time.perf_counter()
+        try:
+            _res = await self.verify_request(
+                "POST",
+                "/api/fs/list",
+                # 跳过服务端的列表缓存，否则测量的不是存储后端的耗时
+                json={
+                    "path": probe.mount_path,
+                    "page": 1,
+                    "per_page": 1,
+                    "refresh": True,
+                },
+                timeout=timeout,
+            )
+        except TimeoutException:
+            probe.error = "timeout"
+            return probe
+        except HTTPError as _e:
+            # 其他网络错误同样记录耗时，latency为None只表示超时
+            probe.latency = time.perf_counter() - start
+            probe.error = f"{type(_e).__name__}: {_e}"
+            return probe
+        probe.latency = time.perf_counter() - start
+        probe.ok = _res.code == 200
+        if not probe.ok:
+            probe.error = f"[{_res.code}] {_res.message}"
+        return probe
+
+    async def probe_storages(
+        self, timeout: float = 10, max_workers: int = 10
+    ) -> list[StorageProbe]:
+        """并发探测存储器，参数和返回值见Client.probe_storages"""
+        _res = await self.admin_storage_list()
+        if _res.code != 200:
+            raise AlistError(_res.message)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _probe(storage: Storage):
+            async with semaphore:
+                return await self._probe_storage(storage, timeout)
+
+        probes = await asyncio.gather(
+            *(_probe(s) for s in _res.data.content or [] if not s.disabled)
+        )
+        return SyncClient.sort_probes(probes)
+
     # ============== admin/user 相关==================
 
 
 class _AsyncAdminUser(AsyncClientBase):
     @verify()
-    async def admin_user_list(self):
-        return locals(), await self.get("/api/admin/user/list")
+    async def admin_user_list(self, page: int = None, per_page: int = None):
+        """列出用户，不指定page时返回全部"""
+        return locals(), await self.get(
+            "/api/admin/user/list", params=_page_query(page, per_page)
+        )
 
     @verify()
     async def admin_user_add(self):
@@ -473,8 +749,11 @@ class _AsyncAdminUser(AsyncClientBase):
 
 class _AsyncAdminMeta(AsyncClientBase):
     @verify()
-    async def admin_meta_list(self):
-        return locals(), await self.get("/api/admin/meta/list")
+    async def admin_meta_list(self, page: int = None, per_page: int = None):
+        """列出元信息，不指定page时返回全部"""
+        return locals(), await self.get(
+            "/api/admin/meta/list", params=_page_query(page, per_page)
+        )
 
     # ================== admin/setting 相关 =============
 
@@ -525,12 +804,17 @@ class AsyncClient(
         if path in self._cached_path_list:
             self._succeed_cache += 1
             logger.debug("缓存命中[times: %d]: %s", self._succeed_cache, path)
+            if self.metrics is not None:
+                self.metrics.on_cache("dict_files_items", True)
             return self._cached_path_list[path]
 
         if len(self._cached_path_list) >= 10000:
-            self._cached_path_list.pop(0)  # Python 3中的字典是按照插入顺序保存的
+            # Python 3中的字典是按照插入顺序保存的，淘汰最早缓存的目录
+            self._cached_path_list.pop(next(iter(self._cached_path_list)))
 
         logger.debug("缓存未命中: %s", path)
+        if self.metrics is not None:
+            self.metrics.on_cache("dict_files_items", False)
         _res = await self.list_files(path, password, refresh=True)
         if _res.code == 200:
             _ = {d.name: d for d in _res.data.content or []}
@@ -2,16 +2,23 @@
 """客户端
 
 """
+import fnmatch
 import logging
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path, PurePosixPath
 from functools import cached_property
 from threading import Semaphore
+from typing import Iterator, Callable, Iterable
 
-from httpx import Client as HttpClient, Response
+from httpx import Client as HttpClient, Response, TimeoutException, HTTPError, URL
 from alist_sdk.models import *
 from alist_sdk.verify import verify
+from alist_sdk.metrics import MetricsHook, endpoint_of
+from alist_sdk.tracing import Tracer, trace_span
+from alist_sdk.replay import RecordingTransport
+from alist_sdk.profiling import enable as enable_profiling, get_profiler
 from alist_sdk.err import *
 from alist_sdk.version import __version__
 
@@ -20,6 +27,26 @@ logger = logging.getLogger("alist-sdk.client")
 __all__ = ["Client"]
 
 
+def _task_some_errors(res: Response, task_ids: list[str]) -> dict[str, str] | None:
+    """解析 /api/admin/task/{type}/{action}_some 的响应，data为失败的 {任务ID: 错误信息}"""
+    if res.status_code == 404:
+        return None
+    try:
+        body = res.json()
+    except ValueError:
+        return {i: f"[{res.status_code}] {res.text}" for i in task_ids}
+    if body.get("code") != 200:
+        return {i: body.get("message", "") for i in task_ids}
+    return {str(k): str(v) for k, v in (body.get("data") or {}).items()}
+
+
+def _page_query(page: int = None, per_page: int = None) -> dict:
+    """admin列表接口（PageReq）的分页参数，不指定page时服务端返回全部"""
+    if not page:
+        return {}
+    return {"page": page, "per_page": per_page} if per_page else {"page": page}
+
+
 class _ClientBase(HttpClient):
     def __init__(
         self,
@@ -29,11 +56,31 @@ class _ClientBase(HttpClient):
         password=None,
         has_opt=False,
         max_connect=30,
+        trusted_server=False,
+        metrics: MetricsHook = None,
+        tracer: Tracer = None,
+        record: str | Path = None,
+        profile: bool | str | Path = False,
         **kwargs,
     ):
+        """
+        :param trusted_server: 受信任的服务端，响应按照接口确定的类型快速解码，
+            不再逐个尝试Resp.data的全部类型。调试时可以设置为False以完整校验。
+        :param metrics: 指标回调，见 alist_sdk.metrics
+        :param tracer: 请求追踪，见 alist_sdk.tracing
+        :param record: 把请求和响应录制到该文件，用于离线回放，见 alist_sdk.replay
+        :param profile: 启用全局性能分析，为路径时退出时写入该文件，见 alist_sdk.profiling
+        """
         kwargs.setdefault("timeout", 30)
         super().__init__(**kwargs)
         self.base_url = base_url
+        self.trusted_server = trusted_server
+        self.metrics = metrics
+        self.tracer = tracer
+        if record:
+            self._transport = RecordingTransport(self._transport, record)
+        if profile:
+            enable_profiling(None if profile is True else profile)
         self.headers.setdefault("User-Agent", f"Alist-SDK/{__version__}")
         self.request_semaphore = Semaphore(max_connect)
         if token:
@@ -87,8 +134,35 @@ class _ClientBase(HttpClient):
         return self.base_url.scheme, self.base_url.host, self.base_url.port
 
     def request(self, method: str, url, **kwargs) -> "Response":
-        with self.request_semaphore:
-            return super().request(method, url, **kwargs)
+        profiler = get_profiler()
+        if self.metrics is None and self.tracer is None and profiler is None:
+            with self.request_semaphore:
+                return super().request(method, url, **kwargs)
+
+        with trace_span(
+            self.tracer, f"HTTP {method} {endpoint_of(URL(url).path)}"
+        ) as span:
+            start = time.perf_counter()
+            with self.request_semaphore:
+                begin = time.perf_counter()
+                if self.metrics is not None:
+                    self.metrics.on_semaphore_wait(begin - start)
+                if profiler is not None:
+                    profiler.add("semaphore", begin - start)
+                try:
+                    res = super().request(method, url, **kwargs)
+                except HTTPError as e:
+                    if self.metrics is not None:
+                        self.metrics.observe_response(method, url, begin, error=e)
+                    raise
+                finally:
+                    if profiler is not None:
+                        profiler.add("network", time.perf_counter() - begin)
+            if self.metrics is not None:
+                self.metrics.observe_response(method, url, begin, res)
+            if span is not None:
+                span.set(status=res.status_code, wait=round(begin - start, 6))
+            return res
 
     @verify()
     def verify_request(
@@ -436,14 +510,234 @@ class _SyncAdminTask(_ClientBase):
             f"/api/admin/task/{task_type}/retry", params={"tid": task_id}
         )
 
+    def _list_tasks(self, func, task_types: list[TaskTypeModify]) -> dict[str, Task]:
+        tasks = {}
+        for task_type in task_types:
+            _res = func(task_type)
+            if _res.code != 200:
+                raise AlistError(_res.message)
+            tasks.update({t.id: t for t in _res.data or []})
+        return tasks
+
+    def wait_for_tasks(
+        self,
+        tasks: Iterable[str | Task],
+        task_type: TaskTypeModify | list[TaskTypeModify] = None,
+        timeout: float = None,
+        poll_interval: float = 1,
+        max_interval: float = 30,
+        max_missing: int = 3,
+    ) -> Iterator[Task]:
+        """等待任务完成，每个任务完成后立即产出其最终状态
+
+        每一轮对每种任务类型只请求一次undone，全部等待中的任务共用；
+        只有任务从undone中消失时才请求done。
+        没有任务完成或进度变化时，轮询间隔按1.5倍增长，直到max_interval。
+
+        :param tasks: 任务ID或Task
+        :param task_type: 任务类型，默认全部类型
+        :param timeout: 超时时间（秒），超时后抛出TimeoutError，None 不限制
+        :param poll_interval: 初始轮询间隔（秒）
+        :param max_interval: 最大轮询间隔（秒）
+        :param max_missing: 任务连续max_missing轮既不在undone也不在done中时抛出AlistError，
+            例如任务类型错误、任务已被删除或clear_done清除
+        """
+        pending = {t.id if isinstance(t, Task) else t for t in tasks}
+        if task_type is None:
+            task_types = list(TaskType)
+        elif isinstance(task_type, str):
+            task_types = [task_type]
+        else:
+            task_types = list(task_type)
+        for _t in task_types:
+            self.task_type_verify(_t)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = poll_interval
+        last_seen = {}
+        missing = {}  # 任务ID -> 连续不存在的轮数
+        while pending:
+            undone = self._list_tasks(self.task_undone, task_types)
+            changed = False
+            done = {}
+            if pending - undone.keys():
+                done = self._list_tasks(self.task_done, task_types)
+                for task_id in pending - undone.keys():
+                    if task_id in done:
+                        pending.discard(task_id)
+                        changed = True
+                        yield done[task_id]
+
+            absent = pending - undone.keys() - done.keys()
+            missing = {i: missing.get(i, 0) + 1 for i in absent}
+            if lost := sorted(i for i, n in missing.items() if n >= max_missing):
+                raise AlistError(f"任务不存在（任务类型错误或已被删除、清除）: {lost}")
+
+            seen = {
+                i: (undone[i].state, undone[i].progress)
+                for i in pending & undone.keys()
+            }
+            if seen != last_seen:
+                changed = True
+            last_seen = seen
+
+            if not pending:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"等待任务超时: {sorted(pending)}")
+            interval = poll_interval if changed else min(interval * 1.5, max_interval)
+            if deadline is not None:
+                interval = min(interval, max(deadline - time.monotonic(), 0))
+            time.sleep(interval)
+
+    @staticmethod
+    def filter_tasks(
+        tasks: Iterable[Task],
+        task_ids: Iterable[str] = None,
+        state: TaskStateModify | Iterable[TaskStateModify] = None,
+        error: str = None,
+        name: str = None,
+    ) -> list[Task]:
+        """按照条件筛选任务，全部条件同时满足
+
+        :param task_ids: 任务ID
+        :param state: 任务状态
+        :param error: 错误信息包含的子串
+        :param name: 任务名称的通配符，例如 "copy [/local]*"
+        """
+        task_ids = None if task_ids is None else set(task_ids)
+        if isinstance(state, int):
+            state = {state}
+        elif state is not None:
+            state = set(state)
+        return [
+            t
+            for t in tasks
+            if (task_ids is None or t.id in task_ids)
+            and (state is None or t.state in state)
+            and (error is None or error in t.error)
+            and (name is None or fnmatch.fnmatchcase(t.name, name))
+        ]
+
+    def task_bulk(
+        self,
+        action: TaskBulkActionModify,
+        task_type: TaskTypeModify,
+        task_ids: Iterable[str] = None,
+        state: TaskStateModify | Iterable[TaskStateModify] = None,
+        error: str = None,
+        name: str = None,
+        max_workers: int = 10,
+        chunk_size: int = 100,
+    ) -> BulkTaskResult:
+        """批量 取消/重试/删除 任务
+
+        只给出task_ids时直接操作这些任务；给出任何筛选条件时，先列出任务再筛选:
+        cancel 从undone中筛选，retry 从done中筛选，delete 从两者中筛选。
+        选中的任务按chunk_size分组，每组调用一次 {action}_some 批量接口，各组并发执行；
+        服务端不支持批量接口（旧版本Alist返回404）时逐个调用 {action}。
+
+        :param action: cancel, retry, delete
+        :param task_type: 任务类型
+        :param task_ids: 任务ID
+        :param state: 任务状态
+        :param error: 错误信息包含的子串
+        :param name: 任务名称的通配符
+        :param max_workers: 并发数（仍受max_connect限制）
+        :param chunk_size: 每次批量请求的任务数
+        """
+        self.task_type_verify(task_type)
+        if action not in ("cancel", "retry", "delete"):
+            raise ValueError(f"不支持的操作: {action}")
+        if task_ids is None and state is None and error is None and name is None:
+            raise ValueError("至少需要一个task_ids或筛选条件")
+
+        if state is None and error is None and name is None:
+            selected = list(dict.fromkeys(task_ids))
+        else:
+            sources = {
+                "cancel": [self.task_undone],
+                "retry": [self.task_done],
+                "delete": [self.task_undone, self.task_done],
+            }[action]
+            tasks = {}
+            for source in sources:
+                tasks.update(self._list_tasks(source, [task_type]))
+            selected = [
+                t.id
+                for t in self.filter_tasks(tasks.values(), task_ids, state, error, name)
+            ]
+
+        result = BulkTaskResult(action=action, task_type=task_type)
+        if not selected:
+            return result
+        chunks = [
+            selected[i : i + chunk_size] for i in range(0, len(selected), chunk_size)
+        ]
+        with ThreadPoolExecutor(
+            min(max_workers, len(selected)), thread_name_prefix="alist-task"
+        ) as pool:
+            failed = {}
+            for chunk, errors in zip(
+                chunks,
+                pool.map(lambda c: self._task_some(action, task_type, c), chunks),
+            ):
+                if errors is not None:
+                    failed.update(errors)
+                    continue
+                for task_id, _res in zip(
+                    chunk,
+                    pool.map(lambda i: self._task_one(action, task_type, i), chunk),
+                ):
+                    if _res.code != 200:
+                        failed[task_id] = _res.message
+        result.succeeded = [i for i in selected if i not in failed]
+        result.failed = {i: failed[i] for i in selected if i in failed}
+        logger.info(
+            "批量%s任务[%s]: 成功%d个, 失败%d个",
+            action,
+            task_type,
+            len(result.succeeded),
+            len(result.failed),
+        )
+        return result
+
+    def _task_some(
+        self, action: str, task_type: TaskTypeModify, task_ids: list[str]
+    ) -> dict[str, str] | None:
+        """调用 {action}_some 批量接口，返回失败的 {任务ID: 错误信息}，不支持批量接口时返回None"""
+        res = self.post(f"/api/admin/task/{task_type}/{action}_some", json=task_ids)
+        return _task_some_errors(res, task_ids)
+
+    @verify()
+    def _task_one(self, action: str, task_type: TaskTypeModify, task_id: str):
+        """task_cancel/task_retry/task_delete，不再重复校验任务类型"""
+        return locals(), self.post(
+            f"/api/admin/task/{task_type}/{action}", params={"tid": task_id}
+        )
+
+    def task_cancel_many(self, task_type: TaskTypeModify, task_ids=None, **filters):
+        """批量取消任务，参数见task_bulk"""
+        return self.task_bulk("cancel", task_type, task_ids, **filters)
+
+    def task_retry_many(self, task_type: TaskTypeModify, task_ids=None, **filters):
+        """批量重试任务，参数见task_bulk"""
+        return self.task_bulk("retry", task_type, task_ids, **filters)
+
+    def task_delete_many(self, task_type: TaskTypeModify, task_ids=None, **filters):
+        """批量删除任务，参数见task_bulk"""
+        return self.task_bulk("delete", task_type, task_ids, **filters)
+
     # ================= admin/storages 相关 ==========================
 
 
 class _SyncAdminStorages(_ClientBase):
     @verify()
-    def admin_storage_list(self):
-        """列出存储器列表"""
-        return locals(), self.get("/api/admin/storage/list")
+    def admin_storage_list(self, page: int = None, per_page: int = None):
+        """列出存储器列表，不指定page时返回全部"""
+        return locals(), self.get(
+            "/api/admin/storage/list", params=_page_query(page, per_page)
+        )
 
     @verify()
     def admin_storage_create(self, storage: dict | Storage):
@@ -473,13 +767,81 @@ class _SyncAdminStorages(_ClientBase):
             params={"id": storage_id},
         )
 
+    # ================ 存储器探测 =================
+
+    def _probe_storage(self, storage: Storage, timeout: float) -> StorageProbe:
+        probe = StorageProbe(
+            mount_path=str(storage.mount_path),
+            driver=storage.driver,
+            status=storage.status,
+            ok=False,
+        )
+        start = time.perf_counter()
+        try:
+            _res = self.verify_request(
+                "POST",
+                "/api/fs/list",
+                # 跳过服务端的列表缓存，否则测量的不是存储后端的耗时
+                json={
+                    "path": probe.mount_path,
+                    "page": 1,
+                    "per_page": 1,
+                    "refresh": True,
+                },
+                timeout=timeout,
+            )
+        except TimeoutException:
+            probe.error = "timeout"
+            return probe
+        except HTTPError as _e:
+            # 其他网络错误同样记录耗时，latency为None只表示超时
+            probe.latency = time.perf_counter() - start
+            probe.error = f"{type(_e).__name__}: {_e}"
+            return probe
+        probe.latency = time.perf_counter() - start
+        probe.ok = _res.code == 200
+        if not probe.ok:
+            probe.error = f"[{_res.code}] {_res.message}"
+        return probe
+
+    def probe_storages(
+        self, timeout: float = 10, max_workers: int = 10
+    ) -> list[StorageProbe]:
+        """并发列出每个已启用存储器的挂载根目录，测量耗时和错误
+
+        :param timeout: 每个存储器的超时时间（秒）
+        :param max_workers: 并发数
+        :return: 按照 失败、超时在前，其余耗时从高到低 排序
+        """
+        _res = self.admin_storage_list()
+        if _res.code != 200:
+            raise AlistError(_res.message)
+        storages = [s for s in _res.data.content or [] if not s.disabled]
+        if not storages:
+            return []
+        with ThreadPoolExecutor(
+            min(max_workers, len(storages)), thread_name_prefix="alist-probe"
+        ) as pool:
+            probes = list(pool.map(lambda s: self._probe_storage(s, timeout), storages))
+        return self.sort_probes(probes)
+
+    @staticmethod
+    def sort_probes(probes: Iterable[StorageProbe]) -> list[StorageProbe]:
+        """超时（没有耗时）在前，其次是其他失败，最后是成功；后两组内按照耗时从高到低"""
+        return sorted(
+            probes, key=lambda p: (p.ok, p.latency is not None, -(p.latency or 0))
+        )
+
     # ============== admin/user 相关==================
 
 
 class _SyncAdminUser(_ClientBase):
     @verify()
-    def admin_user_list(self):
-        return locals(), self.get("/api/admin/user/list")
+    def admin_user_list(self, page: int = None, per_page: int = None):
+        """列出用户，不指定page时返回全部"""
+        return locals(), self.get(
+            "/api/admin/user/list", params=_page_query(page, per_page)
+        )
 
     @verify()
     def admin_user_add(self):
@@ -491,8 +853,11 @@ class _SyncAdminUser(_ClientBase):
 
 class _SyncAdminMeta(_ClientBase):
     @verify()
-    def admin_meta_list(self):
-        return locals(), self.get("/api/admin/meta/list")
+    def admin_meta_list(self, page: int = None, per_page: int = None):
+        """列出元信息，不指定page时返回全部"""
+        return locals(), self.get(
+            "/api/admin/meta/list", params=_page_query(page, per_page)
+        )
 
     # ================== admin/setting 相关 =============
 
@@ -544,12 +909,17 @@ class Client(
             if not self._cached_path_list[path] or cache_empty:
                 self._succeed_cache += 1
                 logger.debug("缓存命中[times: %d]: %s", self._succeed_cache, path)
+                if self.metrics is not None:
+                    self.metrics.on_cache("dict_files_items", True)
                 return self._cached_path_list[path]
 
         if len(self._cached_path_list) >= 1000:
-            self._cached_path_list.pop(0)  # Python 3中的字典是按照插入顺序保存的
+            # Python 3中的字典是按照插入顺序保存的，淘汰最早缓存的目录
+            self._cached_path_list.pop(next(iter(self._cached_path_list)))
 
         logger.debug("缓存未命中: %s", path)
+        if self.metrics is not None:
+            self.metrics.on_cache("dict_files_items", False)
         _res = self.list_files(path, password, refresh=True)
         if _res.code == 200:
             _ = {d.name: d for d in _res.data.content or []}
@@ -557,3 +927,150 @@ class Client(
                 self._cached_path_list[path] = _
             return _
         return {}
+
+    def iter_files(
+        self,
+        path: str | PurePosixPath,
+        password="",
+        per_page: int = 1000,
+        refresh=False,
+    ) -> Iterator[Item]:
+        """分页迭代目录内容，不经过缓存，每页返回后立即产出
+
+        列出期间目录发生变化导致翻页重复时，按名称去重。
+
+        :param per_page: 每页数量，0 表示一次请求全部
+        :param refresh: 是否强制刷新，只对第一页生效
+        """
+        seen = set()
+        page = 1
+        while True:
+            _res = self.list_files(
+                path, password, page, per_page, refresh and page == 1
+            )
+            if _res.code != 200:
+                raise AlistError(_res.message)
+
+            content = _res.data.content or []
+            for item in content:
+                if item.name in seen:
+                    continue
+                seen.add(item.name)
+                yield item
+
+            if per_page <= 0 or not content or page * per_page >= _res.data.total:
+                return
+            page += 1
+
+    def walk_items(
+        self,
+        path: str | PurePosixPath,
+        password="",
+        refresh=False,
+        max_depth: int = -1,
+        max_workers: int = 10,
+        descend: Callable[[Item], bool] = None,
+        on_error: Callable[[PurePosixPath, Resp], None] = None,
+    ) -> Iterator[tuple[PurePosixPath, list[Item]]]:
+        """并发遍历目录树，每个目录列出完成后立即产出 (目录, [Item, ...])
+
+        产出顺序为完成顺序，不保证深度优先或广度优先。
+        与os.walk相同，列出失败的目录不会产出。
+
+        :param path: 起始目录
+        :param password: 目录密码
+        :param refresh: 是否强制刷新服务端缓存
+        :param max_depth: 最大深度，起始目录深度为0，-1 不限制
+        :param max_workers: 并发列出目录的线程数（仍受max_connect限制）
+        :param descend: 子目录过滤，返回False时不进入该子目录
+        :param on_error: 列出失败时的回调 (目录, Resp)，默认记录警告
+        """
+
+        def _list(_path: PurePosixPath) -> list[Item] | None:
+            _res = self.list_files(_path, password, refresh=refresh)
+            if _res.code != 200:
+                if on_error is None:
+                    logger.warning(
+                        "列出目录失败[%d]: %s %s", _res.code, _path, _res.message
+                    )
+                else:
+                    on_error(_path, _res)
+                return None
+            _items = _res.data.content or []
+            for _item in _items:
+                _item.parent = _path.as_posix()
+            return _items
+
+        pool = ThreadPoolExecutor(max_workers, thread_name_prefix="alist-walk")
+        path = PurePosixPath(path)
+        pending = {pool.submit(_list, path): (path, 0)}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    _path, depth = pending.pop(fut)
+                    items = fut.result()
+                    if items is None:
+                        continue
+                    if max_depth < 0 or depth < max_depth:
+                        for item in items:
+                            if item.is_dir and (descend is None or descend(item)):
+                                _sub = _path.joinpath(item.name)
+                                pending[pool.submit(_list, _sub)] = (_sub, depth + 1)
+                    yield _path, items
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def iter_search(
+        self,
+        path: str | PurePosixPath,
+        keyword: str,
+        scope: SearchScopeModify = 0,
+        per_page: int = 100,
+        password: str = "",
+        fallback: bool = True,
+    ) -> Iterator[SearchItem | Item]:
+        """分页迭代搜索结果，按照完整路径去重
+
+        服务端未开启搜索索引时，回退到并发遍历目录并按名称匹配（忽略大小写）。
+
+        :param scope: 搜索类型	0-全部 1-文件夹 2-文件
+        :param fallback: 搜索不可用时是否回退到遍历
+        """
+        seen = set()
+        page = 1
+        while True:
+            _res = self.search(path, keyword, scope, page, per_page, password)
+            if _res.code != 200:
+                if fallback and "search not available" in _res.message:
+                    logger.info("服务端搜索不可用，回退到遍历: %s", path)
+                    yield from self._crawl_search(path, keyword, scope, password)
+                    return
+                raise AlistError(_res.message)
+
+            content = _res.data.content or []
+            for item in content:
+                if item.full_name in seen:
+                    continue
+                seen.add(item.full_name)
+                yield item
+
+            if not content or page * per_page >= _res.data.total:
+                return
+            page += 1
+
+    def _crawl_search(
+        self,
+        path: str | PurePosixPath,
+        keyword: str,
+        scope: SearchScopeModify = 0,
+        password: str = "",
+    ) -> Iterator[Item]:
+        """遍历目录，产出名称包含keyword的对象"""
+        keyword = keyword.lower()
+        for _, items in self.walk_items(path, password):
+            for item in items:
+                if scope == 1 and not item.is_dir or scope == 2 and item.is_dir:
+                    continue
+                if keyword in item.name.lower():
+                    yield item
@@ -37,3 +37,21 @@ def storage_delete(
     client = cnf.get_client()
     res = client.admin_storage_delete(storage_id)
     typer.echo(res)
+
+
+@storage.command("probe")
+def storage_probe(
+    name: str = typer.Option("default", "--name", "-n", help="登录名称"),
+    timeout: float = typer.Option(10, help="每个存储器的超时时间（秒）"),
+    jobs: int = typer.Option(10, "--jobs", "-j", help="并发数"),
+):
+    """
+    探测全部已启用的存储器，按照 失败、超时、耗时从高到低 排序输出
+    """
+    client = cnf.get_client(name)
+    for p in client.probe_storages(timeout=timeout, max_workers=jobs):
+        latency = "timeout" if p.latency is None else f"{p.latency * 1000:.0f}ms"
+        typer.echo(
+            f"{'OK' if p.ok else 'FAIL':<5}{latency:>10}  {p.driver:<16}{p.mount_path}"
+            + (f"  {p.error}" if p.error else "")
+        )
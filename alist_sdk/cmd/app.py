@@ -7,17 +7,18 @@
 """
 import typer
 
-from alist_sdk.cmd.base import cnf
+from alist_sdk.cmd.base import cnf, beautify_size, INDEX_FILE_PATH
 from alist_sdk.cmd.fs import fs
 from alist_sdk.cmd.admin import admin
 from alist_sdk.cmd.auth import auth
-
+from alist_sdk.cmd.daemon import daemon
 
 app = typer.Typer()
 
 app.add_typer(auth, name="auth")
 app.add_typer(fs, name="fs")
 app.add_typer(admin, name="admin")
+app.add_typer(daemon, name="daemon")
 
 
 @app.command("version")
@@ -49,3 +50,46 @@ def server_version(server: str = None):
     for s in server:
         client = cnf.get_client(s)
         typer.echo(f"{s}: {client.service_version}")
+
+
+@app.command("find")
+def find(
+    keyword: str = typer.Argument(..., help="路径关键字，--glob时为GLOB表达式"),
+    name: str = typer.Option(None, "--name", "-n", help="只查找该登录名称的服务器"),
+    update: str = typer.Option(
+        None, "--update", "-u", help="查找前更新该目录的索引，例如 /media"
+    ),
+    full: bool = typer.Option(False, help="更新时重新列出全部目录"),
+    scope: int = typer.Option(0, help="0-全部 1-文件夹 2-文件"),
+    glob: bool = typer.Option(False, "--glob", "-g", help="使用GLOB语法匹配完整路径"),
+    limit: int = typer.Option(None, help="最大数量"),
+):
+    """
+    在本地路径索引中查找文件。
+    """
+    from alist_sdk.tools.indexer import PathIndex
+
+    if update:
+        name = name or "default"
+    if name and name not in cnf.auth_data:
+        typer.echo("尚未登录到该服务器，请先登录 [cmd: alist-cli auth login].")
+        exit(1)
+
+    INDEX_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with PathIndex(INDEX_FILE_PATH) as index:
+        if update:
+            res = index.update(cnf.get_client(name), update, full=full)
+            typer.echo(
+                f"索引已更新 {res.server}{res.root}: 列出{res.listed}个目录, "
+                f"跳过{res.skipped}个, 失败{res.failed}个, {res.seconds:.2f}s",
+                err=True,
+            )
+
+        server = cnf.auth_data[name].host if name else None
+        query = index.glob if glob else index.find
+        for r in query(keyword, server=server, scope=scope, limit=limit):
+            typer.echo(
+                f"{'dir' if r.is_dir else 'file':<8}"
+                f"{beautify_size(r.size):<10}"
+                f"{r.modified.strftime('%Y-%m-%d %H:%M:%S'):<20} {r.uri}"
+            )
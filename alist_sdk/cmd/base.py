@@ -13,10 +13,13 @@ from pathlib import Path
 import typer
 from pydantic import BaseModel
 
-from alist_sdk import Client, login_server, AlistPath
+# Client 和 AlistPath 依赖httpx，在需要时才导入，保证 --help / version 等命令快速启动
 
 CMD_BASE_PATH = ""
 CONFIG_FILE_PATH = Path.home().joinpath(".config", "alist_cli.json")
+INDEX_FILE_PATH = Path.home().joinpath(".config", "alist_cli_index.db")
+# Token验证成功后，该时间（秒）内不再请求 /api/me 重新验证
+SESSION_TTL = 600
 
 
 def beautify_size(byte_size: float):
@@ -32,6 +35,15 @@ def beautify_size(byte_size: float):
     return f"{byte_size:.2f}GB"
 
 
+def parse_size(size: str) -> int:
+    """解析 10M, 1.5G, 512K, 100 这样的大小为字节数"""
+    size = size.strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(float(size))
+
+
 def xor(s: str, key: str) -> str:
     """
     字符串的亦或加密/解密
@@ -40,8 +52,13 @@ def xor(s: str, key: str) -> str:
     :return: 加密/解密后的字符串
     """
     key = hashlib.md5(key.encode("utf-8")).hexdigest()
-    return "".join(
-        [chr(ord(c) ^ ord(k)) for c, k in zip(s, key * (len(s) // len(key) + 1))]
+    # 按字符编码为定长的UTF-32后整体做一次大整数异或，结果与逐字符异或相同
+    data = s.encode("utf-32-le")
+    mask = (key * (len(s) // len(key) + 1))[: len(s)].encode("utf-32-le")
+    return (
+        (int.from_bytes(data, "little") ^ int.from_bytes(mask, "little"))
+        .to_bytes(len(data), "little")
+        .decode("utf-32-le")
     )
 
 
@@ -51,6 +68,7 @@ class Auth(BaseModel):
     username: str
     password: str
     last_login: int = 0
+    last_verified: int = 0  # 最后一次验证token成功的时间
 
 
 class PWD(BaseModel):
@@ -77,7 +95,7 @@ class CmdConfig(BaseModel):
         if not CONFIG_FILE_PATH.exists():
             return cls()
         try:
-            typer.echo(f"load config from {CONFIG_FILE_PATH}")
+            typer.echo(f"load config from {CONFIG_FILE_PATH}", err=True)
             return cls.model_validate_json(
                 xor(
                     CONFIG_FILE_PATH.read_bytes().decode("utf-8"),
@@ -94,11 +112,12 @@ class CmdConfig(BaseModel):
                 typer.echo(f"remove config file success, {CONFIG_FILE_PATH}")
             exit(1)
 
-    def save_config(self):
-        """保存配置"""
+    def save_config(self, quiet: bool = False):
+        """保存配置，提示信息输出到stderr，不影响 --json 等输出；quiet 时不输出"""
         CONFIG_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-        print(f"save config to {self.model_dump_json()}")
+        if not quiet:
+            typer.echo(f"save config to {CONFIG_FILE_PATH}", err=True)
         CONFIG_FILE_PATH.write_bytes(
             xor(self.model_dump_json(), CONFIG_FILE_PATH.as_posix()).encode("utf-8"),
         )
@@ -111,6 +130,8 @@ class CmdConfig(BaseModel):
         password: str = None,
         token: str = None,
     ):
+        from alist_sdk import Client
+
         host = host.strip("/")
         if not token:
             try:
@@ -142,13 +163,28 @@ class CmdConfig(BaseModel):
         self.save_config()
         typer.echo(f"logout success, host: {host}")
 
-    def get_client(self, name: str) -> Client:
+    def get_client(self, name: str) -> "Client":
+        from alist_sdk import Client, login_server
+        from alist_sdk.path_lib import ALIST_SERVER_INFO
+
         if name not in self.auth_data:
             raise ValueError(f"name [{name}] not found in auth data")
         t_info = self.auth_data[name]
         if int(time.time()) - t_info.last_login > 3600 * 24:
             self.add_auth(name, t_info.host, t_info.username, t_info.password)
-        return login_server(t_info.host, token=self.auth_data[name].token)
+            t_info = self.auth_data[name]
+
+        _client = Client(t_info.host)
+        if _client.server_info in ALIST_SERVER_INFO:
+            return ALIST_SERVER_INFO[_client.server_info]
+        if int(time.time()) - t_info.last_verified < SESSION_TTL:
+            # 最近验证过的token直接使用，省去一次 /api/me 请求
+            _client.headers.update({"Authorization": t_info.token})
+        elif _client.set_token(t_info.token):
+            t_info.last_verified = int(time.time())
+            # 只更新验证时间，静默保存
+            self.save_config(quiet=True)
+        return login_server(_client)
 
     # def set_base_path(self, base_path: str, name: str = ""):
     #     self.base_path[name] = base_path
@@ -201,11 +237,23 @@ class CmdConfig(BaseModel):
         raise ValueError(f"PWD [{url}] 没有登陆.")
 
 
-cnf = CmdConfig.load_config()
+class _LazyConfig:
+    """第一次访问属性时才加载配置文件"""
+
+    _config: CmdConfig | None = None
+
+    def __getattr__(self, item):
+        if _LazyConfig._config is None:
+            _LazyConfig._config = CmdConfig.load_config()
+        return getattr(_LazyConfig._config, item)
+
+
+cnf: CmdConfig = _LazyConfig()
 
 
 class CmdPath:
-    def __new__(cls, *args, **kwargs) -> AlistPath | Path:
+
+    def __new__(cls, *args, **kwargs) -> "AlistPath | Path":
         """
         //base_path/name/file.txt -- 有名称的基于base_path的路径
         ///name/file.txt          -- 无名称的基于base_path的路径
@@ -213,6 +261,8 @@ class CmdPath:
         name/file.txt             -- 本地相对路径
         /name/file.txt            -- 本地绝对路径
         """
+        from alist_sdk import AlistPath
+
         if args[0].startswith("//./"):
             rpath = args[0][4:]
             ppath = cnf.get_pwd()
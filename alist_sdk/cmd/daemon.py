@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : daemon.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 10:40
+"""
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import typer
+
+from alist_sdk.cmd.session import SOCKET_PATH, LOG_FILE_PATH, request
+
+daemon = typer.Typer(
+    name="daemon",
+    help="会话守护进程：运行时 ls/du/tree/find 等只读命令转发给它执行，复用连接和缓存",
+)
+
+
+@daemon.command("start")
+def start(
+    idle_timeout: int = typer.Option(3600, help="空闲超过该时间（秒）后自动退出"),
+    cache_ttl: int = typer.Option(30, help="目录列表缓存的有效时间（秒）"),
+):
+    """在后台启动守护进程"""
+    if not hasattr(os, "fork"):
+        typer.echo("当前平台不支持守护进程", err=True)
+        raise typer.Exit(1)
+    if request("ping") is not None:
+        return typer.echo(f"守护进程已在运行: {SOCKET_PATH}")
+
+    LOG_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with LOG_FILE_PATH.open("ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "alist_sdk", "daemon", "run"]
+            + [f"--idle-timeout={idle_timeout}", f"--cache-ttl={cache_ttl}"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+    for _ in range(50):
+        if (status := request("ping")) is not None:
+            return typer.echo(f"守护进程已启动: pid={status['pid']}, {SOCKET_PATH}")
+        time.sleep(0.1)
+    typer.echo(f"守护进程启动失败，查看日志: {LOG_FILE_PATH}", err=True)
+    raise typer.Exit(1)
+
+
+@daemon.command("stop")
+def stop():
+    """停止守护进程"""
+    if request("stop") is None:
+        return typer.echo("守护进程未运行")
+    typer.echo("守护进程已停止")
+
+
+@daemon.command("status")
+def status():
+    """查看守护进程状态"""
+    res = request("ping")
+    if res is None:
+        typer.echo("守护进程未运行")
+        raise typer.Exit(1)
+    typer.echo(
+        f"pid: {res['pid']}\n"
+        f"version: {res['version']}\n"
+        f"started: {datetime.fromtimestamp(res['started']):%Y-%m-%d %H:%M:%S}\n"
+        f"commands: {res['commands']}\n"
+        f"clients: {res['clients']}\n"
+        f"socket: {SOCKET_PATH}"
+    )
+
+
+@daemon.command("run")
+def run(
+    idle_timeout: int = typer.Option(3600, help="空闲超过该时间（秒）后自动退出"),
+    cache_ttl: int = typer.Option(30, help="目录列表缓存的有效时间（秒）"),
+):
+    """在前台运行守护进程"""
+    from alist_sdk.cmd.session import SessionServer
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    try:
+        server = SessionServer(idle_timeout=idle_timeout, cache_ttl=cache_ttl)
+    except RuntimeError as e:
+        typer.echo(e, err=True)
+        raise typer.Exit(1)
+    server.serve()
@@ -5,14 +5,14 @@
 @Author     : LeeCQ
 @Date-Time  : 2024/9/15 22:47
 """
+import json
+import os
 from datetime import datetime
-import subprocess
 from pathlib import Path
 
 import typer
 
-from alist_sdk import AlistPath
-from alist_sdk.cmd.base import beautify_size, CmdPath, cnf
+from alist_sdk.cmd.base import beautify_size, parse_size, CmdPath, cnf
 
 fs = typer.Typer(name="fs", help="文件系统相关操作")
 
@@ -20,6 +20,8 @@ fs = typer.Typer(name="fs", help="文件系统相关操作")
 @fs.command("cd")
 def cd(path: str):
     """设置一个pwd"""
+    from alist_sdk import AlistPath
+
     if path.startswith("./"):
         _p: AlistPath = CmdPath("//" + path)
     else:
@@ -38,35 +40,193 @@ def pwd():
     typer.echo(f"PWD: {_ if _ != '/' else 'Not Find.'}")
 
 
+def _local_entries(path: Path):
+    """本地路径的 (完整路径, Item)，转换为Item以便与远程路径统一处理"""
+    from alist_sdk.models import Item
+
+    def _item(name, st, is_dir):
+        return Item.model_construct(
+            name=name,
+            size=0 if is_dir else st.st_size,
+            is_dir=is_dir,
+            modified=datetime.fromtimestamp(st.st_mtime).astimezone(),
+            sign="",
+            thumb="",
+            type=0,
+        )
+
+    if not path.is_dir():
+        yield path.as_posix(), _item(path.name, path.stat(), False)
+        return
+    with os.scandir(path) as it:
+        for entry in it:
+            is_dir = entry.is_dir()
+            yield path.joinpath(entry.name).as_posix(), _item(
+                entry.name, entry.stat(), is_dir
+            )
+
+
+def _remote_entries(path: "AlistPath"):
+    """远程路径的 (完整路径, Item)：分页列出目录；不是目录时只获取该文件的信息"""
+    from alist_sdk import AlistError
+
+    try:
+        for item in path.client.iter_files(path.as_posix()):
+            yield path.joinpath(item.name).as_posix(), item
+    except AlistError:
+        _res = path.client.get_item_info(path.as_posix())
+        if _res.code != 200 or _res.data.is_dir:
+            raise
+        yield path.as_posix(), _res.data
+
+
+_LS_SORT_KEYS = {
+    "name": lambda e: e[1].name,
+    "size": lambda e: e[1].size,
+    "time": lambda e: e[1].modified,
+}
+
+
 @fs.command("ls")
-def ls(path: str):
+def ls(
+    path: str,
+    long: bool = typer.Option(False, "--long", "-l", help="显示类型、大小、修改时间"),
+    json_lines: bool = typer.Option(False, "--json", help="每行输出一个JSON对象"),
+    type_: str = typer.Option(None, "--type", "-t", help="只显示 file 或 dir"),
+    min_size: str = typer.Option(
+        None, "--min-size", help="只显示不小于该大小的文件，例如 10M"
+    ),
+    sort: str = typer.Option(
+        "name", "--sort", "-s", help="排序: name, size, time, none(边列出边输出)"
+    ),
+    reverse: bool = typer.Option(False, "--reverse", "-r", help="倒序"),
+):
     """列出文件系统"""
+    from alist_sdk import AlistPath, AlistError
+
+    if type_ not in (None, "file", "dir"):
+        raise typer.BadParameter("只能是 file 或 dir", param_hint="--type")
+    if sort not in (*_LS_SORT_KEYS, "none"):
+        raise typer.BadParameter(
+            f"只能是 {', '.join(_LS_SORT_KEYS)}, none", param_hint="--sort"
+        )
+    _min_size = parse_size(min_size) if min_size else None
+
     path: AlistPath | Path = CmdPath(path)
+    items = (
+        _remote_entries(path) if isinstance(path, AlistPath) else _local_entries(path)
+    )
+    if type_:
+        items = (e for e in items if e[1].is_dir == (type_ == "dir"))
+    if _min_size is not None:
+        items = (e for e in items if not e[1].is_dir and e[1].size >= _min_size)
+
     total_size = 0
-    is_remote = isinstance(path, AlistPath)
-    print(type(path), path)
-    # type, size, modify_time, name
-    for p in path.iterdir() if path.is_dir() else [path]:
-        f_size = p.stat().st_size if is_remote or p.is_file() else 0
-        total_size += f_size
-        p_type = "dir" if p.is_dir() else "file"
-
-        p_mtime = (
-            p.stat().modified
-            if is_remote
-            else datetime.fromtimestamp(p.stat().st_mtime)
-        )
+    try:
+        if sort != "none":
+            items = sorted(items, key=_LS_SORT_KEYS[sort], reverse=reverse)
+        for full_path, i in items:
+            total_size += i.size
+            if json_lines:
+                typer.echo(
+                    json.dumps(
+                        {
+                            "name": i.name,
+                            "path": full_path,
+                            "is_dir": i.is_dir,
+                            "size": i.size,
+                            "modified": i.modified.isoformat(),
+                        },
+                        ensure_ascii=False,
+                    )
+                )
+            elif long:
+                typer.echo(
+                    f"{'dir' if i.is_dir else 'file':<8}"
+                    f"{beautify_size(i.size):<10}"
+                    f"{i.modified.strftime('%Y-%m-%d %H:%M:%S'):<20} {i.name}"
+                )
+            else:
+                typer.echo(i.name)
+    except (AlistError, OSError) as e:
+        typer.echo(f"ls: {path}: {e}", err=True)
+        raise typer.Exit(1)
+    if long and not json_lines:
+        typer.echo(f"total: {beautify_size(total_size)}")
+
+
+def _echo_progress(listed, total):
+    typer.echo(f"\r已列出 {listed} 个目录, {beautify_size(total)}", nl=False, err=True)
+
+
+def _remote_path(path: str, command: str):
+    """du/tree 只统计Alist上的目录，本地路径给出提示后退出"""
+    from alist_sdk import AlistPath
+
+    _path = CmdPath(path)
+    if not isinstance(_path, AlistPath):
         typer.echo(
-            f"{p_type:<8}"
-            f"{beautify_size(f_size):<10}"
-            f"{p_mtime.strftime('%Y-%m-%d %H:%M:%S'):<20} {p.name}"
+            f"{command}: {path} 是本地路径，只支持Alist路径（//name/path），"
+            f"本地目录请使用系统的 {command} 命令",
+            err=True,
         )
-    typer.echo(f"total: {beautify_size(total_size)}")
+        raise typer.Exit(1)
+    return _path
+
+
+@fs.command("du")
+def du(
+    path: str,
+    max_depth: int = typer.Option(
+        1, "--max-depth", "-d", help="输出的最大深度，-1 不限制"
+    ),
+    top: int = typer.Option(0, help="只输出占用最大的N个目录"),
+    jobs: int = typer.Option(10, "--jobs", "-j", help="并发列出目录数"),
+):
+    """统计目录的空间占用（递归），遍历过程中流式输出已完成的目录"""
+    from alist_sdk.tools.usage import iter_usage, top_usage
+
+    path = _remote_path(path, "du")
+
+    usages = []
+    for usage in iter_usage(
+        path.client, path.as_posix(), jobs, _echo_progress if top else None
+    ):
+        if top:
+            usages.append(usage)
+        elif max_depth < 0 or usage.depth <= max_depth:
+            mark = " [incomplete]" if usage.incomplete else ""
+            typer.echo(f"{beautify_size(usage.size):<12}{usage.path}{mark}")
+    if top:
+        typer.echo(err=True)
+        for usage in top_usage(usages, top, max_depth):
+            typer.echo(f"{beautify_size(usage.size):<12}{usage.path}")
+
+
+@fs.command("tree")
+def tree(
+    path: str,
+    max_depth: int = typer.Option(
+        2, "--max-depth", "-d", help="输出的最大深度，-1 不限制"
+    ),
+    jobs: int = typer.Option(10, "--jobs", "-j", help="并发列出目录数"),
+):
+    """以树形输出目录及其空间占用（递归统计）"""
+    from alist_sdk.tools.usage import iter_usage, render_tree
+
+    path = _remote_path(path, "tree")
+
+    usages = list(iter_usage(path.client, path.as_posix(), jobs, _echo_progress))
+    typer.echo(err=True)
+    for line in render_tree(usages, max_depth, beautify_size):
+        typer.echo(line)
 
 
 @fs.command("print")
 def fs_read(path: str):
     """读取文件内容"""
+    from alist_sdk import AlistPath
+
     text_types = (
         "txt,md,log,conf,ini,yaml,json,xml,csv,tsv,list,lst,sh,bash,zsh,py,"
         "yaml,yml,java,c,cpp,h,hpp,go,php,js,css,html,jsp,jspx,asp,aspx,cs,"
@@ -93,6 +253,8 @@ def mkdir(
     exist_ok: bool = typer.Option(False, help="是否忽略已存在的目录"),
 ):
     """创建目录"""
+    from alist_sdk import AlistPath
+
     try:
         AlistPath(path).joinpath(name).mkdir(parents=parents, exist_ok=exist_ok)
     except Exception as e:
@@ -106,6 +268,8 @@ def rm(
     force: bool = typer.Option(False, "-f", help="是否强制删除"),
 ):
     """删除文件或目录,"""
+    from alist_sdk import AlistPath
+
     try:
         path = AlistPath(path)
         if not recursive and path.is_dir() and len(list(path.iterdir())) != 0:
@@ -121,17 +285,134 @@ def rm(
         typer.echo(f"rm error: {e}")
 
 
+def _server_key(path: "AlistPath") -> str:
+    return str(path.client.base_url).rstrip("/")
+
+
+def _wait_copy_tasks(client, task_ids, timeout: float = None):
+    """等待服务端复制任务完成，并输出每个任务的结果，返回失败（含超时未完成）的数量"""
+    from alist_sdk import AlistError
+
+    failed = set(task_ids)
+    typer.echo(f"等待 {len(task_ids)} 个复制任务完成...")
+    try:
+        for task in client.wait_for_tasks(task_ids, "copy", timeout=timeout):
+            if task.state == 2:
+                failed.discard(task.id)
+            typer.echo(
+                f"{'OK' if task.state == 2 else 'FAIL':<5}{task.name} {task.error}"
+            )
+    except (TimeoutError, AlistError) as _e:
+        typer.echo(f"等待复制任务失败: {_e}", err=True)
+    return len(failed)
+
+
+def _exists(path) -> bool:
+    """Alist路径只请求一次 /api/fs/get，结果缓存到path上供is_dir/stat使用；
+    不使用AlistPath.exists()，其中的re_stat在路径不存在时会重试等待约1秒"""
+    from alist_sdk import AlistPath
+
+    if not isinstance(path, AlistPath):
+        return path.exists()
+    _res = path.client.get_item_info(path.as_posix())
+    if _res.code != 200:
+        return False
+    path.set_stat(_res.data)
+    return True
+
+
 @fs.command("cp")
 def cp(
     src: str,
     dst: str,
     recursive: bool = typer.Option(False, "-r", help="是否递归复制"),
+    jobs: int = typer.Option(
+        4, "--jobs", "-j", help="并发数（单个文件下载时为分段数）"
+    ),
+    wait: bool = typer.Option(True, help="同一服务器复制时，等待服务端任务完成"),
+    timeout: float = typer.Option(
+        None, help="等待服务端复制任务的超时时间（秒），超时后退出码为1"
+    ),
 ):
     """复制文件 递归
-    alist  - alist
-    alist - local
-    local - alist
+    alist  - alist  同一服务器使用服务端复制，跨服务器或单个文件改名时流式传输
+    alist - local   多线程分段下载
+    local - alist   并发流式上传
     """
+    from alist_sdk import AlistPath
+    from alist_sdk.tools.mirror import TreeMirror, transfer_file
+    from alist_sdk.tools.local_sync import UploadSync, DownloadSync, download_file
+
+    src, dst = CmdPath(src), CmdPath(dst)
+    src_remote, dst_remote = isinstance(src, AlistPath), isinstance(dst, AlistPath)
+    if not src_remote and not dst_remote:
+        typer.echo("本地之间的复制请使用系统命令", err=True)
+        exit(1)
+    if not _exists(src):
+        typer.echo(f"{src} 不存在", err=True)
+        exit(1)
+    if src.is_dir() and not recursive:
+        typer.echo(f"{src} 是目录，请使用 -r 参数递归复制", err=True)
+        exit(1)
+    if _exists(dst) and dst.is_dir():
+        dst = dst.joinpath(src.name)
+
+    typer.echo(f"copying {src} to {dst}")
+    if src_remote and dst_remote:
+        same_server = _server_key(src) == _server_key(dst)
+        if src.is_dir():
+            result = TreeMirror(
+                src.client,
+                src.as_posix(),
+                dst.client,
+                dst.as_posix(),
+                max_workers=jobs,
+                wait=wait,
+                task_timeout=timeout,
+            ).run()
+            echo_sync_result(result, "复制")
+            exit(1 if result.failed else 0)
+        elif same_server and src.name == dst.name:
+            _res = dst.client.copy(
+                src.parent.as_posix(), dst.parent.as_posix(), src.name
+            )
+            if _res.code != 200:
+                typer.echo(f"复制失败: {_res.message}", err=True)
+                exit(1)
+            task_ids = [t.id for t in _res.data.tasks] if _res.data else []
+        else:  # 服务端复制不能改名，改名时同样流式传输
+            _res = transfer_file(src.client, src.as_posix(), dst.client, dst.as_posix())
+            if _res.code != 200:
+                typer.echo(f"复制失败: {_res.message}", err=True)
+                exit(1)
+            task_ids = []
+
+        if same_server and wait and task_ids:
+            exit(1 if _wait_copy_tasks(dst.client, task_ids, timeout) else 0)
+        return
+
+    if src_remote:
+        if src.is_dir():
+            result = DownloadSync(
+                src.client, src.as_posix(), dst, max_workers=jobs
+            ).run()
+            echo_sync_result(result, "下载")
+            exit(1 if result.failed else 0)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        size = download_file(
+            src.client, src.as_posix(), dst, item=src.stat(), parts=jobs
+        )
+        typer.echo(f"下载完成 {beautify_size(size)}")
+        return
+
+    if src.is_dir():
+        result = UploadSync(dst.client, src, dst.as_posix(), max_workers=jobs).run()
+        echo_sync_result(result, "上传")
+        exit(1 if result.failed else 0)
+    _res = dst.client.upload_file_put(src, dst.as_posix())
+    if _res.code != 200:
+        typer.echo(f"上传失败: {_res.message}", err=True)
+        exit(1)
 
 
 @fs.command("download")
@@ -139,32 +420,66 @@ def download(
     src: str,
     dst: str,
     recursive: bool = typer.Option(False, "-r", help="是否递归下载"),
+    delete: bool = typer.Option(False, help="删除本地多余的文件"),
+    jobs: int = typer.Option(4, "--jobs", "-j", help="并发下载数"),
+    limit_rate: str = typer.Option(
+        None, "--limit-rate", help="全部下载共用的带宽上限，例如 10M"
+    ),
 ):
-    """下载文件"""
-
-    def down_file(src_path, dst_path):
-        down_link = AlistPath(src).as_download_uri()
-        if Path(dst_path).exists():
-            typer.echo(f"{dst_path} 已存在，跳过")
-            return
-        if not Path(dst_path).parent.exists():
-            Path(dst_path).parent.mkdir(parents=True)
-        typer.echo(f"downloading {src_path} to {dst_path}")
-        subprocess.run(["curl", "-o", dst_path, down_link])  # TODO: 自定义UA
+    """下载文件，目录只下载新增或变化（大小、修改时间）的文件"""
+    from alist_sdk import AlistPath
+    from alist_sdk.tools.local_sync import DownloadSync, RateLimiter, download_file
 
     src = AlistPath(src)
     dst = Path(dst)
-    if src.is_dir():
-        dst = dst.joinpath(src.name)
-        dst.mkdir(parents=True, exist_ok=True)
+    bandwidth = parse_size(limit_rate) if limit_rate else None
+    if not src.is_dir():
+        if dst.is_dir():
+            dst = dst.joinpath(src.name)
+        item = src.stat()
+        if (
+            dst.exists()
+            and dst.stat().st_size == item.size
+            and dst.stat().st_mtime + 1 >= item.modified.timestamp()
+        ):
+            typer.echo(f"{dst} 已存在，跳过")
+            return
+        typer.echo(f"downloading {src} to {dst}")
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        download_file(
+            src.client,
+            src.as_posix(),
+            dst,
+            item=item,
+            limiter=RateLimiter(bandwidth) if bandwidth else None,
+        )
+        return
+
+    dst = dst.joinpath(src.name)
+    typer.echo(f"syncing {src} to {dst}")
+    result = DownloadSync(
+        src.client,
+        src.as_posix(),
+        dst,
+        delete=delete,
+        max_workers=jobs,
+        bandwidth=bandwidth,
+        max_depth=-1 if recursive else 0,
+    ).run()
+    echo_sync_result(result, "下载")
+    exit(1 if result.failed else 0)
 
-    for p in src.iterdir():
-        if p.is_dir() and recursive:
-            download(str(p), str(dst.joinpath(p.name)))
-        elif p.is_file():
-            down_file(p, dst.joinpath(p.name))
-        else:
-            typer.echo(f"{p} 不是文件或目录，跳过")
+
+def echo_sync_result(result, action="传输"):
+    """打印同步统计"""
+    speed = result.bytes / result.seconds if result.seconds else 0
+    typer.echo(
+        f"{action} {result.copied} 个文件, {beautify_size(result.bytes)}, "
+        f"{beautify_size(speed)}/s, 创建目录 {result.mkdirs}, 删除 {result.deleted}, "
+        f"失败 {len(result.failed)}, 耗时 {result.seconds:.2f}s"
+    )
+    for _path, error in result.failed.items():
+        typer.echo(f"  失败: {_path}: {error}", err=True)
 
 
 @fs.command("upload")
@@ -172,16 +487,39 @@ def upload(
     src: str,
     dst: str,
     force: bool = typer.Option(False, help="是否覆盖已有文件"),
+    sync: bool = typer.Option(
+        False, "--sync", "-r", help="递归同步目录，只上传新增或变化的文件"
+    ),
+    delete: bool = typer.Option(False, help="同步时删除远程多余的文件"),
+    jobs: int = typer.Option(4, "--jobs", "-j", help="同步时的并发上传数"),
 ):
-    """上传文件"""
+    """上传文件，--sync 时将本地目录同步到远程目录"""
+    from alist_sdk import AlistPath
+
+    dst = AlistPath(dst)
+    if sync:
+        from alist_sdk.tools.local_sync import UploadSync
+
+        if not Path(src).is_dir():
+            typer.echo(f"{src} 不存在或不是目录")
+            exit(1)
+        typer.echo(f"syncing {src} to {dst}")
+        result = UploadSync(
+            dst.client, src, dst.as_posix(), delete=delete, max_workers=jobs
+        ).run()
+        echo_sync_result(result, "上传")
+        exit(1 if result.failed else 0)
+
     if not Path(src).exists() or not Path(src).is_file():
         typer.echo(f"{src} 不存在或不是文件")
         exit(1)
-    if not AlistPath(dst).parent.exists():
-        typer.echo(f"{AlistPath(dst).parent} 不存在")
-        exit(1)
-    if AlistPath(dst).exists() and not force:
-        typer.echo(f"{dst} 已存在")
+    # 只获取目标本身，不列出整个父目录；目标不存在时再检查父目录
+    if dst.client.get_item_info(dst.as_posix()).code == 200:
+        if not force:
+            typer.echo(f"{dst} 已存在")
+            exit(1)
+    elif dst.client.get_item_info(dst.parent.as_posix()).code != 200:
+        typer.echo(f"{dst.parent} 不存在")
         exit(1)
     typer.echo(f"uploading {src} to {dst}")
-    AlistPath(dst).write_bytes(Path(src))
+    dst.write_bytes(Path(src))
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : session.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 10:20
+
+alist-cli 会话守护进程。
+
+守护进程在本地Unix Socket上监听，进程内保持已登录的Client（连接池）和目录列表缓存，
+alist-cli 的只读命令在守护进程运行时转发给它执行，输出再原样回传，
+脚本中连续执行大量命令时省去每次的解释器启动、导入、TLS握手和token验证。
+
+协议：客户端发送一行JSON请求，服务端回复若干行JSON：
+    {"op": "run", "argv": [...], "cwd": "...", "version": "..."}
+    -> {"out": "..."} / {"err": "..."} ... {"exit": 0}
+    {"op": "ping"} -> {"pid": 1, "started": 0.0, "commands": 0, ...}
+    {"op": "stop"} -> {"exit": 0}
+
+本模块只导入标准库，保证转发路径足够快。
+"""
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import time
+import traceback
+from pathlib import Path
+
+from alist_sdk.version import __version__
+
+logger = logging.getLogger("alist-sdk.cmd.session")
+
+SOCKET_PATH = Path(
+    os.environ.get("ALIST_CLI_SOCKET")
+    or Path.home().joinpath(".config", "alist_cli.sock")
+)
+LOG_FILE_PATH = Path.home().joinpath(".config", "alist_cli_daemon.log")
+# 设置该环境变量后不转发，始终在当前进程执行
+NO_DAEMON_ENV = "ALIST_CLI_NO_DAEMON"
+
+# 可以转发给守护进程的命令（前缀），只包含不需要交互输入的只读命令
+FORWARD_COMMANDS = {
+    ("fs", "ls"),
+    ("fs", "du"),
+    ("fs", "tree"),
+    ("fs", "pwd"),
+    ("fs", "print"),
+    ("find",),
+    ("server-version",),
+    ("admin", "storage", "list"),
+    ("admin", "storage", "probe"),
+}
+
+
+def _send(sock: socket.socket, msg: dict):
+    sock.sendall(json.dumps(msg, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def _connect(path: Path = None, timeout: float = None) -> socket.socket | None:
+    """连接到守护进程，未运行时返回None"""
+    path = path or SOCKET_PATH
+    if not hasattr(socket, "AF_UNIX") or not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(op: str, path: Path = None, timeout: float = 5) -> dict | None:
+    """发送 ping/stop 等控制请求，守护进程未运行时返回None"""
+    sock = _connect(path, timeout)
+    if sock is None:
+        return None
+    with sock:
+        _send(sock, {"op": op})
+        line = sock.makefile("rb").readline()
+    return json.loads(line) if line else None
+
+
+def is_forwardable(argv: list[str]) -> bool:
+    return any(tuple(argv[: len(c)]) == c for c in FORWARD_COMMANDS)
+
+
+def forward(argv: list[str], path: Path = None) -> int | None:
+    """
+    将命令转发给守护进程执行并输出结果。
+
+    :return: 命令的退出码；守护进程未运行、不支持该命令等需要在本进程执行时返回None
+    """
+    if os.environ.get(NO_DAEMON_ENV) or not is_forwardable(argv):
+        return None
+    sock = _connect(path)
+    if sock is None:
+        return None
+
+    with sock:
+        _send(
+            sock,
+            {"op": "run", "argv": argv, "cwd": os.getcwd(), "version": __version__},
+        )
+        for line in sock.makefile("rb"):
+            msg = json.loads(line)
+            if "out" in msg:
+                sys.stdout.write(msg["out"])
+                sys.stdout.flush()
+            elif "err" in msg:
+                sys.stderr.write(msg["err"])
+                sys.stderr.flush()
+            elif "reject" in msg:
+                logger.debug("守护进程拒绝执行: %s", msg["reject"])
+                return None
+            elif "exit" in msg:
+                return msg["exit"]
+    # 守护进程中途退出，已经输出了部分结果，不能再在本地重新执行
+    sys.stderr.write("alist-cli 守护进程连接中断\n")
+    return 1
+
+
+class _SocketStream(io.TextIOBase):
+    """将写入的文本以 {key: text} 的形式发送到socket"""
+
+    encoding = "utf-8"
+
+    def __init__(self, sock: socket.socket, key: str):
+        self._sock = sock
+        self._key = key
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def write(self, s: str | bytes) -> int:
+        if isinstance(s, bytes):  # click 在流不兼容时会直接写入编码后的字节
+            s = s.decode(self.encoding, "replace")
+        if s:
+            _send(self._sock, {self._key: s})
+        return len(s)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "SessionServer"
+
+    def handle(self):
+        try:
+            req = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            return
+        op = req.get("op")
+        if op == "ping":
+            _send(self.request, self.server.status())
+        elif op == "stop":
+            self.server.running = False
+            _send(self.request, {"exit": 0})
+        elif op == "run":
+            if req.get("version") != __version__:
+                return _send(self.request, {"reject": "version mismatch"})
+            if not is_forwardable(req.get("argv", [])):
+                return _send(self.request, {"reject": "command not allowed"})
+            _send(self.request, {"exit": self.server.run_command(req, self.request)})
+
+
+class SessionServer(socketserver.UnixStreamServer):
+    """
+    alist-cli 会话守护进程。
+
+    命令在同一线程中依次执行（标准输入输出是进程级的），
+    Client 和连接池由 path_lib.ALIST_SERVER_INFO 保存，在多次命令之间复用。
+
+    :param path: Unix Socket 路径
+    :param idle_timeout: 空闲超过该时间（秒）后自动退出
+    :param cache_ttl: 目录列表缓存的有效时间（秒），超时后整体清空，避免长期读到旧数据
+    """
+
+    def __init__(
+        self, path: Path = None, idle_timeout: float = 3600, cache_ttl: float = 30
+    ):
+        self.path = Path(path or SOCKET_PATH)
+        if self.path.exists():
+            if request("ping", self.path) is not None:
+                raise RuntimeError(f"守护进程已在运行: {self.path}")
+            self.path.unlink()  # 上次异常退出遗留的socket文件
+
+        self.timeout = idle_timeout
+        self.cache_ttl = cache_ttl
+        self.running = True
+        self.started = time.time()
+        self.commands = 0
+        self._cache_time = time.time()
+        self._config_mtime = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(self.path), _Handler)
+
+    def server_bind(self):
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)  # 守护进程持有token，只允许本用户连接
+
+    def status(self) -> dict:
+        from alist_sdk.path_lib import ALIST_SERVER_INFO
+
+        return {
+            "pid": os.getpid(),
+            "version": __version__,
+            "started": self.started,
+            "commands": self.commands,
+            "clients": len(ALIST_SERVER_INFO),
+        }
+
+    def handle_timeout(self):
+        logger.info("空闲超过 %ss, 守护进程退出", self.timeout)
+        self.running = False
+
+    def _refresh_state(self):
+        """配置文件被其他进程修改（登录、cd等）后重新加载；目录缓存过期后清空"""
+        from alist_sdk import Client
+        from alist_sdk.cmd.base import CONFIG_FILE_PATH, _LazyConfig
+        from alist_sdk.path_lib import ALIST_SERVER_INFO
+
+        mtime = CONFIG_FILE_PATH.stat().st_mtime if CONFIG_FILE_PATH.exists() else 0
+        if mtime != self._config_mtime:
+            if self._config_mtime is not None:
+                logger.info("配置文件已变化，重新加载")
+            _LazyConfig._config = None
+            ALIST_SERVER_INFO.clear()
+            self._config_mtime = mtime
+
+        if time.time() - self._cache_time > self.cache_ttl:
+            Client._cached_path_list.clear()
+            self._cache_time = time.time()
+
+    def run_command(self, req: dict, sock: socket.socket) -> int:
+        """在本进程中执行一条 alist-cli 命令，输出写回到客户端"""
+        from contextlib import redirect_stdout, redirect_stderr
+        from alist_sdk.cmd.app import app
+        from alist_sdk.cmd.base import CONFIG_FILE_PATH
+
+        self.commands += 1
+        self._refresh_state()
+        logger.info("执行命令: %s", req["argv"])
+
+        _cwd, _stdin = os.getcwd(), sys.stdin
+        out, err = _SocketStream(sock, "out"), _SocketStream(sock, "err")
+        code = 0
+        try:
+            os.chdir(req.get("cwd") or _cwd)
+            sys.stdin = io.StringIO()  # 不支持交互输入
+            with redirect_stdout(out), redirect_stderr(err):
+                try:
+                    app(args=req["argv"], prog_name="alist-cli")
+                except SystemExit as e:
+                    if isinstance(e.code, str):
+                        err.write(e.code + "\n")
+                    code = e.code if isinstance(e.code, int) else int(bool(e.code))
+                except Exception:
+                    err.write(traceback.format_exc())
+                    code = 1
+        finally:
+            os.chdir(_cwd)
+            sys.stdin = _stdin
+        # 命令本身保存的配置（例如更新验证时间）不需要重新加载
+        if CONFIG_FILE_PATH.exists():
+            self._config_mtime = CONFIG_FILE_PATH.stat().st_mtime
+        return code
+
+    def serve(self):
+        """处理请求直到收到stop或空闲超时"""
+        # 预先导入命令，第一次转发的命令也不需要等待导入
+        import alist_sdk.cmd.app  # noqa: F401
+
+        logger.info("守护进程已启动: pid=%d, socket=%s", os.getpid(), self.path)
+        try:
+            while self.running:
+                self.handle_request()
+        finally:
+            self.server_close()
+            self.path.unlink(missing_ok=True)
+
+
+def main():
+    """alist-cli 入口：守护进程运行时转发命令，否则在本进程执行"""
+    code = forward(sys.argv[1:])
+    if code is None:
+        from alist_sdk.cmd.app import app
+
+        return app()
+    sys.exit(code)
+
+
+def fs_main():
+    """alist-fs 入口"""
+    code = forward(["fs", *sys.argv[1:]])
+    if code is None:
+        from alist_sdk.cmd.fs import fs
+
+        return fs()
+    sys.exit(code)
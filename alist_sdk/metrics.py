@@ -0,0 +1,217 @@
+"""请求指标
+
+>>> from alist_sdk import Client
+>>> from alist_sdk.metrics import Metrics
+>>> metrics = Metrics()
+>>> client = Client("http://localhost:5244", token="...", metrics=metrics)
+>>> ...
+>>> print(metrics.render_prometheus())
+>>> metrics.top(5)  # 总耗时最多的接口
+
+Client / AsyncClient 在每次请求时调用 MetricsHook 的回调，Metrics 是内存中的聚合实现；
+需要把指标发送到其他系统时，继承 MetricsHook 重写需要的方法即可。
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from httpx import URL
+
+__all__ = ["MetricsHook", "Metrics", "endpoint_of", "DEFAULT_BUCKETS"]
+
+# 耗时直方图的桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def endpoint_of(path: str) -> str:
+    """URL路径转换为endpoint标签
+
+    /api/ 接口保留完整路径；下载（/d/...、/p/...）等路径只保留第一段，避免标签数量无限增长。
+    """
+    if (i := path.find("/api/")) >= 0:
+        return path[i:]
+    return "/" + path.lstrip("/").split("/", 1)[0]
+
+
+class MetricsHook:
+    """指标回调接口，默认全部为空操作"""
+
+    def on_request(
+        self,
+        endpoint: str,
+        method: str,
+        status: int | str,
+        seconds: float,
+        sent: int,
+        received: int,
+    ):
+        """一次HTTP请求完成，status为HTTP状态码，请求异常时为异常类名"""
+
+    def on_code(self, endpoint: str, code: int):
+        """响应解码后的Alist code"""
+
+    def on_retry(self, endpoint: str):
+        """一次请求重试"""
+
+    def on_semaphore_wait(self, seconds: float):
+        """等待并发信号量（max_connect）的时间"""
+
+    def on_cache(self, name: str, hit: bool):
+        """缓存命中或未命中"""
+
+    def observe_response(
+        self, method: str, url, begin: float, res=None, error: Exception = None
+    ):
+        """由客户端调用：根据已读取的 httpx.Response 或请求异常计算标签，再调用 on_request"""
+        seconds = time.perf_counter() - begin
+        if res is None:
+            self.on_request(
+                endpoint_of(URL(url).path), method, type(error).__name__, seconds, 0, 0
+            )
+            return
+        self.on_request(
+            endpoint_of(res.request.url.path),
+            method,
+            res.status_code,
+            seconds,
+            int(res.request.headers.get("content-length", 0)),
+            res.num_bytes_downloaded or len(res.content),
+        )
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels) -> str:
+    def _escape(v):
+        return str(v).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Metrics(MetricsHook):
+    """线程安全的内存指标聚合，可以渲染为Prometheus文本格式"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)  # (endpoint, method, status) -> n
+            self.latency = defaultdict(lambda: _Histogram(self.buckets))
+            self.codes = defaultdict(int)  # (endpoint, code) -> n
+            self.sent = defaultdict(int)  # endpoint -> bytes
+            self.received = defaultdict(int)
+            self.retries = defaultdict(int)
+            self.cache = defaultdict(int)  # (name, hit) -> n
+            self.semaphore_wait = _Histogram(self.buckets)
+
+    def on_request(self, endpoint, method, status, seconds, sent, received):
+        with self._lock:
+            self.requests[(endpoint, method, str(status))] += 1
+            self.latency[endpoint].observe(seconds)
+            self.sent[endpoint] += sent
+            self.received[endpoint] += received
+
+    def on_code(self, endpoint, code):
+        with self._lock:
+            self.codes[(endpoint, code)] += 1
+
+    def on_retry(self, endpoint):
+        with self._lock:
+            self.retries[endpoint] += 1
+
+    def on_semaphore_wait(self, seconds):
+        with self._lock:
+            self.semaphore_wait.observe(seconds)
+
+    def on_cache(self, name, hit):
+        with self._lock:
+            self.cache[(name, hit)] += 1
+
+    def cache_hit_rate(self, name: str) -> float | None:
+        with self._lock:
+            hit, miss = self.cache.get((name, True), 0), self.cache.get(
+                (name, False), 0
+            )
+        return hit / (hit + miss) if hit + miss else None
+
+    def top(self, n: int = 10) -> list[tuple[str, int, float]]:
+        """总耗时最多的n个接口: [(endpoint, 请求次数, 总耗时秒数)]"""
+        with self._lock:
+            res = [(e, h.count, h.sum) for e, h in self.latency.items()]
+        return sorted(res, key=lambda r: r[2], reverse=True)[:n]
+
+    def _render_histogram(self, name, hist: _Histogram, **labels):
+        cumulative = 0
+        for le, c in zip((*self.buckets, "+Inf"), hist.counts):
+            cumulative += c
+            yield f"{name}_bucket{_labels(**labels, le=le)} {cumulative}"
+        suffix = _labels(**labels) if labels else ""
+        yield f"{name}_sum{suffix} {hist.sum}"
+        yield f"{name}_count{suffix} {hist.count}"
+
+    def render_prometheus(self, prefix: str = "alist_sdk") -> str:
+        """渲染为Prometheus文本格式"""
+
+        def _head(name, _type, _help):
+            return [
+                f"# HELP {prefix}_{name} {_help}",
+                f"# TYPE {prefix}_{name} {_type}",
+            ]
+
+        with self._lock:
+            lines = _head("requests_total", "counter", "HTTP请求数")
+            for (e, m, s), v in sorted(self.requests.items()):
+                lines.append(
+                    f"{prefix}_requests_total{_labels(endpoint=e, method=m, status=s)} {v}"
+                )
+
+            lines += _head("request_duration_seconds", "histogram", "HTTP请求耗时")
+            for e, h in sorted(self.latency.items()):
+                lines += self._render_histogram(
+                    f"{prefix}_request_duration_seconds", h, endpoint=e
+                )
+
+            lines += _head("response_codes_total", "counter", "Alist响应code")
+            for (e, c), v in sorted(self.codes.items()):
+                lines.append(
+                    f"{prefix}_response_codes_total{_labels(endpoint=e, code=c)} {v}"
+                )
+
+            for name, data, _help in [
+                ("sent_bytes_total", self.sent, "发送字节数"),
+                ("received_bytes_total", self.received, "接收字节数"),
+                ("retries_total", self.retries, "重试次数"),
+            ]:
+                lines += _head(name, "counter", _help)
+                for e, v in sorted(data.items()):
+                    lines.append(f"{prefix}_{name}{_labels(endpoint=e)} {v}")
+
+            lines += _head(
+                "semaphore_wait_seconds", "histogram", "等待并发信号量的时间"
+            )
+            lines += self._render_histogram(
+                f"{prefix}_semaphore_wait_seconds", self.semaphore_wait
+            )
+
+            lines += _head("cache_requests_total", "counter", "缓存查询次数")
+            for (name, hit), v in sorted(self.cache.items()):
+                result = "hit" if hit else "miss"
+                lines.append(
+                    f"{prefix}_cache_requests_total{_labels(cache=name, result=result)} {v}"
+                )
+        return "\n".join(lines) + "\n"
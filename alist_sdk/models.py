@@ -31,12 +31,15 @@ __all__ = [
     "Task",
     "ListTask",
     "AsTask",
+    "TaskBulkActionModify",
+    "BulkTaskResult",
     "Resp",
     "HashInfo",
     "NoneType",
     "ListContents",
     "User",
     "Storage",
+    "StorageProbe",
     "Meta",
     "Setting",
 ]
@@ -69,6 +72,8 @@ TaskStatusModify = Literal[
     "uploading",
 ]
 
+TaskBulkActionModify = Literal["cancel", "retry", "delete"]
+
 OrderDirectionModify = Literal["", "asc", "desc"]
 OrderByModify = Literal["", "size", "name"]
 ExtractFolderModify = Literal["", "front", "back", "none"]
@@ -225,6 +230,19 @@ class ListTask(_BaseModel):
     tasks: list[Task]
 
 
+class BulkTaskResult(_BaseModel):
+    """批量任务操作的结果"""
+
+    action: TaskBulkActionModify
+    task_type: TaskTypeModify
+    succeeded: list[str] = []  # 成功的任务ID
+    failed: dict[str, str] = {}  # 任务ID: 错误信息
+
+    @property
+    def total(self) -> int:
+        return len(self.succeeded) + len(self.failed)
+
+
 class ID(_BaseModel):
     id: int | str | None
 
@@ -263,6 +281,17 @@ class Storage(_BaseModel):
     down_proxy_url: str = ""
 
 
+class StorageProbe(_BaseModel):
+    """存储器探测结果"""
+
+    mount_path: str
+    driver: str
+    status: str  # 存储器列表中的状态
+    ok: bool  # 挂载根目录是否可以列出
+    latency: float | None = None  # 列出根目录的耗时（秒），超时为None
+    error: str = ""
+
+
 class User(_BaseModel):
     """/api/admin/user/list .data.content.[]"""
 
@@ -14,10 +14,11 @@ from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import core_schema
 
 from alist_sdk import alistpath
-from alist_sdk.models import Item, RawItem
+from alist_sdk.models import Item, RawItem, SearchItem, SearchScopeModify
 from alist_sdk.err import AlistError
 from alist_sdk.py312_pathlib import PurePosixPath
 from alist_sdk.client import Client
+from alist_sdk.tracing import traced, trace_span
 
 
 class AlistServer(BaseModel):
@@ -170,6 +171,7 @@ class AlistPath(PureAlistPath):
     def as_download_uri(self):
         return self.get_download_uri()
 
+    @traced
     def raw_stat(self, retry=1, timeout=0.1) -> RawItem:
         try:
             _raw = self.client.get_item_info(self.as_posix())
@@ -185,10 +187,14 @@ class AlistPath(PureAlistPath):
             raise AlistError(_raw.message)
         except FileNotFoundError as _e:
             if retry > 0:
-                time.sleep(timeout)
-                return self.raw_stat(retry - 1)
+                if self.client.metrics is not None:
+                    self.client.metrics.on_retry("/api/fs/get")
+                with trace_span(self.client.tracer, "retry", remaining=retry):
+                    time.sleep(timeout)
+                    return self.raw_stat(retry - 1)
             raise _e
 
+    @traced
     def stat(self) -> Item | RawItem:
         def f_stat() -> Item | RawItem:
             _r = (
@@ -208,10 +214,11 @@ class AlistPath(PureAlistPath):
 
         return f_stat()
 
-    def set_stat(self, value: RawItem | Item):
+    def set_stat(self, value: RawItem | Item | SearchItem):
         # noinspection PyAttributeOutsideInit
         self._stat = value
 
+    @traced
     def re_stat(self, retry=2, timeout=1) -> Item:
         if hasattr(self, "_stat"):
             delattr(self, "_stat")
@@ -220,15 +227,19 @@ class AlistPath(PureAlistPath):
 
     def is_dir(self):
         """"""
+        _stat = getattr(self, "_stat", None)
+        if isinstance(_stat, SearchItem):
+            return _stat.is_dir
         return self.stat().is_dir
 
     def is_file(self):
         """"""
-        return not self.stat().is_dir
+        return not self.is_dir()
 
     def is_link(self):
         raise NotImplementedError("AlistPath不支持连接.")
 
+    @traced
     def exists(self):
         """"""
         try:
@@ -248,6 +259,26 @@ class AlistPath(PureAlistPath):
             _.set_stat(item)
             yield _
 
+    def search(
+        self, keyword: str, scope: SearchScopeModify = 0, per_page: int = 100
+    ) -> Iterator["AlistPath"]:
+        """在当前目录下搜索，流式返回结果
+
+        使用服务端搜索索引分页获取，未开启索引时回退到并发遍历。
+        结果已设置stat，is_dir()/is_file() 无需再次请求。
+
+        :param keyword: 关键字
+        :param scope: 搜索类型	0-全部 1-文件夹 2-文件
+        :param per_page: 每页数量
+        """
+        for item in self.client.iter_search(
+            self.as_posix(), keyword, scope, per_page=per_page
+        ):
+            _ = self.with_segments(self.drive + item.full_name.as_posix())
+            _.set_stat(item)
+            yield _
+
+    @traced
     def read_text(self):
         """"""
         return self.client.get(
@@ -256,6 +287,7 @@ class AlistPath(PureAlistPath):
             headers={"authorization": ""},
         ).text
 
+    @traced
     def read_bytes(self):
         """"""
         return self.client.get(
@@ -264,10 +296,12 @@ class AlistPath(PureAlistPath):
             headers={"authorization": ""},
         ).content
 
+    @traced
     def write_text(self, data: str, as_task=False):
         """"""
         return self.write_bytes(data.encode(), as_task=as_task)
 
+    @traced
     def write_bytes(self, data: bytes | Path, as_task=False):
         """"""
 
@@ -276,6 +310,7 @@ class AlistPath(PureAlistPath):
             return self.re_stat()
         raise AlistError()
 
+    @traced
     def mkdir(self, parents=False, exist_ok=False):
         """"""
         if self.exists():
@@ -288,12 +323,14 @@ class AlistPath(PureAlistPath):
 
         return self.client.mkdir(self.as_posix())
 
+    @traced
     def touch(self, exist_ok=True):
         """"""
         if not exist_ok and self.exists():
             raise FileExistsError(f"文件已存在: {self.as_posix()}")
         return self.write_bytes(b"", as_task=False)
 
+    @traced
     def unlink(self, missing_ok=False):
         """"""
         if not self.exists():
@@ -304,6 +341,7 @@ class AlistPath(PureAlistPath):
         if _data.code != 200:
             raise AlistError(_data.message)
 
+    @traced
     def rmdir(self, missing_ok=False):
         """目前remove_empty_directory接口不生效"""
         if not self.is_dir():
@@ -313,6 +351,7 @@ class AlistPath(PureAlistPath):
 
         return self.unlink(missing_ok=missing_ok)
 
+    @traced
     def rename(self, target: "AlistPath"):
         """"""
         if self == target:
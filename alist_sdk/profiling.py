@@ -0,0 +1,226 @@
+"""SDK热点路径的性能分析
+
+启用方式（全局生效，进程退出时输出结果）：
+    ALIST_SDK_PROFILE=1 python job.py                 # 汇总表输出到stderr
+    ALIST_SDK_PROFILE=prof.folded python job.py       # 折叠栈，可以直接用 flamegraph.pl / speedscope 打开
+    ALIST_SDK_PROFILE=prof.txt python job.py          # 汇总表写入文件
+或者 Client(..., profile=True) / Client(..., profile="prof.folded")，也可以在代码中：
+>>> from alist_sdk import profiling
+>>> profiler = profiling.enable()
+>>> ...
+>>> print(profiler.render_summary())
+>>> profiling.disable()
+
+记录的层次：
+    Client.<方法>        接口方法的总耗时
+    semaphore           等待并发信号量（max_connect）
+    network             httpx发送请求和读取响应
+    verify              Verify._verify，其中 json 为解析响应，validate 为pydantic校验
+    path.parse          AlistPath 解析路径，其中 path.splitroot 为 alistpath.splitroot
+每一层的自身耗时不包含子层，可以据此判断任务是网络瓶颈还是消耗在SDK的CPU上。
+
+各层在进入和退出时计时（而不是定时采样），父子关系由 contextvars 维护，因此在 asyncio 中同样适用；
+ThreadPoolExecutor 中的工作线程不继承上下文，其中的Client方法为新的根。
+未启用时各处只多一次全局变量判断；路径解析调用非常频繁，只在启用时替换为计时版本。
+"""
+import atexit
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Iterator
+
+__all__ = [
+    "Profiler",
+    "PROFILE_ENV",
+    "enable",
+    "disable",
+    "get_profiler",
+    "profile_section",
+]
+
+PROFILE_ENV = "ALIST_SDK_PROFILE"
+
+_NULL = nullcontext()
+
+
+class _Frame:
+    __slots__ = ("stack", "child")
+
+    def __init__(self, name: str, parent: "_Frame | None"):
+        self.stack = (*parent.stack, name) if parent else (name,)
+        self.child = 0.0  # 子层的耗时
+
+
+_current_frame: contextvars.ContextVar["_Frame | None"] = contextvars.ContextVar(
+    "alist_sdk_profile_frame", default=None
+)
+
+
+class Profiler:
+    """按照调用栈聚合各层的耗时，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._patched: list[tuple[object, str, object]] = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls: dict[tuple, int] = defaultdict(int)
+            self.total: dict[tuple, float] = defaultdict(float)  # 包含子层
+            self.self_time: dict[tuple, float] = defaultdict(float)
+            self.started = time.perf_counter()
+
+    def _record(self, stack: tuple, total: float, self_time: float):
+        with self._lock:
+            self.calls[stack] += 1
+            self.total[stack] += total
+            self.self_time[stack] += self_time
+
+    @contextmanager
+    def section(self, name: str):
+        parent = _current_frame.get()
+        frame = _Frame(name, parent)
+        token = _current_frame.set(frame)
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - begin
+            _current_frame.reset(token)
+            self._record(frame.stack, elapsed, elapsed - frame.child)
+            if parent is not None:
+                parent.child += elapsed
+
+    def add(self, name: str, seconds: float):
+        """记录一个已经计时的子层，例如信号量等待"""
+        parent = _current_frame.get()
+        self._record(_Frame(name, parent).stack, seconds, seconds)
+        if parent is not None:
+            parent.child += seconds
+
+    def wrap(self, name: str, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.section(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def install(self):
+        """把路径解析替换为计时版本"""
+        from alist_sdk import alistpath, py312_pathlib
+
+        for owner, attr, name in [
+            (alistpath, "splitroot", "path.splitroot"),
+            (py312_pathlib.PurePath, "_load_parts", "path.parse"),
+        ]:
+            original = getattr(owner, attr)
+            setattr(owner, attr, self.wrap(name, original))
+            self._patched.append((owner, attr, original))
+
+    def uninstall(self):
+        while self._patched:
+            owner, attr, original = self._patched.pop()
+            setattr(owner, attr, original)
+
+    def summary(self) -> list[tuple[str, int, float, float]]:
+        """按层汇总 [(层, 次数, 总耗时, 自身耗时)]，按自身耗时降序"""
+        res: dict[str, list] = defaultdict(lambda: [0, 0.0, 0.0])
+        with self._lock:
+            for stack, calls in self.calls.items():
+                r = res[stack[-1]]
+                r[0] += calls
+                # 同名的层嵌套时只计算最外层的总耗时
+                if stack[-1] not in stack[:-1]:
+                    r[1] += self.total[stack]
+                r[2] += self.self_time[stack]
+        rows = [(name, c, t, s) for name, (c, t, s) in res.items()]
+        return sorted(rows, key=lambda r: r[3], reverse=True)
+
+    def render_summary(self) -> str:
+        rows = self.summary()
+        elapsed = time.perf_counter() - self.started
+        self_total = sum(r[3] for r in rows) or 1
+        lines = [
+            f"alist-sdk profile: {elapsed:.3f}s since enabled",
+            f"{'section':<40}{'calls':>10}{'total s':>12}{'self s':>12}{'self %':>8}",
+        ]
+        for name, calls, total, self_time in rows:
+            lines.append(
+                f"{name:<40}{calls:>10}{total:>12.4f}{self_time:>12.4f}"
+                f"{self_time / self_total * 100:>7.1f}%"
+            )
+        return "\n".join(lines) + "\n"
+
+    def collapsed(self) -> Iterator[str]:
+        """折叠栈格式（flamegraph.pl），数值为自身耗时的微秒数"""
+        with self._lock:
+            items = sorted(self.self_time.items())
+        for stack, seconds in items:
+            if (us := round(seconds * 1e6)) > 0:
+                yield f"{';'.join(stack)} {us}"
+
+    def dump(self, output: str | Path | None = None):
+        """output 以 .folded / .collapsed 结尾时写入折叠栈，其他写入汇总表，None 输出到stderr"""
+        if output is None:
+            sys.stderr.write(self.render_summary())
+            return
+        if str(output).endswith((".folded", ".collapsed")):
+            text = "".join(line + "\n" for line in self.collapsed())
+        else:
+            text = self.render_summary()
+        Path(output).write_text(text, encoding="utf-8")
+
+
+_active: Profiler | None = None
+_output: str | Path | None = None
+
+
+def get_profiler() -> Profiler | None:
+    return _active
+
+
+def profile_section(name: str):
+    """未启用时返回空的上下文管理器"""
+    if _active is None:
+        return _NULL
+    return _active.section(name)
+
+
+def _dump_at_exit():
+    if _active is not None:
+        _active.dump(_output)
+
+
+def enable(output: str | Path | None = None) -> Profiler:
+    """启用全局profiler，进程退出时输出到output；已经启用时返回当前的profiler"""
+    global _active, _output
+    if _active is None:
+        _active = Profiler()
+        _active.install()
+        _output = output
+        atexit.register(_dump_at_exit)
+    elif output is not None:
+        _output = output
+    return _active
+
+
+def disable() -> Profiler | None:
+    """停用并返回当前的profiler，退出时不再输出"""
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.uninstall()
+        atexit.unregister(_dump_at_exit)
+    return profiler
+
+
+if _env := os.environ.get(PROFILE_ENV):
+    enable(None if _env.lower() in ("1", "true", "stderr") else _env)
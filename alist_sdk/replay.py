@@ -0,0 +1,277 @@
+"""请求录制与回放
+
+录制：
+>>> from alist_sdk import Client
+>>> client = Client("http://localhost:5244", token="...", record="traffic.jsonl.gz")
+>>> ...
+>>> client.close()  # 关闭客户端时写入并关闭录制文件
+
+回放（不需要服务端，响应按照录制时的耗时返回，speed=2 为2倍速，speed=0 不等待）：
+>>> from alist_sdk.replay import ReplayTransport
+>>> client = Client("http://mock", token="...", transport=ReplayTransport.load("traffic.jsonl.gz"))
+
+录制文件每行一个请求（以 .gz 结尾时使用gzip压缩），包含请求开始的相对时间 t、耗时 elapsed、
+method、url（路径和查询参数，不含主机）、请求体的sha1、响应状态码、响应头和响应体。
+回放时按照 (method, url, 请求体) 匹配，找不到时再只按照 (method, url) 匹配；
+同一请求有多条录制时依次返回，用完后循环。没有匹配的录制时抛出 ReplayMiss。
+
+录制时响应体会完整读入内存；超过 max_body 的请求体或响应体只记录大小，回放时以 \\0 填充。
+/api/auth/* 和 /api/me 的请求体和响应体包含密码、token等凭据，只记录大小（redacted），回放时为空。
+
+普通文件每条录制写入后立即flush；gzip文件在关闭时才写入完整的压缩流，
+未调用close时由对象回收或进程退出时的finalizer关闭，进程被强制结束时gzip文件中的录制会丢失。
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import httpx
+
+__all__ = [
+    "RecordingTransport",
+    "ReplayTransport",
+    "ReplayMiss",
+    "load_records",
+    "save_records",
+    "decode_body",
+    "iter_requests",
+]
+
+# 响应体已经解码，这些头不能原样回放
+_SKIP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class ReplayMiss(httpx.TransportError):
+    """没有匹配的录制"""
+
+
+def _open(file: str | Path, mode: str):
+    if str(file).endswith(".gz"):
+        return gzip.open(file, mode + "t", encoding="utf-8")
+    return Path(file).open(mode, encoding="utf-8")
+
+
+def load_records(file: str | Path) -> list[dict]:
+    with _open(file, "r") as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+def save_records(file: str | Path, records: Iterable[dict]):
+    with _open(file, "w") as fp:
+        for r in records:
+            fp.write(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def _url_key(url: httpx.URL) -> str:
+    return url.raw_path.decode("ascii")
+
+
+def _sha1(body: bytes | None) -> str:
+    return hashlib.sha1(body).hexdigest()[:16] if body else ""
+
+
+def _encode_body(body: bytes | None, max_body: int) -> dict:
+    if not body:
+        return {}
+    if len(body) > max_body:
+        return {"size": len(body)}
+    try:
+        return {"text": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(body).decode("ascii")}
+
+
+def _redacted(url: str) -> bool:
+    """请求体和响应体包含凭据（密码、token、用户信息）的接口"""
+    path = url.split("?", 1)[0].rstrip("/")
+    return path == "/api/me" or path.startswith("/api/auth/")
+
+
+def _redact_body(body: bytes | None) -> dict:
+    return {"redacted": len(body)} if body else {}
+
+
+def decode_body(data: dict | None) -> bytes:
+    """_encode_body 的逆操作，只记录了大小的内容以 \\0 填充，脱敏的内容为空"""
+    if not data or "redacted" in data:
+        return b""
+    if "text" in data:
+        return data["text"].encode("utf-8")
+    if "b64" in data:
+        return base64.b64decode(data["b64"])
+    return b"\0" * data.get("size", 0)
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """包装真实的transport，把每个请求和响应追加到录制文件"""
+
+    def __init__(self, transport, file: str | Path, max_body: int = 1024 * 1024):
+        self.transport = transport
+        self.max_body = max_body
+        self._fp = _open(file, "a")
+        # gzip需要关闭时写入结尾，每条flush会降低压缩率；未close时由finalizer关闭
+        self._flush = not str(file).endswith(".gz")
+        self._finalizer = weakref.finalize(self, self._fp.close)
+        self._lock = threading.Lock()
+        self._begin = time.perf_counter()
+
+    def _request_body(self, request: httpx.Request) -> bytes | None:
+        try:
+            return request.content
+        except httpx.RequestNotRead:  # 流式上传，不读取
+            return None
+
+    def _record(self, request, body, start, response: httpx.Response):
+        url = _url_key(request.url)
+        if _redacted(url):
+            # 请求体的sha1同样可以用来验证密码，一并去掉
+            sha1, req, resp = "", _redact_body(body), _redact_body(response.content)
+        else:
+            sha1 = _sha1(body)
+            req = _encode_body(body, self.max_body)
+            resp = _encode_body(response.content, self.max_body)
+        record = {
+            "t": round(start - self._begin, 6),
+            "elapsed": round(time.perf_counter() - start, 6),
+            "method": request.method,
+            "url": url,
+            "sha1": sha1,
+            "request": req,
+            "status": response.status_code,
+            "headers": [
+                [k, v]
+                for k, v in response.headers.items()
+                if k.lower() not in _SKIP_HEADERS
+            ],
+            "response": resp,
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._fp.write(line + "\n")
+            if self._flush:
+                self._fp.flush()
+
+    def _rebuild(self, response: httpx.Response) -> httpx.Response:
+        """响应体已经读取，重新构造一个不依赖底层连接的响应"""
+        return httpx.Response(
+            response.status_code,
+            headers=[
+                (k, v)
+                for k, v in response.headers.items()
+                if k.lower() not in _SKIP_HEADERS
+            ],
+            content=response.content,
+            extensions=response.extensions,
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = self._request_body(request)
+        start = time.perf_counter()
+        response = self.transport.handle_request(request)
+        try:
+            response.read()
+        finally:
+            response.close()
+        self._record(request, body, start, response)
+        return self._rebuild(response)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = self._request_body(request)
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        self._record(request, body, start, response)
+        return self._rebuild(response)
+
+    def _close_file(self):
+        with self._lock:
+            self._finalizer()
+
+    def close(self):
+        self._close_file()
+        self.transport.close()
+
+    async def aclose(self):
+        self._close_file()
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """按照录制的响应和耗时返回，同时支持同步和异步客户端"""
+
+    def __init__(self, records: Iterable[dict], speed: float = 1.0):
+        """
+        :param speed: 回放速度倍数，0 为不等待
+        """
+        self.speed = speed
+        self.records = list(records)
+        self._exact: dict[tuple, list[dict]] = {}
+        self._loose: dict[tuple, list[dict]] = {}
+        self._served: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        for r in self.records:
+            self._exact.setdefault((r["method"], r["url"], r["sha1"]), []).append(r)
+            self._loose.setdefault((r["method"], r["url"]), []).append(r)
+
+    @classmethod
+    def load(cls, file: str | Path, speed: float = 1.0) -> "ReplayTransport":
+        return cls(load_records(file), speed=speed)
+
+    def match(self, request: httpx.Request) -> dict:
+        try:
+            body = request.content
+        except httpx.RequestNotRead:
+            body = None
+        url = _url_key(request.url)
+        for index, key in [
+            (self._exact, (request.method, url, _sha1(body))),
+            (self._loose, (request.method, url)),
+        ]:
+            if records := index.get(key):
+                with self._lock:
+                    n = self._served.get(key, 0)
+                    self._served[key] = n + 1
+                return records[n % len(records)]
+        raise ReplayMiss(f"没有匹配的录制: {request.method} {url}", request=request)
+
+    def delay(self, record: dict) -> float:
+        return record["elapsed"] / self.speed if self.speed else 0.0
+
+    @staticmethod
+    def _response(record: dict) -> httpx.Response:
+        return httpx.Response(
+            record["status"],
+            headers=record["headers"],
+            content=decode_body(record.get("response")),
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        record = self.match(request)
+        if delay := self.delay(record):
+            time.sleep(delay)
+        return self._response(record)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        record = self.match(request)
+        if delay := self.delay(record):
+            await asyncio.sleep(delay)
+        return self._response(record)
+
+
+def iter_requests(records: Iterable[dict]) -> Iterator[tuple[str, str, bytes]]:
+    """按照录制顺序返回 (method, url, content)，用于重新发起录制的请求"""
+    for r in sorted(records, key=lambda r: r["t"]):
+        yield r["method"], r["url"], decode_body(r.get("request"))
@@ -1,6 +1,11 @@
 from alist_sdk import Client
 from alist_sdk.tools.models import Configs
-from alist_sdk.tools.configs import export_configs, import_configs_from_dict
+from alist_sdk.tools.configs import (
+    export_configs,
+    export_configs_to_jsonl,
+    import_configs_from_dict,
+    import_configs_from_jsonl,
+)
 
 
 class ExtraClient(Client):
@@ -10,9 +15,15 @@ class ExtraClient(Client):
     def export_config_json(self) -> str:
         return self.export_configs().model_dump_json(indent=2)
 
+    def export_config_jsonl(self, jsonl_file) -> int:
+        return export_configs_to_jsonl(self, jsonl_file)
+
     def import_configs(self, configs):
         return import_configs_from_dict(self, configs)
 
+    def import_configs_jsonl(self, jsonl_file, resume=True):
+        return import_configs_from_jsonl(self, jsonl_file, resume=resume)
+
     def import_config_from_other_client(
         self,
         base_url,
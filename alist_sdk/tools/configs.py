@@ -1,10 +1,19 @@
+import itertools
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator
 
-from alist_sdk.models import Resp, Storage
+from alist_sdk.err import AlistError
+from alist_sdk.models import Storage
 from alist_sdk.client import Client
-from alist_sdk.tools.models import Configs
+from alist_sdk.tools.models import (
+    Configs,
+    ConfigChange,
+    ConfigImportRecord,
+    ConfigImportResult,
+)
 
 logger = logging.getLogger("alist-sdk.tools")
 
@@ -15,44 +24,83 @@ __all__ = [
     "export_configs",
     "export_configs_to_dict",
     "export_configs_to_json",
+    "export_configs_to_jsonl",
+    "iter_configs_jsonl",
+    "import_configs_from_jsonl",
+    "diff_configs",
+    "apply_config_changes",
+    "sync_configs",
 ]
 
 
-def __printf(key, data, res: Resp):
-    """记录"""
-    name = (
-        ""
-        if isinstance(data, list)
-        else (data.get("mount_path") or data.get("path") or data.get("username"))
+# 导入顺序：同一组内并发，前一组全部完成后再导入下一组
+IMPORT_GROUPS = [["settings"], ["storages"], ["metas", "users"]]
+
+IMPORT_APIS = {
+    "settings": "/api/admin/setting/save",
+    "users": "/api/admin/user/create",
+    "storages": "/api/admin/storage/create",
+    "metas": "/api/admin/meta/create",
+}
+
+
+def _config_name(data: dict | list) -> str:
+    if isinstance(data, list):
+        return ""
+    return str(data.get("mount_path") or data.get("path") or data.get("username"))
+
+
+def _import_one(client: Client, key: str, data: dict | list) -> ConfigImportRecord:
+    res = client.verify_request("POST", IMPORT_APIS[key], json=data)
+    record = ConfigImportRecord(
+        key=key, name=_config_name(data), code=res.code, message=res.message
     )
     if res.code == 200:
-        print(f"created {key} [{name}]")
+        logger.info("created %s [%s]", key, record.name)
     else:
-        print(f"Error: {key} [{name}]: {res.code}: {res.message}")
+        logger.error("Error: %s [%s]: %d: %s", key, record.name, res.code, res.message)
+    return record
 
 
-def import_configs_from_dict(client: Client, configs: dict):
-    """从JSON中导入配置"""
-    apis = {
-        "settings": "/api/admin/setting/save",
-        "users": "/api/admin/user/create",
-        "storages": "/api/admin/storage/create",
-        "metas": "/api/admin/meta/create",
-    }
+def import_configs_from_dict(
+    client: Client, configs: dict, max_workers: int = 10
+) -> ConfigImportResult:
+    """从JSON中导入配置
 
-    for k, vs in configs.items():
-        if k == "settings":
-            res = client.verify_request("POST", apis[k], json=vs)
-            __printf(k, vs, res)
-            continue
-        else:
-            for v in vs:
-                v: dict
-                if k == "storages" and v.get("driver", "") == "Local":
+    按照 settings -> storages -> metas, users 的顺序分组导入，组内并发。
+    本地存储和全部的id会被忽略。
+
+    :param client: 目标客户端
+    :param configs: Configs.model_dump(mode="json") 格式的字典
+    :param max_workers: 组内并发数（仍受max_connect限制）
+    """
+    result = ConfigImportResult()
+    unknown = configs.keys() - IMPORT_APIS.keys()
+    if unknown:
+        logger.warning("忽略未知的配置类型: %s", unknown)
+
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="alist-config") as pool:
+        for group in IMPORT_GROUPS:
+            jobs = []
+            for k in group:
+                if k not in configs:
                     continue
-                v.pop("id", None)
-                res = client.verify_request("POST", apis[k], json=v)
-                __printf(k, v, res)
+                if k == "settings":
+                    jobs.append((k, configs[k]))
+                    continue
+                for v in configs[k]:
+                    v: dict
+                    if k == "storages" and v.get("driver", "") == "Local":
+                        result.skipped.append(
+                            ConfigImportRecord(
+                                key=k, name=_config_name(v), code=0, message="Local"
+                            )
+                        )
+                        continue
+                    jobs.append((k, {_k: _v for _k, _v in v.items() if _k != "id"}))
+
+            result.records.extend(pool.map(lambda job: _import_one(client, *job), jobs))
+    return result
 
 
 def import_configs_from_json_str(client, json_data: str):
@@ -68,14 +116,26 @@ def import_configs_from_json_file(client, json_file):
 
 
 def export_configs(client: Client) -> Configs:
-    """"""
-    apis = {
-        "settings": client.admin_setting_list().data,
-        "users": client.admin_user_list().data.content,
-        "storages": client.admin_storage_list().data.content,
-        "metas": client.admin_meta_list().data.content,
-    }
-    return Configs(**apis)
+    """并发请求4个列表接口，导出配置"""
+    with ThreadPoolExecutor(4, thread_name_prefix="alist-config") as pool:
+        settings, users, storages, metas = pool.map(
+            lambda f: f(),
+            [
+                client.admin_setting_list,
+                client.admin_user_list,
+                client.admin_storage_list,
+                client.admin_meta_list,
+            ],
+        )
+    for res in (settings, users, storages, metas):
+        if res.code != 200:
+            raise AlistError(f"导出配置失败: {res.code}: {res.message}")
+    return Configs(
+        settings=settings.data,
+        users=users.data.content or [],
+        storages=storages.data.content or [],
+        metas=metas.data.content or [],
+    )
 
 
 def export_configs_to_dict(client: Client, *args, **kwargs) -> dict:
@@ -86,8 +146,156 @@ def export_configs_to_json(client: Client, *args, **kwargs) -> str:
     return export_configs(client).model_dump_json(*args, **kwargs)
 
 
+# ================ JSON Lines =================
+# 每行一个对象: {"key": "storages", "data": {...}}，按照IMPORT_GROUPS的顺序写入，
+# 导入时可以逐行读取，不需要将整个文档读入内存。
+
+
+def _iter_pages(list_api, per_page: int) -> Iterator[list]:
+    """分页请求admin列表接口，每页返回后立即产出该页的对象"""
+    page = 1
+    while True:
+        res = list_api(page=page, per_page=per_page)
+        if res.code != 200:
+            raise AlistError(f"导出配置失败: {res.code}: {res.message}")
+        content = res.data.content or []
+        if content:
+            yield content
+        if not content or page * per_page >= res.data.total:
+            return
+        page += 1
+
+
+def export_configs_to_jsonl(
+    client: Client, jsonl_file: str | Path, per_page: int = 100
+) -> int:
+    """将配置逐个对象写入JSON Lines文件，返回写入的行数
+
+    存储、元信息、用户分页请求，每页返回后立即写入，不在内存中构造完整的Configs。
+
+    :param per_page: 列表接口每页的数量
+    """
+    list_apis = {
+        "storages": client.admin_storage_list,
+        "metas": client.admin_meta_list,
+        "users": client.admin_user_list,
+    }
+    lines = 0
+    with Path(jsonl_file).open("w", encoding="utf-8") as fp:
+        for key in itertools.chain(*IMPORT_GROUPS):
+            if key == "settings":
+                res = client.admin_setting_list()
+                if res.code != 200:
+                    raise AlistError(f"导出配置失败: {res.code}: {res.message}")
+                pages = [res.data]
+            else:
+                pages = _iter_pages(list_apis[key], per_page)
+            for page in pages:
+                for obj in page:
+                    fp.write('{"key":"%s","data":%s}\n' % (key, obj.model_dump_json()))
+                    lines += 1
+    logger.info("导出配置 %d 行: %s", lines, jsonl_file)
+    return lines
+
+
+def iter_configs_jsonl(
+    jsonl_file: str | Path, start: int = 0
+) -> Iterator[tuple[int, str, dict]]:
+    """逐行读取JSON Lines配置文件，产出 (行号, key, data)，行号从1开始
+
+    格式错误的行抛出 ValueError，错误信息中包含文件名和行号；
+    未知的key原样产出，由调用方决定如何处理。
+
+    :param start: 跳过前start行
+    """
+    with Path(jsonl_file).open(encoding="utf-8") as fp:
+        for lineno, line in enumerate(fp, 1):
+            if lineno <= start or not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+                key, data = obj["key"], obj["data"]
+            except (ValueError, KeyError, TypeError) as _e:
+                raise ValueError(
+                    f"{jsonl_file}:{lineno}: 配置行格式错误: {_e!r}"
+                ) from _e
+            yield lineno, key, data
+
+
+def import_configs_from_jsonl(
+    client: Client,
+    jsonl_file: str | Path,
+    resume: bool = True,
+    state_file: str | Path = None,
+    max_workers: int = 10,
+    batch_size: int = 100,
+) -> ConfigImportResult:
+    """逐行导入JSON Lines配置文件，支持中断后继续
+
+    每完成一批（同一个key最多batch_size行，批内并发）就将已处理的行号写入状态文件；
+    再次导入时从该行之后继续。中断时正在执行的一批会被重新导入，
+    已存在的对象将返回错误。全部完成后删除状态文件。
+
+    :param client: 目标客户端
+    :param jsonl_file: export_configs_to_jsonl 导出的文件
+    :param resume: 是否从状态文件记录的位置继续
+    :param state_file: 状态文件，默认为 <jsonl_file>.progress
+    :param max_workers: 批内并发数
+    :param batch_size: 每批的最大行数
+    """
+    state_file = Path(state_file or f"{jsonl_file}.progress")
+    start = 0
+    if resume and state_file.exists():
+        start = json.loads(state_file.read_text())["line"]
+        logger.info("从第 %d 行之后继续导入: %s", start, jsonl_file)
+
+    result = ConfigImportResult()
+    group_of = {k: i for i, g in enumerate(IMPORT_GROUPS) for k in g}
+
+    def _known(row: tuple[int, str, dict]) -> bool:
+        lineno, key, _ = row
+        if key in group_of:
+            return True
+        logger.warning("第 %d 行: 忽略未知的配置类型: %s", lineno, key)
+        result.skipped.append(
+            ConfigImportRecord(
+                key=str(key), name=f"line {lineno}", code=0, message="未知的配置类型"
+            )
+        )
+        return False
+
+    rows = filter(_known, iter_configs_jsonl(jsonl_file, start))
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="alist-config") as pool:
+        # 同一组连续的行才会放进同一批，保证前一组完成后再导入下一组
+        for _, batch in itertools.groupby(rows, key=lambda r: group_of[r[1]]):
+            for chunk in iter(lambda: list(itertools.islice(batch, batch_size)), []):
+                _import_chunk(client, pool, chunk, result)
+                state_file.write_text(json.dumps({"line": chunk[-1][0]}))
+    state_file.unlink(missing_ok=True)
+    return result
+
+
+def _import_chunk(client: Client, pool, chunk: list, result: ConfigImportResult):
+    jobs = []
+    settings = [data for _, key, data in chunk if key == "settings"]
+    if settings:
+        jobs.append(("settings", settings))
+    for _, key, data in chunk:
+        if key == "settings":
+            continue
+        if key == "storages" and data.get("driver", "") == "Local":
+            result.skipped.append(
+                ConfigImportRecord(
+                    key=key, name=_config_name(data), code=0, message="Local"
+                )
+            )
+            continue
+        jobs.append((key, {_k: _v for _k, _v in data.items() if _k != "id"}))
+    result.records.extend(pool.map(lambda job: _import_one(client, *job), jobs))
+
+
 def copy_configs(source_client: Client, target_client: Client):
-    """"""
+    """全量复制配置，已存在的对象会导入失败，增量同步请使用sync_configs"""
     return import_configs_from_dict(
         target_client,
         export_configs_to_dict(source_client),
@@ -95,7 +303,7 @@ def copy_configs(source_client: Client, target_client: Client):
 
 
 def copy_storages(source_client: Client, target_client: Client, *storage_names):
-    """"""
+    """全量复制存储，增量同步请使用sync_configs"""
     storages: list[Storage] = source_client.admin_storage_list().data.content
     if not storage_names:
         storage_names = [_.mount_path.strip("/") for _ in storages]
@@ -103,3 +311,158 @@ def copy_storages(source_client: Client, target_client: Client, *storage_names):
         if _s.mount_path.strip("/") not in storage_names:
             continue
         target_client.admin_storage_create(_s)
+
+
+# ================ 增量同步 =================
+
+# 配置对象在两个服务器之间的唯一键
+SYNC_KEYS = {
+    "settings": "key",
+    "storages": "mount_path",
+    "users": "username",
+    "metas": "path",
+}
+# 由服务器生成的字段，不参与比较
+_SYNC_EXCLUDE = {"id", "modified", "status"}
+
+
+def _sync_items(configs: Configs, key: str) -> dict[str, dict]:
+    items = {}
+    for obj in getattr(configs, key):
+        data = obj.model_dump(mode="json")
+        if key == "storages" and data["driver"] == "Local":
+            continue
+        items[str(data[SYNC_KEYS[key]])] = data
+    return items
+
+
+def _same(a: dict, b: dict) -> bool:
+    return all(a.get(k) == b.get(k) for k in a.keys() - _SYNC_EXCLUDE)
+
+
+def diff_configs(
+    source: Configs, target: Configs, delete: bool = False
+) -> list[ConfigChange]:
+    """计算将target同步为source需要的变更
+
+    对象按照 Setting.key, Storage.mount_path, User.username, Meta.path 匹配，
+    id, modified, status 不参与比较。本地存储被忽略，settings不会被删除。
+
+    :param source: 源服务器的配置
+    :param target: 目标服务器的配置
+    :param delete: 是否删除目标服务器上多余的对象
+    """
+    changes = []
+    for key in SYNC_KEYS:
+        src, dst = _sync_items(source, key), _sync_items(target, key)
+        for name, data in src.items():
+            old = dst.get(name)
+            if old is None:
+                changes.append(
+                    ConfigChange(key=key, action="create", name=name, data=data)
+                )
+            elif not _same(data, old):
+                changes.append(
+                    ConfigChange(
+                        key=key,
+                        action="update",
+                        name=name,
+                        data=data,
+                        target_id=old.get("id"),
+                    )
+                )
+        if delete and key != "settings":
+            changes.extend(
+                ConfigChange(key=key, action="delete", name=name, target_id=old["id"])
+                for name, old in dst.items()
+                if name not in src
+            )
+    return changes
+
+
+def _apply_one(client: Client, change: ConfigChange) -> ConfigImportRecord:
+    api = change.key[:-1]  # storages -> storage
+    data = {k: v for k, v in change.data.items() if k != "id"}
+    if change.action == "create":
+        res = client.verify_request("POST", IMPORT_APIS[change.key], json=data)
+    elif change.action == "delete" and change.key == "storages":
+        res = client.admin_storage_delete(change.target_id)
+    elif change.action == "delete":
+        res = client.verify_request(
+            "POST", f"/api/admin/{api}/delete", params={"id": change.target_id}
+        )
+    elif change.key == "storages":
+        res = client.admin_storage_update(dict(data, id=change.target_id))
+    else:
+        res = client.verify_request(
+            "POST", f"/api/admin/{api}/update", json=dict(data, id=change.target_id)
+        )
+    return _change_record(change, res.code, res.message)
+
+
+def _change_record(change: ConfigChange, code: int, message: str):
+    if code == 200:
+        logger.info("%s %s [%s]", change.action, change.key, change.name)
+    else:
+        logger.error(
+            "Error: %s %s [%s]: %d: %s",
+            change.action,
+            change.key,
+            change.name,
+            code,
+            message,
+        )
+    return ConfigImportRecord(
+        key=change.key,
+        name=change.name,
+        code=code,
+        message=message,
+        action=change.action,
+    )
+
+
+def apply_config_changes(
+    client: Client, changes: list[ConfigChange], max_workers: int = 10
+) -> ConfigImportResult:
+    """在目标服务器上执行diff_configs计算出的变更
+
+    按照IMPORT_GROUPS的顺序分组执行，组内并发；settings 的变更合并为一次保存请求。
+    """
+    result = ConfigImportResult()
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="alist-config") as pool:
+        for group in IMPORT_GROUPS:
+            _changes = [c for c in changes if c.key in group]
+            settings = [c for c in _changes if c.key == "settings"]
+            if settings:
+                res = client.verify_request(
+                    "POST", IMPORT_APIS["settings"], json=[c.data for c in settings]
+                )
+                result.records.extend(
+                    _change_record(c, res.code, res.message) for c in settings
+                )
+            result.records.extend(
+                pool.map(
+                    lambda c: _apply_one(client, c),
+                    [c for c in _changes if c.key != "settings"],
+                )
+            )
+    return result
+
+
+def sync_configs(
+    source_client: Client,
+    target_client: Client,
+    delete: bool = False,
+    max_workers: int = 10,
+) -> ConfigImportResult:
+    """增量同步配置：只在目标服务器上创建、更新（和删除）有差异的对象
+
+    >>> result = sync_configs(primary, standby)
+    >>> result.failed
+    []
+    """
+    with ThreadPoolExecutor(2, thread_name_prefix="alist-config") as pool:
+        source, target = pool.map(export_configs, [source_client, target_client])
+    changes = diff_configs(source, target, delete=delete)
+    logger.info("配置差异: %d 个变更", len(changes))
+    return apply_config_changes(target_client, changes, max_workers=max_workers)
@@ -0,0 +1,287 @@
+"""本地路径索引
+
+将Alist挂载的目录树保存到本地SQLite（FTS5 trigram）索引中，后续通过本地查询代替远程遍历。
+再次更新时，修改时间未变化的目录直接沿用已有索引，不再重新列出。
+"""
+
+import logging
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from typing import Iterator
+
+from alist_sdk.client import Client
+from alist_sdk.models import Item, Resp, SearchScopeModify
+from alist_sdk.tools.models import IndexRecord, IndexUpdateResult
+
+logger = logging.getLogger("alist-sdk.tools.indexer")
+
+__all__ = ["PathIndex"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    server TEXT NOT NULL,
+    path TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (server, path)
+);
+CREATE INDEX IF NOT EXISTS items_parent ON items (server, parent);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts
+    USING fts5(path, content='items', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, path) VALUES (new.rowid, new.path);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, path)
+        VALUES ('delete', old.rowid, old.path);
+END;
+"""
+
+# 列出失败的目录写入该修改时间，下次更新时一定会重新列出
+_MTIME_FAILED = -1.0
+
+
+def _server_key(client: Client) -> str:
+    return str(client.base_url).rstrip("/")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def _item_hash(item: Item) -> str:
+    if item.hash_info is None:
+        return ""
+    return item.hash_info.md5 or item.hash_info.sha1 or ""
+
+
+class PathIndex:
+    """本地路径索引
+
+    >>> with PathIndex("index.db") as index:
+    ...     index.update(client, "/media")
+    ...     index.find(".mkv", scope=2)
+    """
+
+    def __init__(self, db_path: str | Path = ":memory:"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as _e:
+            # SQLite < 3.34 没有trigram分词器，回退到LIKE扫描
+            logger.warning("FTS5 trigram 不可用，使用LIKE查询: %s", _e)
+            self.fts = False
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ================ 更新 =================
+
+    def update(
+        self,
+        client: Client,
+        root: str | PurePosixPath = "/",
+        full: bool = False,
+        max_workers: int = 10,
+    ) -> IndexUpdateResult:
+        """遍历root并更新索引
+
+        增量更新时，修改时间与索引中一致的目录不再列出，其子树沿用已有索引。
+        因此只有当驱动会将修改时间向上传递时，深层的变化才能被发现，必要时使用full=True。
+
+        :param client: 客户端
+        :param root: 需要索引的目录
+        :param full: 重新列出全部目录
+        :param max_workers: 并发列出目录的线程数
+        """
+        start = time.time()
+        server = _server_key(client)
+        root = PurePosixPath(root)
+        result = IndexUpdateResult(server=server, root=root.as_posix())
+        old_dirs = dict(
+            self.conn.execute(
+                "SELECT path, mtime FROM items WHERE server = ? AND is_dir = 1",
+                (server,),
+            ).fetchall()
+        )
+        failed: list[PurePosixPath] = []
+
+        def descend(item: Item) -> bool:
+            if full:
+                return True
+            _old = old_dirs.get(item.full_name.as_posix())
+            if _old is not None and _old == item.modified.timestamp():
+                result.skipped += 1
+                return False
+            return True
+
+        def on_error(path: PurePosixPath, res: Resp):
+            logger.warning("列出目录失败[%d]: %s %s", res.code, path, res.message)
+            failed.append(path)
+
+        with self.conn:
+            for path, items in client.walk_items(
+                root, max_workers=max_workers, descend=descend, on_error=on_error
+            ):
+                self._replace_children(server, path.as_posix(), items)
+                result.listed += 1
+                result.items += len(items)
+
+            # 祖先目录的修改时间没有变化，同样需要标记，否则下次增量更新到不了失败的目录
+            stale = {
+                p.as_posix()
+                for path in failed
+                for p in (path, *path.parents)
+                if root in p.parents
+            }
+            self.conn.executemany(
+                "UPDATE items SET mtime = ? WHERE server = ? AND path = ?",
+                [(_MTIME_FAILED, server, p) for p in stale],
+            )
+        result.failed = len(failed)
+        result.seconds = time.time() - start
+        logger.info(
+            "索引更新完成 %s%s: 列出%d个目录, 跳过%d个, 失败%d个, %.2fs",
+            server,
+            result.root,
+            result.listed,
+            result.skipped,
+            result.failed,
+            result.seconds,
+        )
+        return result
+
+    def _replace_children(self, server: str, parent: str, items: list[Item]):
+        """用最新的列表替换一个目录的直接子项，已消失的子目录连同子树一起删除"""
+        new_names = {i.name for i in items}
+        for (name,) in self.conn.execute(
+            "SELECT name FROM items WHERE server = ? AND parent = ? AND is_dir = 1",
+            (server, parent),
+        ).fetchall():
+            if name not in new_names:
+                self._delete_tree(server, PurePosixPath(parent, name).as_posix())
+
+        self.conn.execute(
+            "DELETE FROM items WHERE server = ? AND parent = ?", (server, parent)
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    server,
+                    PurePosixPath(parent, i.name).as_posix(),
+                    parent,
+                    i.name,
+                    i.is_dir,
+                    i.size,
+                    i.modified.timestamp(),
+                    _item_hash(i),
+                )
+                for i in items
+            ],
+        )
+
+    def _delete_tree(self, server: str, path: str):
+        self.conn.execute(
+            "DELETE FROM items WHERE server = ? AND (path = ? OR path LIKE ? ESCAPE '!')",
+            (server, path, _escape_like(path) + "/%"),
+        )
+
+    def remove_server(self, server: str | Client):
+        """删除一个服务器的全部索引"""
+        if isinstance(server, Client):
+            server = _server_key(server)
+        with self.conn:
+            self.conn.execute("DELETE FROM items WHERE server = ?", (server,))
+
+    # ================ 查询 =================
+
+    def _query(
+        self, where: str, args: list, server, scope: SearchScopeModify, limit
+    ) -> Iterator[IndexRecord]:
+        sql = (
+            "SELECT i.server, i.path, i.is_dir, i.size, i.mtime, i.hash FROM items i "
+            + where
+        )
+        if server is not None:
+            sql += " AND i.server = ?"
+            args.append(_server_key(server) if isinstance(server, Client) else server)
+        if scope:
+            sql += " AND i.is_dir = ?"
+            args.append(1 if scope == 1 else 0)
+        sql += " ORDER BY i.server, i.path"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+
+        for _server, path, is_dir, size, mtime, _hash in self.conn.execute(sql, args):
+            yield IndexRecord(
+                server=_server,
+                path=path,
+                is_dir=is_dir,
+                size=size,
+                modified=datetime.fromtimestamp(max(mtime, 0), tz=timezone.utc),
+                hash=_hash,
+            )
+
+    def find(
+        self,
+        keyword: str,
+        server: str | Client = None,
+        scope: SearchScopeModify = 0,
+        limit: int = None,
+    ) -> Iterator[IndexRecord]:
+        """查找路径中包含keyword的对象（忽略大小写）
+
+        :param keyword: 关键字
+        :param server: 只查询该服务器
+        :param scope: 0-全部 1-文件夹 2-文件
+        :param limit: 最大数量
+        """
+        _like = "%" + _escape_like(keyword) + "%"
+        # 带有ESCAPE的LIKE不会使用trigram索引，只在需要时添加
+        _escape = " ESCAPE '!'" if _like != f"%{keyword}%" else ""
+        if self.fts:
+            where = "JOIN items_fts f ON f.rowid = i.rowid WHERE f.path LIKE ?"
+        else:
+            where = "WHERE i.path LIKE ?"
+        where += _escape
+        return self._query(where, [_like], server, scope, limit)
+
+    def glob(
+        self,
+        pattern: str,
+        server: str | Client = None,
+        scope: SearchScopeModify = 0,
+        limit: int = None,
+    ) -> Iterator[IndexRecord]:
+        """使用SQLite GLOB语法匹配完整路径（区分大小写），例如 /media/*.mkv"""
+        return self._query("WHERE i.path GLOB ?", [pattern], server, scope, limit)
+
+    def count(self, server: str | Client = None) -> int:
+        """索引中的对象数量"""
+        if server is None:
+            return self.conn.execute("SELECT count(*) FROM items").fetchone()[0]
+        if isinstance(server, Client):
+            server = _server_key(server)
+        return self.conn.execute(
+            "SELECT count(*) FROM items WHERE server = ?", (server,)
+        ).fetchone()[0]
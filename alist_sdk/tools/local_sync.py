@@ -0,0 +1,454 @@
+"""本地目录与Alist目录之间的同步
+
+一次并发遍历远程目录树，与本地 os.scandir 的结果比较（大小、修改时间），
+只传输新增或变化的文件，可选删除多余的对象。
+
+>>> result = UploadSync(client, "/data/photos", "/backup/photos").run()
+>>> print(result.copied, result.bytes / result.seconds)
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+
+from alist_sdk.client import Client
+from alist_sdk.models import Item
+from alist_sdk.tools.models import MirrorAction, MirrorResult
+from alist_sdk.tools.mirror import diff_trees, _group_by_parent, _record, _walk_tree
+
+logger = logging.getLogger("alist-sdk.tools.local_sync")
+
+__all__ = ["scan_local", "RateLimiter", "download_file", "UploadSync", "DownloadSync"]
+
+
+def scan_local(
+    root: str | Path, failed: set[str] = None, max_depth: int = -1
+) -> dict[str, Item]:
+    """扫描本地目录树，返回 {相对路径: Item}，不进入符号链接的目录
+
+    :param failed: 无法读取的目录（相对路径）会加入该集合
+    :param max_depth: 最大深度，0 只扫描root的直接子项，-1 不限制
+    """
+    root = Path(root)
+    items = {}
+    stack = [("", 0)]
+    while stack:
+        rel, depth = stack.pop()
+        try:
+            entries = list(os.scandir(root.joinpath(rel)))
+        except OSError as _e:
+            logger.warning("读取本地目录失败: %s", _e)
+            if failed is not None:
+                failed.add(rel or ".")
+            continue
+        for entry in entries:
+            _rel = f"{rel}/{entry.name}" if rel else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                stat = entry.stat()
+            except OSError as _e:
+                logger.warning("读取本地文件失败: %s", _e)
+                continue
+            # 逐个校验十万级的对象太慢，本地数据直接构造
+            items[_rel] = Item.model_construct(
+                name=entry.name,
+                size=0 if is_dir else stat.st_size,
+                is_dir=is_dir,
+                modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                sign="",
+                thumb="",
+                type=0,
+            )
+            if is_dir and (max_depth < 0 or depth < max_depth):
+                stack.append((_rel, depth + 1))
+    return items
+
+
+class RateLimiter:
+    """多个线程共用的带宽限制（令牌桶）"""
+
+    def __init__(self, rate: float, burst: float = None):
+        """
+        :param rate: 每秒字节数
+        :param burst: 桶容量，默认为1秒的流量
+        """
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, n: int):
+        """取出n个字节的令牌，不足时等待"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def download_url(path: str | PurePosixPath, sign: str = "") -> str:
+    """文件的下载地址（相对于服务器地址）"""
+    url = "/d" + urllib.parse.quote(PurePosixPath(path).as_posix())
+    return f"{url}?sign={sign}" if sign else url
+
+
+class _RangeNotSupported(Exception):
+    pass
+
+
+def _download_range(
+    client: Client,
+    url: str,
+    tmp: Path,
+    start: int,
+    end: int,
+    limiter: RateLimiter | None,
+    chunk_size: int,
+) -> int:
+    """下载 [start, end] 字节写入tmp的对应位置"""
+    size = 0
+    with client.stream(
+        "GET", url, follow_redirects=True, headers={"Range": f"bytes={start}-{end}"}
+    ) as resp:
+        if resp.status_code != 206:
+            raise _RangeNotSupported(resp.status_code)
+        with tmp.open("r+b") as fp:
+            fp.seek(start)
+            for chunk in resp.iter_bytes(chunk_size):
+                if limiter is not None:
+                    limiter.consume(len(chunk))
+                fp.write(chunk)
+                size += len(chunk)
+    return size
+
+
+def _download_stream(
+    client: Client, url: str, tmp: Path, limiter: RateLimiter | None, chunk_size: int
+) -> int:
+    size = 0
+    with client.stream("GET", url, follow_redirects=True) as resp:
+        resp.raise_for_status()
+        with tmp.open("wb") as fp:
+            for chunk in resp.iter_bytes(chunk_size):
+                if limiter is not None:
+                    limiter.consume(len(chunk))
+                fp.write(chunk)
+                size += len(chunk)
+    return size
+
+
+def download_file(
+    client: Client,
+    remote_path: str | PurePosixPath,
+    local_path: str | Path,
+    item: Item = None,
+    limiter: RateLimiter = None,
+    chunk_size: int = 1024 * 1024,
+    parts: int = 1,
+    min_part_size: int = 16 * 1024 * 1024,
+) -> int:
+    """下载一个文件到临时文件，完成后原子地重命名，并设置修改时间，返回字节数
+
+    :param item: 远程文件对象，提供签名、大小和修改时间，None时先请求 /api/fs/get
+    :param limiter: 带宽限制
+    :param parts: 分段并发下载的段数，服务端不支持Range时回退为单线程下载
+    :param min_part_size: 每段的最小字节数
+    """
+    local_path = Path(local_path)
+    if item is None:
+        _res = client.get_item_info(PurePosixPath(remote_path).as_posix())
+        if _res.code != 200:
+            raise FileNotFoundError(f"{remote_path}: {_res.message}")
+        item = _res.data
+
+    url = download_url(remote_path, item.sign)
+    tmp = local_path.with_name(f".{local_path.name}.alist-part")
+    parts = max(1, min(parts, item.size // min_part_size))
+    try:
+        size = None
+        if parts > 1:
+            with tmp.open("wb") as fp:
+                fp.truncate(item.size)
+            step = -(-item.size // parts)
+            ranges = [
+                (i, min(i + step, item.size) - 1) for i in range(0, item.size, step)
+            ]
+            try:
+                with ThreadPoolExecutor(
+                    parts, thread_name_prefix="alist-range"
+                ) as pool:
+                    size = sum(
+                        pool.map(
+                            lambda r: _download_range(
+                                client, url, tmp, *r, limiter, chunk_size
+                            ),
+                            ranges,
+                        )
+                    )
+            except _RangeNotSupported:
+                logger.info("服务端不支持Range，单线程下载: %s", remote_path)
+        if size is None:
+            size = _download_stream(client, url, tmp, limiter, chunk_size)
+        if item.size and size != item.size:
+            raise IOError(f"大小不一致: {remote_path} {size} != {item.size}")
+        os.replace(tmp, local_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    mtime = item.modified.timestamp()
+    os.utime(local_path, (mtime, mtime))
+    return size
+
+
+def _leaf_dirs(actions: list[MirrorAction]) -> list[MirrorAction]:
+    """需要创建的目录中，只保留没有其他操作在其下的目录（上传和mkdir都会创建父目录）"""
+    parents = {
+        p.as_posix()
+        for a in actions
+        if a.action != "delete"
+        for p in PurePosixPath(a.path).parents
+    }
+    return [a for a in actions if a.action == "mkdir" and a.path not in parents]
+
+
+class UploadSync:
+    """将本地目录同步到Alist（类似 rsync）"""
+
+    def __init__(
+        self,
+        client: Client,
+        local_root: str | Path,
+        remote_root: str | PurePosixPath,
+        delete: bool = False,
+        check_mtime: bool = True,
+        max_workers: int = 4,
+    ):
+        """
+        :param client: 客户端
+        :param local_root: 本地源目录
+        :param remote_root: 远程目标目录
+        :param delete: 是否删除远程多余的对象
+        :param check_mtime: 是否比较修改时间，False时只比较大小
+        :param max_workers: 并发上传数（远程遍历也使用该并发数）
+        """
+        self.client = client
+        self.local_root = Path(local_root)
+        self.remote_root = PurePosixPath(remote_root)
+        self.delete = delete
+        self.check_mtime = check_mtime
+        self.max_workers = max_workers
+
+    def plan(self) -> list[MirrorAction]:
+        """扫描本地目录并列出远程目录树，返回需要执行的操作"""
+        failed: set[str] = set()
+        with ThreadPoolExecutor(1, thread_name_prefix="alist-sync") as pool:
+            # 本地扫描和远程遍历同时进行，远程目录不存在时视为空目录
+            _remote = pool.submit(
+                _walk_tree, self.client, self.remote_root, self.max_workers
+            )
+            local_items = scan_local(self.local_root, failed)
+            remote_items = _remote.result()
+        return diff_trees(
+            local_items,
+            remote_items,
+            check_mtime=self.check_mtime,
+            delete=self.delete,
+            protect=failed,
+        )
+
+    def run(self, actions: list[MirrorAction] = None) -> MirrorResult:
+        """执行同步，actions为None时先调用plan()"""
+        start = time.time()
+        if actions is None:
+            actions = self.plan()
+        result = MirrorResult()
+
+        def _call(action: MirrorAction):
+            remote = self.remote_root.joinpath(action.path)
+            try:
+                if action.action == "mkdir":
+                    return self.client.mkdir(remote)
+                return self.client.upload_file_put(
+                    self.local_root.joinpath(action.path), remote
+                )
+            except Exception as _e:
+                return _e
+
+        def _remove(group: tuple[str, list[MirrorAction]]):
+            parent, _actions = group
+            try:
+                return self.client.remove(
+                    self.remote_root.joinpath(parent),
+                    [PurePosixPath(a.path).name for a in _actions],
+                )
+            except Exception as _e:
+                return _e
+
+        todo = _leaf_dirs(actions) + [a for a in actions if a.action == "copy"]
+        deletes = _group_by_parent([a for a in actions if a.action == "delete"])
+        with ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="alist-sync"
+        ) as pool:
+            # 先删除：类型不同的远程对象需要删除后才能创建目录或上传
+            for (_, _actions), res in zip(
+                deletes.items(), pool.map(_remove, deletes.items())
+            ):
+                if _record(_actions, res, result):
+                    result.deleted += len(_actions)
+            for action, res in zip(todo, pool.map(_call, todo)):
+                if not _record([action], res, result):
+                    continue
+                if action.action == "mkdir":
+                    result.mkdirs += 1
+                else:
+                    result.copied += 1
+                    result.bytes += action.size
+
+        result.seconds = time.time() - start
+        logger.info(
+            "上传同步完成 %s -> %s: 上传%d个文件(%d字节), 删除%d, 失败%d, %.2fs",
+            self.local_root,
+            self.remote_root,
+            result.copied,
+            result.bytes,
+            result.deleted,
+            len(result.failed),
+            result.seconds,
+        )
+        return result
+
+
+class DownloadSync:
+    """将Alist目录同步到本地"""
+
+    def __init__(
+        self,
+        client: Client,
+        remote_root: str | PurePosixPath,
+        local_root: str | Path,
+        delete: bool = False,
+        check_mtime: bool = True,
+        max_workers: int = 4,
+        bandwidth: float = None,
+        max_depth: int = -1,
+    ):
+        """
+        :param client: 客户端
+        :param remote_root: 远程源目录
+        :param local_root: 本地目标目录
+        :param delete: 是否删除本地多余的对象
+        :param check_mtime: 是否比较修改时间，False时只比较大小
+        :param max_workers: 并发下载数（远程遍历也使用该并发数）
+        :param bandwidth: 全部下载共用的带宽上限（字节/秒），None 不限制
+        :param max_depth: 最大深度，0 只同步remote_root的直接子项，-1 不限制
+        """
+        self.client = client
+        self.remote_root = PurePosixPath(remote_root)
+        self.local_root = Path(local_root)
+        self.delete = delete
+        self.check_mtime = check_mtime
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(bandwidth) if bandwidth else None
+        self.max_depth = max_depth
+        self.remote_items: dict[str, Item] = {}
+
+    def plan(self) -> list[MirrorAction]:
+        """列出远程目录树并扫描本地目录，返回需要执行的操作"""
+        failed: set[str] = set()
+        with ThreadPoolExecutor(1, thread_name_prefix="alist-sync") as pool:
+            _local = pool.submit(scan_local, self.local_root, None, self.max_depth)
+            self.remote_items = _walk_tree(
+                self.client, self.remote_root, self.max_workers, failed, self.max_depth
+            )
+            local_items = _local.result()
+        return diff_trees(
+            self.remote_items,
+            local_items,
+            check_mtime=self.check_mtime,
+            delete=self.delete,
+            protect=failed,
+        )
+
+    def _download(self, action: MirrorAction):
+        try:
+            return download_file(
+                self.client,
+                self.remote_root.joinpath(action.path),
+                self.local_root.joinpath(action.path),
+                item=self.remote_items.get(action.path),
+                limiter=self.limiter,
+            )
+        except Exception as _e:
+            return _e
+
+    def _remove(self, action: MirrorAction):
+        _path = self.local_root.joinpath(action.path)
+        try:
+            if _path.is_dir() and not _path.is_symlink():
+                shutil.rmtree(_path)
+            else:
+                _path.unlink()
+        except OSError as _e:
+            return _e
+
+    def run(self, actions: list[MirrorAction] = None) -> MirrorResult:
+        """执行同步，actions为None时先调用plan()"""
+        start = time.time()
+        if actions is None:
+            actions = self.plan()
+        result = MirrorResult()
+
+        for action in actions:
+            if action.action != "delete":
+                continue
+            _e = self._remove(action)
+            if _e is None:
+                result.deleted += 1
+            else:
+                result.failed[action.path] = str(_e)
+        self.local_root.mkdir(parents=True, exist_ok=True)
+        for action in actions:
+            if action.action != "mkdir":
+                continue
+            try:
+                self.local_root.joinpath(action.path).mkdir(parents=True, exist_ok=True)
+                result.mkdirs += 1
+            except OSError as _e:
+                result.failed[action.path] = str(_e)
+
+        copies = [a for a in actions if a.action == "copy"]
+        with ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="alist-sync"
+        ) as pool:
+            for action, res in zip(copies, pool.map(self._download, copies)):
+                if isinstance(res, Exception):
+                    logger.warning("下载失败 %s: %s", action.path, res)
+                    result.failed[action.path] = str(res)
+                    continue
+                result.copied += 1
+                result.bytes += res
+
+        result.seconds = time.time() - start
+        logger.info(
+            "下载同步完成 %s -> %s: 下载%d个文件(%d字节), 删除%d, 失败%d, %.2fs",
+            self.remote_root,
+            self.local_root,
+            result.copied,
+            result.bytes,
+            result.deleted,
+            len(result.failed),
+            result.seconds,
+        )
+        return result
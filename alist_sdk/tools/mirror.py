@@ -0,0 +1,512 @@
+"""目录树镜像
+
+并发遍历源和目标目录树，按照 名称、大小、哈希、修改时间 比较差异，
+同一服务器使用服务端复制，跨服务器时将源文件的下载流直接上传到目标服务器。
+已完成的操作记录在状态文件中，中断后再次运行会跳过。
+
+>>> mirror = TreeMirror(src_client, "/media", dst_client, "/backup/media")
+>>> mirror.plan()  # 只查看差异
+>>> mirror.run()
+"""
+
+import itertools
+import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+from alist_sdk.client import Client
+from alist_sdk.err import AlistError
+from alist_sdk.models import Item, ListTask, Resp, Task
+from alist_sdk.tools.models import MirrorAction, MirrorResult
+
+logger = logging.getLogger("alist-sdk.tools.mirror")
+
+__all__ = [
+    "TreeMirror",
+    "transfer_file",
+    "compare_items",
+    "diff_trees",
+    "collapse_missing_dirs",
+]
+
+
+def _item_hash(item: Item, algo: str) -> str:
+    if item.hash_info is None:
+        return ""
+    return (getattr(item.hash_info, algo) or "").lower()
+
+
+def compare_items(
+    src: Item, dst: Item, check_mtime: bool = True, mtime_window: float = 1
+) -> str:
+    """比较两个对象，返回需要复制的原因，相同时返回空字符串
+
+    两边都有同一种哈希时只比较大小和哈希；否则目标修改时间早于源时认为不同。
+    不同存储的修改时间精度不同，相差不超过mtime_window秒时视为相同。
+    """
+    if src.is_dir != dst.is_dir:
+        return "type"
+    if src.is_dir:
+        return ""
+    if src.size != dst.size:
+        return "size"
+    for algo in ("md5", "sha1"):
+        _src, _dst = _item_hash(src, algo), _item_hash(dst, algo)
+        if _src and _dst:
+            return "" if _src == _dst else "hash"
+    if check_mtime and (src.modified - dst.modified).total_seconds() > mtime_window:
+        return "mtime"
+    return ""
+
+
+def diff_trees(
+    src: dict[str, Item],
+    dst: dict[str, Item],
+    check_mtime: bool = True,
+    delete: bool = False,
+    protect: set[str] = frozenset(),
+    mtime_window: float = 1,
+) -> list[MirrorAction]:
+    """比较两个 {相对路径: Item} 目录树，返回将dst同步为src需要的操作
+
+    类型不同（源是目录、目标是文件，或相反）时，先删除目标中的对象再创建或复制，
+    该删除与delete参数无关。执行时应当先删除，再创建目录和复制。
+
+    :param src: 源目录树
+    :param dst: 目标目录树
+    :param check_mtime: 没有可比较的哈希时是否比较修改时间
+    :param delete: 是否删除目标中多余的对象
+    :param protect: 源中列出失败的目录，其在目标中的对象不会被删除
+    :param mtime_window: 修改时间的容差（秒）
+    """
+    actions = []
+    deleted: set[str] = set()
+    for rel in sorted(src):
+        item, old = src[rel], dst.get(rel)
+        reason = (
+            "missing"
+            if old is None
+            else compare_items(item, old, check_mtime, mtime_window)
+        )
+        if not reason:
+            continue
+        if reason == "type":
+            deleted.add(rel)
+            actions.append(MirrorAction(action="delete", path=rel, reason="type"))
+        actions.append(
+            MirrorAction(
+                action="mkdir" if item.is_dir else "copy",
+                path=rel,
+                size=0 if item.is_dir else item.size,
+                reason=reason,
+            )
+        )
+
+    if delete:
+        for rel in sorted(dst.keys() - src.keys()):
+            parents = {p.as_posix() for p in PurePosixPath(rel).parents}
+            if parents & deleted or parents & protect:
+                continue
+            deleted.add(rel)
+            actions.append(MirrorAction(action="delete", path=rel, reason="extra"))
+    return actions
+
+
+def collapse_missing_dirs(actions: list[MirrorAction]) -> list[MirrorAction]:
+    """将目标中缺失的目录合并为一次目录复制，并去掉其下的全部操作（服务端复制时使用）
+
+    因类型不同而先删除的目录同样视为缺失。
+    """
+    missing = {
+        a.path
+        for a in actions
+        if a.action == "mkdir" and a.reason in ("missing", "type")
+    }
+    result = []
+    for action in actions:
+        parents = {p.as_posix() for p in PurePosixPath(action.path).parents}
+        if parents & missing:
+            continue
+        if action.action == "mkdir" and action.path in missing:
+            action = action.model_copy(update={"action": "copy"})
+        result.append(action)
+    return result
+
+
+def transfer_file(
+    src_client: Client,
+    src_path: str | PurePosixPath,
+    dst_client: Client,
+    dst_path: str | PurePosixPath,
+    item: Item = None,
+    chunk_size: int = 1024 * 1024,
+) -> Resp:
+    """将源服务器上文件的下载流直接上传到目标服务器，不落盘
+
+    :param item: 源文件对象，提供大小和修改时间，默认使用 /api/fs/get 的结果
+    """
+    _raw = src_client.get_item_info(PurePosixPath(src_path).as_posix())
+    if _raw.code != 200:
+        raise AlistError(f"获取下载地址失败: {_raw.message}")
+    item = item or _raw.data
+
+    with src_client.stream(
+        "GET",
+        _raw.data.raw_url,
+        follow_redirects=True,
+        headers={"authorization": ""},
+    ) as resp:
+        resp.raise_for_status()
+        return dst_client.verify_request(
+            "PUT",
+            "/api/fs/put",
+            headers={
+                "As-Task": "false",
+                "Content-Type": "application/octet-stream",
+                "Content-Length": str(item.size),
+                "Last-Modified": str(int(item.modified.timestamp() * 1000)),
+                "File-Path": urllib.parse.quote_plus(
+                    PurePosixPath(dst_path).as_posix()
+                ),
+            },
+            content=resp.iter_bytes(chunk_size),
+        )
+
+
+def _depth(action: MirrorAction) -> int:
+    return action.path.count("/")
+
+
+def _walk_tree(
+    client: Client,
+    root: PurePosixPath,
+    max_workers: int,
+    failed: set[str] = None,
+    max_depth: int = -1,
+) -> dict[str, Item]:
+    """遍历远程目录树，返回 {相对路径: Item}
+
+    :param failed: 收集列出失败的目录；为None时（目标树，不存在视为空）只输出debug日志
+    """
+
+    def on_error(path: PurePosixPath, res):
+        level = logging.DEBUG if failed is None else logging.WARNING
+        logger.log(level, "列出目录失败[%d]: %s %s", res.code, path, res.message)
+        if failed is not None:
+            failed.add(path.relative_to(root).as_posix())
+
+    items = {}
+    for path, children in client.walk_items(
+        root, max_workers=max_workers, max_depth=max_depth, on_error=on_error
+    ):
+        rel = path.relative_to(root)
+        for item in children:
+            items[rel.joinpath(item.name).as_posix()] = item
+    return items
+
+
+def _record(actions: list[MirrorAction], res, result: MirrorResult) -> bool:
+    """res 为 Resp 或 异常，失败时记录到result.failed"""
+    if isinstance(res, Exception) or res.code != 200:
+        error = str(res) if isinstance(res, Exception) else res.message
+        for action in actions:
+            logger.warning("同步失败[%s] %s: %s", action.action, action.path, error)
+            result.failed[action.path] = error
+        return False
+    return True
+
+
+def _group_by_parent(actions: list[MirrorAction]) -> dict[str, list[MirrorAction]]:
+    groups: dict[str, list[MirrorAction]] = {}
+    for action in actions:
+        groups.setdefault(PurePosixPath(action.path).parent.as_posix(), []).append(
+            action
+        )
+    return groups
+
+
+class TreeMirror:
+    """目录树镜像，支持同一服务器和跨服务器"""
+
+    def __init__(
+        self,
+        src_client: Client,
+        src_root: str | PurePosixPath,
+        dst_client: Client,
+        dst_root: str | PurePosixPath,
+        delete: bool = False,
+        check_mtime: bool = True,
+        max_workers: int = 5,
+        state_file: str | Path = None,
+        chunk_size: int = 1024 * 1024,
+        wait: bool = True,
+        task_timeout: float = None,
+    ):
+        """
+        :param src_client: 源服务器客户端
+        :param src_root: 源目录
+        :param dst_client: 目标服务器客户端，可以与src_client相同
+        :param dst_root: 目标目录
+        :param delete: 是否删除目标中多余的对象
+        :param check_mtime: 没有可比较的哈希时是否比较修改时间
+        :param max_workers: 并发操作数（遍历时每棵树也使用该并发数）
+        :param state_file: 记录已完成操作的文件，中断后继续
+        :param chunk_size: 跨服务器传输时每次读取的字节数
+        :param wait: 同一服务器时等待服务端复制任务完成，只有任务成功的复制才记录到状态文件；
+            False 时提交任务后立即返回（任务ID在MirrorResult.tasks中），服务端复制不记录到状态文件
+        :param task_timeout: 等待复制任务的超时时间（秒），None 不限制
+        """
+        self.src_client = src_client
+        self.src_root = PurePosixPath(src_root)
+        self.dst_client = dst_client
+        self.dst_root = PurePosixPath(dst_root)
+        self.delete = delete
+        self.check_mtime = check_mtime
+        self.max_workers = max_workers
+        self.state_file = Path(state_file) if state_file else None
+        self.chunk_size = chunk_size
+        self.wait = wait
+        self.task_timeout = task_timeout
+        # 相同的服务器使用服务端复制
+        self.same_server = str(src_client.base_url).rstrip("/") == str(
+            dst_client.base_url
+        ).rstrip("/")
+
+        self.src_items: dict[str, Item] = {}
+        self._src_failed: set[str] = set()
+        self._state_lock = threading.Lock()
+        self._done: set[str] = set()
+        if self.state_file is not None and self.state_file.exists():
+            self._done = set(self.state_file.read_text("utf-8").splitlines())
+
+    # ================ 比较 =================
+
+    def plan(self) -> list[MirrorAction]:
+        """并发遍历源和目标，返回需要执行的操作"""
+        self._src_failed = set()
+        with ThreadPoolExecutor(2, thread_name_prefix="alist-mirror") as pool:
+            _src = pool.submit(
+                _walk_tree,
+                self.src_client,
+                self.src_root,
+                self.max_workers,
+                self._src_failed,
+            )
+            # 目标目录不存在时视为空目录
+            _dst = pool.submit(
+                _walk_tree, self.dst_client, self.dst_root, self.max_workers
+            )
+            self.src_items, dst_items = _src.result(), _dst.result()
+        return diff_trees(
+            self.src_items,
+            dst_items,
+            check_mtime=self.check_mtime,
+            delete=self.delete,
+            protect=self._src_failed,
+        )
+
+    # ================ 状态 =================
+
+    def _state_key(self, action: MirrorAction) -> str:
+        # 包含源对象的大小和修改时间，源文件变化后会重新复制；
+        # 删除操作没有源对象，不记录到状态文件（见_record）
+        item = self.src_items.get(action.path)
+        mtime = item.modified.timestamp() if item is not None else 0
+        return f"{action.action}\t{action.path}\t{action.size}\t{mtime}"
+
+    def _mark_done(self, action: MirrorAction):
+        key = self._state_key(action)
+        with self._state_lock:
+            self._done.add(key)
+            if self.state_file is not None:
+                with self.state_file.open("a", encoding="utf-8") as fp:
+                    fp.write(key + "\n")
+
+    # ================ 执行 =================
+
+    def run(self, actions: list[MirrorAction] = None) -> MirrorResult:
+        """执行镜像，actions为None时先调用plan()"""
+        start = time.time()
+        if actions is None:
+            actions = self.plan()
+        result = MirrorResult()
+        if self.same_server:
+            actions = collapse_missing_dirs(actions)
+        todo = []
+        for action in actions:
+            if action.action != "delete" and self._state_key(action) in self._done:
+                result.skipped += 1
+            else:
+                todo.append(action)
+
+        with ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="alist-mirror"
+        ) as pool:
+            # 先删除：类型不同的对象需要删除后才能创建目录或复制
+            self._run_deletes(pool, [a for a in todo if a.action == "delete"], result)
+            self._run_mkdirs(pool, [a for a in todo if a.action == "mkdir"], result)
+            copies = [a for a in todo if a.action == "copy"]
+            if self.same_server:
+                self._run_server_copies(pool, copies, result)
+            else:
+                self._run_transfers(pool, copies, result)
+
+        result.seconds = time.time() - start
+        logger.info(
+            "镜像完成 %s -> %s: 创建目录%d, 复制%d, 删除%d, 跳过%d, 失败%d, %.2fs",
+            self.src_root,
+            self.dst_root,
+            result.mkdirs,
+            result.copied,
+            result.deleted,
+            result.skipped,
+            len(result.failed),
+            result.seconds,
+        )
+        return result
+
+    def _record(
+        self, actions: list[MirrorAction], res, result: MirrorResult, done=True
+    ):
+        """res 为 Resp 或 异常，done为False时成功也不记录到状态文件"""
+        if not _record(actions, res, result):
+            return False
+        for action in actions:
+            if done and action.action != "delete":
+                self._mark_done(action)
+        return True
+
+    @staticmethod
+    def _call(func, *args):
+        try:
+            return func(*args)
+        except Exception as _e:
+            return _e
+
+    def _run_mkdirs(self, pool, actions: list[MirrorAction], result: MirrorResult):
+        # 按照深度逐层并发创建，避免并发创建同一个父目录（部分驱动允许重名目录）
+        for _, level in itertools.groupby(sorted(actions, key=_depth), key=_depth):
+            level = list(level)
+            for action, res in zip(
+                level,
+                pool.map(
+                    lambda a: self._call(
+                        self.dst_client.mkdir, self.dst_root.joinpath(a.path)
+                    ),
+                    level,
+                ),
+            ):
+                if self._record([action], res, result):
+                    result.mkdirs += 1
+
+    def _run_deletes(self, pool, actions: list[MirrorAction], result: MirrorResult):
+        groups = _group_by_parent(actions)
+        for (parent, _actions), res in zip(
+            groups.items(),
+            pool.map(
+                lambda g: self._call(
+                    self.dst_client.remove,
+                    self.dst_root.joinpath(g[0]),
+                    [PurePosixPath(a.path).name for a in g[1]],
+                ),
+                groups.items(),
+            ),
+        ):
+            if self._record(_actions, res, result):
+                result.deleted += len(_actions)
+
+    def _run_server_copies(
+        self, pool, actions: list[MirrorAction], result: MirrorResult
+    ):
+        """同一服务器：每个目录提交一次服务端复制任务，已存在但不同的文件先删除
+
+        服务端复制是异步任务，提交成功不代表复制成功：等待任务结束后，
+        一个目录的任务全部成功才把该目录的复制记录到状态文件，否则记为失败。
+        """
+
+        def _copy(group: tuple[str, list[MirrorAction]]):
+            parent, _actions = group
+            names = [PurePosixPath(a.path).name for a in _actions]
+            # 类型不同的对象已经在_run_deletes中删除
+            replaced = [
+                PurePosixPath(a.path).name
+                for a in _actions
+                if a.reason not in ("missing", "type")
+            ]
+            if replaced:
+                _res = self.dst_client.remove(self.dst_root.joinpath(parent), replaced)
+                if _res.code != 200:
+                    return _res
+            return self.dst_client.copy(
+                self.src_root.joinpath(parent), self.dst_root.joinpath(parent), names
+            )
+
+        groups = _group_by_parent(actions)
+        submitted: list[tuple[list[MirrorAction], list[str]]] = []
+        for (parent, _actions), res in zip(
+            groups.items(),
+            pool.map(lambda g: self._call(_copy, g), groups.items()),
+        ):
+            if not self._record(_actions, res, result, done=False):
+                continue
+            task_ids = []
+            if isinstance(res.data, ListTask):
+                task_ids = [t.id for t in res.data.tasks]
+            result.tasks.extend(task_ids)
+            if task_ids:
+                submitted.append((_actions, task_ids))
+            else:  # 没有返回任务时复制已经同步完成
+                self._record(_actions, res, result)
+                result.copied += len(_actions)
+
+        if not self.wait or not submitted:
+            result.copied += sum(len(a) for a, _ in submitted)
+            return
+        finished = self._wait_tasks([i for _, ids in submitted for i in ids])
+        for _actions, task_ids in submitted:
+            errors = [
+                f"{i}: {finished[i].error}" if i in finished else f"{i}: 未完成"
+                for i in task_ids
+                if i not in finished or finished[i].state != 2
+            ]
+            if errors:
+                for action in _actions:
+                    result.failed[action.path] = "复制任务失败 " + "; ".join(errors)
+                continue
+            for action in _actions:
+                self._mark_done(action)
+            result.copied += len(_actions)
+
+    def _wait_tasks(self, task_ids: list[str]) -> dict[str, Task]:
+        """等待服务端复制任务结束，返回已结束的任务，超时或出错时返回已经结束的部分"""
+        finished = {}
+        try:
+            for task in self.dst_client.wait_for_tasks(
+                task_ids, "copy", timeout=self.task_timeout
+            ):
+                finished[task.id] = task
+        except (TimeoutError, AlistError) as _e:
+            logger.warning("等待复制任务失败: %s", _e)
+        return finished
+
+    def _run_transfers(self, pool, actions: list[MirrorAction], result: MirrorResult):
+        """跨服务器：逐个文件将下载流上传到目标服务器"""
+        for action, res in zip(
+            actions, pool.map(lambda a: self._call(self._transfer, a), actions)
+        ):
+            if self._record([action], res, result):
+                result.copied += 1
+                result.bytes += action.size
+
+    def _transfer(self, action: MirrorAction):
+        return transfer_file(
+            self.src_client,
+            self.src_root.joinpath(action.path),
+            self.dst_client,
+            self.dst_root.joinpath(action.path),
+            item=self.src_items.get(action.path),
+            chunk_size=self.chunk_size,
+        )
@@ -1,5 +1,14 @@
+import datetime
+import re
+from typing import Literal
+
 from pydantic import BaseModel
-from alist_sdk.models import Storage, Setting, User, Meta
+from alist_sdk.models import Storage, Setting, User, Meta, Task, TaskTypeModify
+
+TaskEventKind = Literal["started", "progress", "succeeded", "failed", "canceled"]
+ConfigKeyModify = Literal["settings", "storages", "users", "metas"]
+ConfigActionModify = Literal["create", "update", "delete"]
+MirrorActionModify = Literal["mkdir", "copy", "delete"]
 
 
 class Configs(BaseModel):
@@ -7,3 +16,134 @@ class Configs(BaseModel):
     users: list[User] = []
     storages: list[Storage] = []
     metas: list[Meta] = []
+
+
+class IndexRecord(BaseModel):
+    """本地路径索引中的一条记录"""
+
+    server: str
+    path: str
+    is_dir: bool
+    size: int
+    modified: datetime.datetime
+    hash: str = ""
+
+    @property
+    def uri(self) -> str:
+        return self.server + self.path
+
+
+class IndexUpdateResult(BaseModel):
+    """一次索引更新的统计"""
+
+    server: str
+    root: str
+    listed: int = 0  # 列出的目录数量
+    skipped: int = 0  # 修改时间未变化而跳过的目录数量
+    failed: int = 0  # 列出失败的目录数量
+    items: int = 0  # 写入的对象数量
+    seconds: float = 0
+
+
+class TaskEvent(BaseModel):
+    """任务事件"""
+
+    kind: TaskEventKind
+    task_type: TaskTypeModify
+    task: Task
+    previous: Task | None = None  # 上一次观察到的状态
+
+
+class RetryPolicy(BaseModel):
+    """失败任务的重试策略"""
+
+    max_retries: int = 3  # 最大重试次数
+    backoff: float = 10  # 第一次重试前等待的秒数
+    backoff_factor: float = 2  # 每次重试等待时间的倍数
+    max_backoff: float = 600  # 最大等待秒数
+    allow_errors: list[str] = []  # 正则，非空时只重试错误信息匹配的任务
+    deny_errors: list[str] = []  # 正则，错误信息匹配时不重试
+
+    def delay(self, attempt: int) -> float:
+        """第attempt次（从1开始）重试前等待的秒数"""
+        return min(
+            self.backoff * self.backoff_factor ** (attempt - 1), self.max_backoff
+        )
+
+    def should_retry(self, error: str, attempts: int) -> bool:
+        """已重试attempts次，错误信息为error的任务是否需要再次重试"""
+        if attempts >= self.max_retries:
+            return False
+        if any(re.search(p, error) for p in self.deny_errors):
+            return False
+        if self.allow_errors:
+            return any(re.search(p, error) for p in self.allow_errors)
+        return True
+
+
+class ConfigImportRecord(BaseModel):
+    """导入一个配置对象的结果"""
+
+    key: str  # settings, storages, metas, users
+    name: str  # mount_path, path, username, key; 整体导入的settings 为空
+    code: int
+    message: str = ""
+    action: ConfigActionModify = "create"
+
+
+class ConfigChange(BaseModel):
+    """同步配置时，目标服务器需要执行的一个变更"""
+
+    key: ConfigKeyModify
+    action: ConfigActionModify
+    name: str  # mount_path, username, path, key
+    data: dict = {}  # 源服务器上的对象，delete时为空
+    target_id: int | None = None  # 目标服务器上的对象ID，update和delete时使用
+
+
+class ConfigImportResult(BaseModel):
+    """导入配置的结果"""
+
+    records: list[ConfigImportRecord] = []
+    skipped: list[ConfigImportRecord] = []  # 被忽略的对象，例如本地存储
+
+    @property
+    def succeeded(self) -> list[ConfigImportRecord]:
+        return [r for r in self.records if r.code == 200]
+
+    @property
+    def failed(self) -> list[ConfigImportRecord]:
+        return [r for r in self.records if r.code != 200]
+
+
+class MirrorAction(BaseModel):
+    """镜像目录树时需要执行的一个操作，path为相对于根目录的路径"""
+
+    action: MirrorActionModify
+    path: str
+    size: int = 0
+    reason: str = ""  # missing, size, hash, mtime, extra
+
+
+class MirrorResult(BaseModel):
+    """一次镜像的统计"""
+
+    mkdirs: int = 0
+    copied: int = 0  # 已复制的文件数量（不等待服务端复制任务时为已提交的数量）
+    deleted: int = 0
+    skipped: int = 0  # 状态文件中记录为已完成而跳过的操作数量
+    bytes: int = 0  # 跨服务器传输的字节数
+    failed: dict[str, str] = {}  # 相对路径: 错误信息
+    tasks: list[str] = []  # 服务端复制返回的任务ID（服务端版本支持时）
+    seconds: float = 0
+
+
+class DirUsage(BaseModel):
+    """一个目录（包含全部子目录）的空间占用"""
+
+    path: str
+    depth: int  # 相对于起始目录的深度，起始目录为0
+    size: int = 0  # 全部文件的大小之和
+    files: int = 0
+    dirs: int = 0  # 子目录数量（递归）
+    incomplete: bool = False  # 该目录或其子目录列出失败，统计不完整
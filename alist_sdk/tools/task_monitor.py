@@ -0,0 +1,266 @@
+"""任务监视器
+
+对比相邻两次 task_undone / task_done 的结果，产生任务事件（started, progress, succeeded, failed, canceled）。
+同一个服务器共用一个轮询线程，通过回调或异步迭代器订阅事件。
+
+>>> monitor = TaskMonitor.shared(client)
+>>> unsubscribe = monitor.subscribe(print, kinds=["failed"])
+>>> async for event in monitor.events():
+...     print(event.kind, event.task.name)
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+from typing import Callable, AsyncIterator, Iterable
+
+from alist_sdk.client import Client
+from alist_sdk.err import AlistError
+from alist_sdk.models import Task, TaskType, TaskTypeModify
+from alist_sdk.tools.models import TaskEvent, TaskEventKind
+
+logger = logging.getLogger("alist-sdk.tools.task_monitor")
+
+__all__ = ["TaskMonitor", "diff_tasks"]
+
+_MONITORS: dict[tuple[str, str, int | None], "TaskMonitor"] = dict()
+_MONITORS_LOCK = threading.Lock()
+
+
+def _terminal_kind(task: Task) -> TaskEventKind:
+    if task.state == 2:
+        return "succeeded"
+    if task.state == 7:
+        return "canceled"
+    return "failed"
+
+
+def diff_tasks(
+    task_type: TaskTypeModify,
+    prev_undone: dict[str, Task],
+    prev_done: set[str],
+    undone: dict[str, Task],
+    done: dict[str, Task] | None,
+) -> list[TaskEvent]:
+    """对比两次快照，返回事件列表
+
+    :param task_type: 任务类型
+    :param prev_undone: 上一次的未完成任务
+    :param prev_done: 上一次已知的已完成任务ID
+    :param undone: 本次的未完成任务
+    :param done: 本次的已完成任务，None 表示本次没有请求done
+    """
+    events = []
+    for task_id, task in undone.items():
+        prev = prev_undone.get(task_id)
+        if prev is None:
+            events.append(TaskEvent(kind="started", task_type=task_type, task=task))
+        elif (prev.state, prev.progress) != (task.state, task.progress):
+            events.append(
+                TaskEvent(
+                    kind="progress", task_type=task_type, task=task, previous=prev
+                )
+            )
+
+    if done is None:
+        return events
+
+    for task_id, task in done.items():
+        if task_id in prev_done or task_id in undone:
+            continue
+        events.append(
+            TaskEvent(
+                kind=_terminal_kind(task),
+                task_type=task_type,
+                task=task,
+                previous=prev_undone.get(task_id),
+            )
+        )
+    return events
+
+
+class _PollState:
+    """一次启动的轮询状态，每次start时新建，停止中的旧线程只修改自己的状态"""
+
+    __slots__ = ("undone", "done", "rounds", "lock")
+
+    def __init__(self):
+        self.undone: dict[str, dict[str, Task]] = {}
+        self.done: dict[str, set[str]] = {}
+        self.rounds = 0
+        self.lock = threading.Lock()  # 保护done，forget在其他线程中调用
+
+
+class TaskMonitor:
+    """任务监视器，使用 TaskMonitor.shared(client) 获取同一服务器共用的实例"""
+
+    def __init__(
+        self,
+        client: Client,
+        task_types: Iterable[TaskTypeModify] = None,
+        interval: float = 1,
+        done_every: int = 10,
+    ):
+        """
+        :param client: 客户端，需要管理员权限
+        :param task_types: 监视的任务类型，默认全部类型
+        :param interval: 轮询间隔（秒）
+        :param done_every: 没有任务从undone中消失时，每隔多少轮请求一次done，
+            用于发现两次轮询之间开始并结束的任务
+        """
+        self.client = client
+        self.task_types = list(task_types or TaskType)
+        for _t in self.task_types:
+            client.task_type_verify(_t)
+        self.interval = interval
+        self.done_every = done_every
+
+        self._subscribers: dict[int, tuple[Callable, set | None]] = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stop.set()
+        self._thread: threading.Thread | None = None
+        self._state = _PollState()
+
+    @classmethod
+    def shared(cls, client: Client, interval: float = 1) -> "TaskMonitor":
+        """获取该服务器共用的监视器，不存在时创建"""
+        with _MONITORS_LOCK:
+            if client.server_info not in _MONITORS:
+                _MONITORS[client.server_info] = cls(client, interval=interval)
+            return _MONITORS[client.server_info]
+
+    # ================ 订阅 =================
+
+    def subscribe(
+        self,
+        callback: Callable[[TaskEvent], None],
+        kinds: Iterable[TaskEventKind] = None,
+    ) -> Callable[[], None]:
+        """订阅事件，回调在轮询线程中执行。第一个订阅者会启动轮询。
+
+        :param callback: 事件回调
+        :param kinds: 只接收这些类型的事件，默认全部
+        :return: 取消订阅的函数，最后一个订阅者取消后停止轮询
+        """
+        token = next(self._tokens)
+        with self._lock:
+            self._subscribers[token] = callback, set(kinds) if kinds else None
+            self.start()
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers.pop(token, None)
+                if not self._subscribers:
+                    self.stop()
+
+        return unsubscribe
+
+    async def events(
+        self, kinds: Iterable[TaskEventKind] = None
+    ) -> AsyncIterator[TaskEvent]:
+        """以异步迭代器的方式订阅事件"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[TaskEvent] = asyncio.Queue()
+        unsubscribe = self.subscribe(
+            lambda e: loop.call_soon_threadsafe(queue.put_nowait, e), kinds
+        )
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            unsubscribe()
+
+    def _emit(self, event: TaskEvent):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for callback, kinds in subscribers:
+            if kinds is not None and event.kind not in kinds:
+                continue
+            try:
+                callback(event)
+            except Exception as _e:
+                logger.exception("任务事件回调出错: %s", _e)
+
+    # ================ 轮询 =================
+
+    def start(self):
+        """启动轮询线程，重新开始时以第一轮的结果作为基准"""
+        if not self._stop.is_set():
+            return
+        # 每次启动使用新的Event和轮询状态，正在退出的旧线程不受影响
+        self._stop = threading.Event()
+        self._state = _PollState()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(self._stop, self._state),
+            name="alist-task-monitor",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def forget(self, task_id: str):
+        """忘记一个已完成的任务，它再次出现在done中时会重新产出事件（例如重试后）"""
+        state = self._state
+        with state.lock:
+            for done in state.done.values():
+                done.discard(task_id)
+
+    def _list(self, func, task_type) -> dict[str, Task]:
+        _res = func(task_type)
+        if _res.code != 200:
+            raise AlistError(_res.message)
+        return {t.id: t for t in _res.data or []}
+
+    def poll(self, state: _PollState = None) -> list[TaskEvent]:
+        """执行一轮轮询并返回事件（不分发）
+
+        :param state: 轮询状态，默认为当前的状态
+        """
+        state = state or self._state
+        events = []
+        for task_type in self.task_types:
+            undone = self._list(self.client.task_undone, task_type)
+            prev_undone = state.undone.get(task_type)
+            baseline = prev_undone is None
+
+            done = None
+            if (
+                baseline
+                or prev_undone.keys() - undone.keys()
+                or state.rounds % self.done_every == 0
+            ):
+                done = self._list(self.client.task_done, task_type)
+
+            with state.lock:
+                if baseline:
+                    # 第一轮只记录已完成的任务，未完成的任务作为started产出
+                    prev_undone, prev_done = {}, set(done)
+                else:
+                    prev_done = set(state.done[task_type])
+                if done is not None:
+                    state.done[task_type] = set(done)
+                else:
+                    state.done[task_type] = prev_done - undone.keys()
+            state.undone[task_type] = undone
+            events.extend(diff_tasks(task_type, prev_undone, prev_done, undone, done))
+        state.rounds += 1
+        return events
+
+    def _run(self, stop: threading.Event, state: _PollState):
+        logger.debug("任务监视器启动: %s", self.client.base_url)
+        while not stop.is_set():
+            try:
+                for event in self.poll(state):
+                    if stop.is_set():
+                        break
+                    self._emit(event)
+            except Exception as _e:
+                logger.warning("任务轮询失败: %s", _e)
+            stop.wait(self.interval)
+        logger.debug("任务监视器停止: %s", self.client.base_url)
@@ -0,0 +1,183 @@
+"""失败任务自动重试
+
+在TaskMonitor上订阅失败事件，按照任务类型的RetryPolicy等待后调用task_retry，
+并在本地记录每个任务的重试次数。
+
+>>> with RetryController(client, {"copy": RetryPolicy(max_retries=5)}) as controller:
+...     controller.wait()
+"""
+
+import heapq
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+from alist_sdk.client import Client
+from alist_sdk.models import Task, TaskTypeModify
+from alist_sdk.tools.models import RetryPolicy, TaskEvent
+from alist_sdk.tools.task_monitor import TaskMonitor
+
+logger = logging.getLogger("alist-sdk.tools.task_retry")
+
+__all__ = ["RetryController"]
+
+
+class RetryController:
+    """失败任务自动重试控制器"""
+
+    def __init__(
+        self,
+        client: Client,
+        policies: dict[TaskTypeModify, RetryPolicy] = None,
+        monitor: TaskMonitor = None,
+        state_file: str | Path = None,
+    ):
+        """
+        :param client: 客户端，需要管理员权限
+        :param policies: 任务类型: 重试策略，默认重试 copy 和 offline_download_transfer
+        :param monitor: 任务监视器，默认使用该服务器共用的监视器
+        :param state_file: 保存重试次数的JSON文件，重启后继续计数
+        """
+        self.client = client
+        self.policies = (
+            policies
+            if policies is not None
+            else {"copy": RetryPolicy(), "offline_download_transfer": RetryPolicy()}
+        )
+        for _t in self.policies:
+            client.task_type_verify(_t)
+        self.monitor = monitor or TaskMonitor.shared(client)
+        self.state_file = Path(state_file) if state_file else None
+
+        self.attempts: dict[str, int] = {}  # 任务ID: 已重试次数
+        self.retried = 0  # 已调用重试的次数
+        self.gave_up: dict[str, str] = {}  # 放弃重试的任务ID: 最后的错误信息
+        self.recovered: set[str] = set()  # 重试后成功的任务ID
+
+        self._queue: list[tuple[float, str, str]] = []  # (执行时间, 任务类型, 任务ID)
+        self._scheduled: set[str] = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._unsubscribe = None
+        self._load_state()
+
+    # ================ 状态 =================
+
+    def _load_state(self):
+        if self.state_file is None or not self.state_file.exists():
+            return
+        self.attempts = json.loads(self.state_file.read_text()).get("attempts", {})
+
+    def _save_state(self):
+        if self.state_file is None:
+            return
+        self.state_file.write_text(json.dumps({"attempts": self.attempts}))
+
+    # ================ 生命周期 =================
+
+    def start(self, include_existing: bool = True):
+        """开始监视并重试
+
+        :param include_existing: 是否处理启动前已经失败的任务
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="alist-task-retry", daemon=True
+        )
+        self._thread.start()
+        if include_existing:
+            for task_type in self.policies:
+                _res = self.client.task_done(task_type)
+                if _res.code != 200:
+                    logger.warning(
+                        "获取已完成任务失败[%s]: %s", task_type, _res.message
+                    )
+                    continue
+                for task in _res.data or []:
+                    if task.state == 3:
+                        self.handle_failed(task_type, task)
+        self._unsubscribe = self.monitor.subscribe(
+            self._on_event, kinds=["failed", "succeeded"]
+        )
+        return self
+
+    def stop(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait(self, timeout: float = None):
+        """阻塞直到stop()被调用或超时"""
+        self._stop.wait(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ================ 处理 =================
+
+    def _on_event(self, event: TaskEvent):
+        if event.task_type not in self.policies:
+            return
+        if event.kind == "failed":
+            self.handle_failed(event.task_type, event.task)
+        elif event.kind == "succeeded" and event.task.id in self.attempts:
+            logger.info("任务重试后成功: %s", event.task.name)
+            self.recovered.add(event.task.id)
+
+    def handle_failed(self, task_type: TaskTypeModify, task: Task):
+        """按照策略安排一次重试，或者放弃"""
+        policy = self.policies[task_type]
+        with self._cond:
+            if task.id in self._scheduled:
+                return
+            attempts = self.attempts.get(task.id, 0)
+            if not policy.should_retry(task.error, attempts):
+                if task.id not in self.gave_up:
+                    logger.warning(
+                        "放弃重试任务[已重试%d次]: %s: %s",
+                        attempts,
+                        task.name,
+                        task.error,
+                    )
+                self.gave_up[task.id] = task.error
+                return
+            delay = policy.delay(attempts + 1)
+            heapq.heappush(self._queue, (time.monotonic() + delay, task_type, task.id))
+            self._scheduled.add(task.id)
+            self._cond.notify_all()
+        logger.info("%.1f秒后重试任务[第%d次]: %s", delay, attempts + 1, task.name)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                # stop() 在持有_cond时notify，必须在锁内再次检查，否则可能错过通知
+                if self._stop.is_set():
+                    break
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                due, task_type, task_id = self._queue[0]
+                if due > time.monotonic():
+                    self._cond.wait(due - time.monotonic())
+                    continue
+                heapq.heappop(self._queue)
+                self._scheduled.discard(task_id)
+                self.attempts[task_id] = self.attempts.get(task_id, 0) + 1
+
+            _res = self.client.task_retry(task_type, task_id)
+            if _res.code == 200:
+                self.retried += 1
+                self.monitor.forget(task_id)
+            else:
+                logger.warning("重试任务失败 %s: %s", task_id, _res.message)
+                self.gave_up[task_id] = _res.message
+            self._save_state()
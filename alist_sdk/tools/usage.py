@@ -0,0 +1,158 @@
+"""目录空间占用统计
+
+目录的 Item.size 通常为0，需要遍历整个目录树，自底向上累加文件大小。
+iter_usage 在一个目录的整个子树列出完成后立即产出该目录的统计，
+因此可以在遍历过程中流式输出（与du相同，子目录先于父目录输出）。
+
+>>> for usage in iter_usage(client, "/media"):
+...     print(usage.size, usage.path)
+"""
+
+import heapq
+import logging
+import threading
+from pathlib import PurePosixPath
+from typing import Callable, Iterable, Iterator
+
+from alist_sdk.client import Client
+from alist_sdk.tools.models import DirUsage
+
+logger = logging.getLogger("alist-sdk.tools.usage")
+
+__all__ = ["iter_usage", "top_usage", "render_tree"]
+
+
+def iter_usage(
+    client: Client,
+    root: str | PurePosixPath,
+    max_workers: int = 10,
+    progress: Callable[[int, int], None] = None,
+) -> Iterator[DirUsage]:
+    """并发遍历root，每个目录的子树完成后立即产出其统计，root最后产出
+
+    :param client: 客户端
+    :param root: 起始目录
+    :param max_workers: 并发列出目录的线程数
+    :param progress: 每列出一个目录调用一次 (已列出目录数, 已统计字节数)
+    """
+    root = PurePosixPath(root)
+    usages: dict[PurePosixPath, DirUsage] = {}
+    remaining: dict[PurePosixPath, int] = {}  # 尚未完成的直接子目录数量
+    failed: list[PurePosixPath] = []
+    lock = threading.Lock()
+    listed = total = 0
+
+    def on_error(path: PurePosixPath, res):
+        logger.warning("列出目录失败[%d]: %s %s", res.code, path, res.message)
+        with lock:
+            failed.append(path)
+
+    def usage_of(path: PurePosixPath) -> DirUsage:
+        if path not in usages:
+            usages[path] = DirUsage(
+                path=path.as_posix(), depth=len(path.relative_to(root).parts)
+            )
+        return usages[path]
+
+    def complete(path: PurePosixPath) -> Iterator[DirUsage]:
+        # 完成的目录累加到父目录，父目录的子目录全部完成时继续向上
+        while True:
+            usage = usages.pop(path)
+            remaining.pop(path, None)
+            yield usage
+            if path == root:
+                return
+            parent = usage_of(path.parent)
+            parent.size += usage.size
+            parent.files += usage.files
+            parent.dirs += usage.dirs + 1
+            parent.incomplete |= usage.incomplete
+            remaining[path.parent] -= 1
+            if remaining[path.parent]:
+                return
+            path = path.parent
+
+    def drain_failed() -> Iterator[DirUsage]:
+        with lock:
+            _failed, failed[:] = list(failed), []
+        for path in _failed:
+            usage_of(path).incomplete = True
+            yield from complete(path)
+
+    for path, items in client.walk_items(
+        root, max_workers=max_workers, on_error=on_error
+    ):
+        usage = usage_of(path)
+        subdirs = 0
+        for item in items:
+            if item.is_dir:
+                subdirs += 1
+            else:
+                usage.size += item.size
+                usage.files += 1
+                total += item.size
+        listed += 1
+        if progress is not None:
+            progress(listed, total)
+        remaining[path] = remaining.get(path, 0) + subdirs
+        if remaining[path] == 0:
+            yield from complete(path)
+        yield from drain_failed()
+    yield from drain_failed()
+
+
+def top_usage(
+    usages: Iterable[DirUsage], n: int = 10, max_depth: int = -1
+) -> list[DirUsage]:
+    """占用最大的n个目录（不包含起始目录）
+
+    :param max_depth: 只统计该深度以内的目录，-1 不限制
+    """
+    return heapq.nlargest(
+        n,
+        (u for u in usages if u.depth > 0 and (max_depth < 0 or u.depth <= max_depth)),
+        key=lambda u: u.size,
+    )
+
+
+def render_tree(
+    usages: Iterable[DirUsage],
+    max_depth: int = -1,
+    size_format: Callable[[int], str] = str,
+) -> Iterator[str]:
+    """将统计渲染为树形文本，同级目录按照大小从大到小排列
+
+    :param max_depth: 最大显示深度，-1 不限制
+    :param size_format: 大小的格式化函数
+    """
+    children: dict[str, list[DirUsage]] = {}
+    root = None
+    for usage in usages:
+        if usage.depth == 0:
+            root = usage
+        elif max_depth < 0 or usage.depth <= max_depth:
+            parent = PurePosixPath(usage.path).parent.as_posix()
+            children.setdefault(parent, []).append(usage)
+    if root is None:
+        return
+
+    def _line(usage: DirUsage, name: str) -> str:
+        mark = " [incomplete]" if usage.incomplete else ""
+        return f"{name} [{size_format(usage.size)}, {usage.files} files]{mark}"
+
+    yield _line(root, root.path)
+    stack = [(c, "", i == 0) for i, c in enumerate(_sorted(children, root.path))]
+    while stack:
+        usage, prefix, last = stack.pop()
+        yield prefix + ("└── " if last else "├── ") + _line(
+            usage, PurePosixPath(usage.path).name
+        )
+        _prefix = prefix + ("    " if last else "│   ")
+        stack.extend(
+            (c, _prefix, i == 0) for i, c in enumerate(_sorted(children, usage.path))
+        )
+
+
+def _sorted(children: dict[str, list[DirUsage]], path: str) -> list[DirUsage]:
+    # 入栈顺序与输出顺序相反：最小的先入栈，最后一个入栈的最先输出
+    return sorted(children.get(path, []), key=lambda u: u.size)
@@ -0,0 +1,207 @@
+"""请求追踪
+
+>>> from alist_sdk import AlistPath, login_server, Client
+>>> from alist_sdk.tracing import Tracer, JsonLinesExporter, render_spans
+>>> tracer = Tracer()  # 默认保存在内存中: tracer.exporter.spans
+>>> client = login_server(Client("http://localhost:5244", token="...", tracer=tracer))
+>>> AlistPath("http://localhost:5244/a.txt").rename(AlistPath("http://localhost:5244/b/c.txt"))
+>>> print("\\n".join(render_spans(tracer.exporter.spans)))
+AlistPath.rename 312.4ms path=/a.txt
+├── AlistPath.exists 40.1ms path=/a.txt
+│   └── ...
+├── Client.move 150.2ms
+│   └── HTTP POST /api/fs/move 149.8ms status=200
+└── Client.rename 120.0ms
+    └── HTTP POST /api/fs/rename 119.7ms status=200
+
+AlistPath 的公开操作、Client 的每个接口方法、每次HTTP请求和重试各产生一个Span，
+父子关系由 contextvars 维护，因此在 asyncio 中同样适用；
+ThreadPoolExecutor 中的工作线程不继承上下文，其中产生的Span为新的根Span。
+使用 JsonLinesExporter 写入文件后，可以用 load_jsonl + render_spans 离线分析。
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from alist_sdk.err import AlistError
+
+__all__ = [
+    "Span",
+    "SpanExporter",
+    "InMemoryExporter",
+    "JsonLinesExporter",
+    "Tracer",
+    "traced",
+    "trace_span",
+    "load_jsonl",
+    "render_spans",
+]
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "alist_sdk_current_span", default=None
+)
+
+
+class Span:
+    """一次操作的耗时记录"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "duration",
+        "attributes",
+        "error",
+        "_begin",
+    )
+
+    def __init__(self, name: str, parent: "Span | None" = None, /, **attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(8).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration: float | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+        self._begin = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._begin
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__ if k != "_begin"}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Span":
+        span = cls.__new__(cls)
+        for k in cls.__slots__:
+            setattr(span, k, data.get(k))
+        span.attributes = span.attributes or {}
+        return span
+
+    def __repr__(self):
+        return f"<Span {self.name} {self.duration}>"
+
+
+class SpanExporter:
+    """Span 结束时调用 export"""
+
+    def export(self, span: Span):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class JsonLinesExporter(SpanExporter):
+    """每个Span写入一行JSON"""
+
+    def __init__(self, file: str | Path):
+        self._lock = threading.Lock()
+        self._fp = Path(file).open("a", encoding="utf-8")
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._fp.write(line + "\n")
+            self._fp.flush()
+
+    def close(self):
+        self._fp.close()
+
+
+class Tracer:
+    def __init__(self, exporter: SpanExporter = None):
+        self.exporter = exporter or InMemoryExporter()
+
+    @contextmanager
+    def span(self, name: str, /, **attributes) -> Iterator[Span]:
+        """开始一个Span，当前上下文中已有Span时作为其子Span"""
+        span = Span(name, _current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.finish()
+            _current_span.reset(token)
+            self.exporter.export(span)
+
+
+def trace_span(tracer: Tracer | None, name: str, /, **attributes):
+    """tracer为None时返回空的上下文管理器（as 得到 None）"""
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, **attributes)
+
+
+def traced(func):
+    """AlistPath 方法的装饰器，客户端设置了tracer时记录Span"""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            tracer = self.client.tracer
+        except AlistError:  # 未登录等错误交给被装饰的方法处理
+            tracer = None
+        with trace_span(tracer, f"AlistPath.{func.__name__}", path=self.as_posix()):
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+def load_jsonl(file: str | Path) -> list[Span]:
+    """读取 JsonLinesExporter 写入的文件"""
+    with Path(file).open(encoding="utf-8") as fp:
+        return [Span.from_dict(json.loads(line)) for line in fp if line.strip()]
+
+
+def render_spans(spans: Iterable[Span]) -> Iterator[str]:
+    """按照父子关系渲染为树形文本，同级按开始时间排序"""
+    spans = sorted(spans, key=lambda s: s.start)
+    ids = {s.span_id for s in spans}
+    children: dict[str | None, list[Span]] = {}
+    for s in spans:
+        # 父Span不在集合中（例如只导出了一部分）时视为根
+        children.setdefault(s.parent_id if s.parent_id in ids else None, []).append(s)
+
+    def _line(s: Span) -> str:
+        attrs = " ".join(f"{k}={v}" for k, v in s.attributes.items())
+        error = f" ERROR {s.error}" if s.error else ""
+        return f"{s.name} {(s.duration or 0) * 1000:.1f}ms {attrs}".rstrip() + error
+
+    def _render(s: Span, prefix: str) -> Iterator[str]:
+        subs = children.get(s.span_id, [])
+        for i, c in enumerate(subs):
+            last = i == len(subs) - 1
+            yield prefix + ("└── " if last else "├── ") + _line(c)
+            yield from _render(c, prefix + ("    " if last else "│   "))
+
+    for root in children.get(None, []):
+        yield _line(root)
+        yield from _render(root, "")
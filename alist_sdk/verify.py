@@ -2,11 +2,33 @@ import json
 import logging
 from functools import wraps
 from json import JSONDecodeError
+from typing import Any, Callable
 
 import httpx
-from pydantic import ValidationError
-
-from alist_sdk.models import Resp, ListItem, Item, RawItem, BaseModel, TaskType
+from pydantic import ValidationError, TypeAdapter
+
+from alist_sdk.metrics import endpoint_of
+from alist_sdk.tracing import trace_span
+from alist_sdk.profiling import profile_section
+from alist_sdk.models import (
+    Resp,
+    ListItem,
+    Item,
+    RawItem,
+    BaseModel,
+    TaskType,
+    Me,
+    DirItem,
+    SearchItem,
+    ListContents,
+    ListTask,
+    AsTask,
+    Task,
+    Setting,
+    Storage,
+    User,
+    Meta,
+)
 
 logger = logging.getLogger("alist-sdk.verify")
 
@@ -15,9 +37,73 @@ __all__ = [
     "verify",
     "AsyncVerify",
     "async_verify",
+    "decode_resp",
+    "TRUSTED_DECODERS",
 ]
 
 
+def _typed(data_type) -> Callable[[Any], Any]:
+    """直接按照确定的类型校验data，跳过Resp.data的Union匹配"""
+    return TypeAdapter(data_type).validate_python
+
+
+def _list_contents(item_type) -> Callable[[Any], ListContents]:
+    """ListContents.content 只按照确定的类型校验"""
+    validate_content = TypeAdapter(list[item_type] | None).validate_python
+
+    def _decode(data: dict) -> ListContents:
+        return ListContents.model_construct(
+            content=validate_content(data.get("content")),
+            total=data.get("total", 0),
+        )
+
+    return _decode
+
+
+# 受信任的服务端: API路径 -> data解码器
+TRUSTED_DECODERS: dict[str, Callable[[Any], Any]] = {
+    "/api/me": _typed(Me),
+    "/api/fs/list": _typed(ListItem),
+    "/api/fs/get": _typed(RawItem),
+    "/api/fs/dirs": _typed(list[DirItem] | None),
+    "/api/fs/search": _list_contents(SearchItem),
+    "/api/fs/copy": _typed(ListTask | None),
+    "/api/fs/put": _typed(AsTask | None),
+    "/api/fs/form": _typed(AsTask | None),
+    "/api/admin/storage/list": _list_contents(Storage),
+    "/api/admin/user/list": _list_contents(User),
+    "/api/admin/meta/list": _list_contents(Meta),
+    "/api/admin/setting/list": _typed(list[Setting]),
+    **{
+        f"/api/admin/task/{tt}/{ts}": _typed(list[Task] | None)
+        for tt in TaskType
+        for ts in ["done", "undone"]
+    },
+}
+
+
+def decode_resp(url_path: str, res_dict: dict, trusted: bool = False) -> Resp:
+    """将响应字典解码为Resp
+
+    :param url_path: 请求的URL路径，用于在受信任模式下选择解码器
+    :param res_dict: 响应JSON
+    :param trusted: 受信任模式，Resp直接构造，data按照接口确定的类型校验。
+        未知接口或code!=200时回退到完整校验。
+    """
+    decoder = None
+    if trusted and res_dict.get("code") == 200:
+        decoder = TRUSTED_DECODERS.get(url_path[url_path.find("/api/") :])
+
+    if decoder is None:
+        return Resp.model_validate(res_dict)
+
+    return Resp.model_construct(
+        code=200,
+        message=res_dict.get("message", ""),
+        data=decoder(res_dict.get("data")),
+    )
+
+
 class Verify:
     def __init__(self):
         self.locals: dict = {}
@@ -37,13 +123,14 @@ class Verify:
             BaseModel: [],
         }
 
-    def acting(self, resp: Resp) -> Resp:
+    def acting(self, resp: Resp, request: httpx.Request = None) -> Resp:
         """对Resp做额外的修饰"""
-        if not isinstance(self.request, httpx.Request):
+        request = request or self.request
+        if not isinstance(request, httpx.Request):
             return resp
 
         if (
-            self.request.url.path
+            request.url.path
             in [
                 *[
                     f"/api/admin/task/{tt}/{ts}"
@@ -58,24 +145,34 @@ class Verify:
 
         return resp
 
-    def _verify(self, local_s, res: httpx.Response):
+    def _verify(
+        self, local_s, res: httpx.Response, trusted: bool = False, metrics=None
+    ):
         self.locals.update(local_s)
         self.request = res.request
         url = res.request.url.path
-        args = "\n>>>".join(f"{k}: {v}" for k, v in self.locals.items() if k != "data")
-        logger.debug(
-            f">>> 响应详情: [{self.request.method}] {url}\n"
-            f">>> {args}\n"
-            f"<<<[{res.status_code}]\n"
-            f"<<<{res.text}"
-        )
+        # 同一个Verify实例会被多个线程共用，以下只使用本次调用的局部变量
+        if logger.isEnabledFor(logging.DEBUG):  # res.text 会解码整个响应体
+            args = "\n>>>".join(f"{k}: {v}" for k, v in local_s.items() if k != "data")
+            logger.debug(
+                f">>> 响应详情: [{res.request.method}] {url}\n"
+                f">>> {args}\n"
+                f"<<<[{res.status_code}]\n"
+                f"<<<{res.text}"
+            )
         try:
-            res_dict = res.json()
-            resp = Resp.model_validate(res_dict)
-            return self.acting(resp)
+            with profile_section("json"):
+                res_dict = res.json()
+            with profile_section("validate"):
+                resp = decode_resp(url, res_dict, trusted=trusted)
+            if metrics is not None:
+                metrics.on_code(endpoint_of(url), resp.code)
+            return self.acting(resp, res.request)
 
         except JSONDecodeError:
             logger.warning("JsonDecodeError: [http_status: %d] ", res.status_code)
+            if metrics is not None:
+                metrics.on_code(endpoint_of(url), res.status_code)
             return Resp(
                 code=res.status_code, message=f"JsonDecodeError: {res.text}", data=None
             )
@@ -100,7 +197,19 @@ class Verify:
     def __call__(self, func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            return self._verify(*func(*args, **kwargs))
+            client = args[0] if args else None
+            with (
+                trace_span(getattr(client, "tracer", None), f"Client.{func.__name__}"),
+                profile_section(f"Client.{func.__name__}"),
+            ):
+                local_s, res = func(*args, **kwargs)
+                with profile_section("verify"):
+                    return self._verify(
+                        local_s,
+                        res,
+                        trusted=getattr(client, "trusted_server", False),
+                        metrics=getattr(client, "metrics", None),
+                    )
 
         return wrapper  # 返回函数
 
@@ -114,7 +223,19 @@ class AsyncVerify(Verify):
     def __call__(self, func):
         @wraps(func)
         async def async_wrapper(*args, **kwargs) -> Resp:
-            return self._verify(*(await func(*args, **kwargs)))
+            client = args[0] if args else None
+            with (
+                trace_span(getattr(client, "tracer", None), f"Client.{func.__name__}"),
+                profile_section(f"Client.{func.__name__}"),
+            ):
+                local_s, res = await func(*args, **kwargs)
+                with profile_section("verify"):
+                    return self._verify(
+                        local_s,
+                        res,
+                        trusted=getattr(client, "trusted_server", False),
+                        metrics=getattr(client, "metrics", None),
+                    )
 
         return async_wrapper  # 返回函数
 
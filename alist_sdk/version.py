@@ -108,8 +108,49 @@
     1. alist 支持到 3.42.0
     2. 支持 AlistPath.rmdir 删除空目录，使用 unlink 接口, Alist提供的接口不生效。
     3. 更新单元测试。
+
+0.42.21:
+    1. Client(trusted_server=True) 受信任模式，响应按接口确定的类型快速解码。
+    2. 添加Client.walk_items 并发遍历目录树。
+    3. 添加Client.iter_search 和 AlistPath.search，分页流式搜索，搜索不可用时回退到并发遍历。
+    4. 添加tools.indexer.PathIndex 本地SQLite路径索引，支持增量更新，以及CLI命令 alist-cli find。
+    5. 添加Client.wait_for_tasks 和 AsyncClient.wait_for_tasks，批量轮询等待任务完成。
+    6. 添加tools.task_monitor.TaskMonitor 任务事件监视器，支持回调和异步迭代器，同一服务器共用轮询线程。
+    7. 添加Client.task_bulk / task_cancel_many / task_retry_many / task_delete_many，按条件批量管理任务，
+        使用 {cancel,retry,delete}_some 批量接口分组请求。
+    8. 添加tools.task_retry.RetryController，按照任务类型的RetryPolicy自动重试失败的任务。
+    9. tools.configs 并发导出配置，按照 settings -> storages -> metas, users 的顺序分组并发导入，并返回ConfigImportResult。
+       BUGFIX: Verify 在多线程共用时，日志和acting使用了其他线程的请求。
+    10. 添加tools.configs.diff_configs / apply_config_changes / sync_configs，增量同步两个服务器的配置。
+    11. 添加tools.configs.export_configs_to_jsonl / import_configs_from_jsonl，逐行导出和导入配置，导入中断后可以继续。
+    12. 添加Client.probe_storages 和 AsyncClient.probe_storages，并发探测存储器的耗时和错误，以及CLI命令 alist-cli admin storage probe。
+    13. 添加tools.mirror.TreeMirror 目录树镜像，同一服务器使用服务端复制，跨服务器流式传输，支持状态文件续传。
+    14. 添加tools.local_sync.UploadSync，以及 alist-fs upload --sync，将本地目录增量同步到远程。
+    15. 添加tools.local_sync.DownloadSync，alist-fs download 只下载新增或变化的文件，支持并发、带宽限制和原子重命名。
+        BUGFIX: alist-fs download 总是下载src而不是子文件。
+    16. 实现 alist-fs cp：同一服务器使用服务端复制并等待任务，跨服务器流式传输，下载时分段并发，上传时并发。
+    17. 添加tools.usage 目录空间占用统计，以及CLI命令 alist-fs du / alist-fs tree。
+    18. CLI启动加速：Client / AlistPath 延迟导入，配置在第一次使用时加载，xor按整数一次计算，
+        验证过的token在SESSION_TTL内不再请求 /api/me。添加 benchmarks/cli_startup.py。
+    19. 添加 alist-cli daemon 会话守护进程，运行时只读命令通过Unix Socket转发执行，复用连接和目录缓存；
+        alist_sdk 的模型也改为延迟导入。BUGFIX: dict_files_items 缓存超过1000条时抛出KeyError。
+    20. 添加Client.iter_files分页迭代目录。alist-fs ls 改为一次分页列出，不再逐个stat，
+        支持 --long / --json / --type / --min-size / --sort / --reverse。
+    21. 添加alist_sdk.metrics：Client / AsyncClient(metrics=...) 记录各接口的请求数、耗时直方图、收发字节、
+        Alist code、重试、信号量等待和缓存命中，Metrics.render_prometheus 输出Prometheus文本格式。
+    22. 添加alist_sdk.tracing：Client / AsyncClient(tracer=...) 为AlistPath操作、Client接口、HTTP请求和重试记录父子Span，
+        支持内存和JSON Lines导出，render_spans 渲染为树形文本。
+    23. 添加 benchmarks/mock_server.py 模拟服务端（可配置延迟、目录规模、错误率）和 benchmarks/client_bench.py
+        列出、stat、遍历、上传、异步并发等场景的基准，结果可保存为JSON并与基准对比。
+    24. 添加 benchmarks/model_decoding.py 模型解码基准，使用 tests/models_simple 中的真实响应放大到
+        10 ~ 1000000 个对象，对比 model_validate、model_validate_json、trusted 解码的吞吐量和峰值内存。
+    25. Client / AsyncClient 添加 record 参数，录制请求和响应到文件；alist_sdk.replay.ReplayTransport
+        按照录制的耗时（可以倍速）离线回放，benchmarks/replay_bench.py 回放录制的流量测量SDK性能。
+    26. 添加 alist_sdk.profiling 性能分析，环境变量 ALIST_SDK_PROFILE 或 Client(profile=...) 启用，
+        记录信号量等待、网络、响应解析、校验、路径解析的耗时，退出时输出汇总表或折叠栈；
+        Verify._verify 只在启用DEBUG日志时才格式化响应详情。
 """
 
-__version__ = "0.42.20"
+__version__ = "0.42.21"
 
 ALIST_VERSION = "v3.42.0"
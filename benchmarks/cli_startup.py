@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CLI 启动时间基准
+
+每条命令在新的解释器中运行多次，输出中位数和最小值。
+    python benchmarks/cli_startup.py [-n 10]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    "python": [sys.executable, "-c", "pass"],
+    "import alist_sdk": [sys.executable, "-c", "import alist_sdk"],
+    "import cmd.app": [sys.executable, "-c", "import alist_sdk.cmd.app"],
+    "import Client": [sys.executable, "-c", "from alist_sdk import Client"],
+    "alist-cli --help": [sys.executable, "-m", "alist_sdk", "--help"],
+    "alist-cli version": [sys.executable, "-m", "alist_sdk", "version"],
+}
+
+
+def bench(cmd: list[str], number: int) -> list[float]:
+    times = []
+    for _ in range(number):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-n", "--number", type=int, default=10, help="每条命令的运行次数"
+    )
+    args = parser.parse_args()
+
+    print(f"{'command':<24}{'median':>10}{'min':>10}")
+    for name, cmd in COMMANDS.items():
+        times = bench(cmd, args.number)
+        print(
+            f"{name:<24}{statistics.median(times) * 1000:>8.1f}ms"
+            f"{min(times) * 1000:>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
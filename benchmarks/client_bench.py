@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Client 性能基准，运行在 benchmarks/mock_server.py 模拟的服务端上
+
+    python benchmarks/client_bench.py                       # 全部场景
+    python benchmarks/client_bench.py -s list -s walk --latency 0.005
+    python benchmarks/client_bench.py -o new.json --compare old.json
+
+场景：
+    list     重复列出同一个目录
+    paged    Client.iter_files 分页列出
+    stat     并发 get_item_info
+    walk     Client.walk_items 并发遍历整个目录树
+    upload   并发 upload_file_put
+    async    AsyncClient 并发列出目录
+    tasks    task_done / task_undone
+结果输出为表格，-o 保存为JSON用于回归对比；--record 录制的流量可以用 replay_bench.py 离线回放。
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from alist_sdk import Client, AsyncClient, __version__
+from mock_server import MockAlistServer, MockConfig
+
+
+class Recorder:
+    """记录每次操作的耗时"""
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.items = 0
+        self.bytes = 0
+
+    def timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        res = func(*args, **kwargs)
+        self.latencies.append(time.perf_counter() - start)
+        if getattr(res, "code", 200) != 200:
+            self.errors += 1
+        return res
+
+    def result(self, name: str, seconds: float) -> dict:
+        lat = sorted(self.latencies) or [0.0]
+        ops = len(self.latencies)
+        return {
+            "name": name,
+            "ops": ops,
+            "errors": self.errors,
+            "seconds": round(seconds, 4),
+            "ops_per_sec": round(ops / seconds, 1) if seconds else 0,
+            "items_per_sec": round(self.items / seconds, 1) if seconds else 0,
+            "mb_per_sec": round(self.bytes / seconds / 1024**2, 2) if seconds else 0,
+            "p50_ms": round(statistics.median(lat) * 1000, 3),
+            "p95_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000, 3),
+        }
+
+
+def _file_paths(config: MockConfig, n: int) -> list[str]:
+    return [f"/d{i % config.dirs}/f{i % config.files}.bin" for i in range(n)]
+
+
+def bench_list(client: Client, config: MockConfig, args) -> Recorder:
+    rec = Recorder()
+    for _ in range(args.number):
+        res = rec.timed(client.list_files, "/")
+        rec.items += len(res.data.content or []) if res.code == 200 else 0
+    return rec
+
+
+def bench_paged(client: Client, config: MockConfig, args) -> Recorder:
+    rec = Recorder()
+    for _ in range(max(args.number // 10, 1)):
+        rec.items += len(rec.timed(list, client.iter_files("/", per_page=20)))
+    return rec
+
+
+def bench_stat(client: Client, config: MockConfig, args) -> Recorder:
+    rec = Recorder()
+    with ThreadPoolExecutor(args.jobs) as pool:
+        for _ in pool.map(
+            lambda p: rec.timed(client.get_item_info, p),
+            _file_paths(config, args.number * 5),
+        ):
+            rec.items += 1
+    return rec
+
+
+def bench_walk(client: Client, config: MockConfig, args) -> Recorder:
+    rec = Recorder()
+    start = time.perf_counter()
+    for _, items in client.walk_items("/", max_workers=args.jobs):
+        rec.latencies.append(time.perf_counter() - start)
+        rec.items += len(items)
+        start = time.perf_counter()
+    return rec
+
+
+def bench_upload(client: Client, config: MockConfig, args) -> Recorder:
+    rec = Recorder()
+    data = b"0" * args.upload_size
+
+    def _upload(p):
+        rec.timed(client.upload_file_put, data, p)
+        rec.bytes += len(data)
+
+    with ThreadPoolExecutor(args.jobs) as pool:
+        list(pool.map(_upload, [f"/upload/f{i}.bin" for i in range(args.number)]))
+    return rec
+
+
+def bench_async(client: Client, config: MockConfig, args) -> Recorder:
+    rec = Recorder()
+
+    async def _list(c: AsyncClient, path):
+        start = time.perf_counter()
+        res = await c.list_files(path)
+        rec.latencies.append(time.perf_counter() - start)
+        if res.code != 200:
+            rec.errors += 1
+        else:
+            rec.items += len(res.data.content or [])
+
+    async def _main():
+        c = AsyncClient(
+            client.base_url, max_connect=args.jobs, trusted_server=args.trusted
+        )
+        paths = [f"/d{i % config.dirs}" for i in range(args.number)]
+        await asyncio.gather(*(_list(c, p) for p in paths))
+        await c.aclose()
+
+    asyncio.run(_main())
+    return rec
+
+
+def bench_tasks(client: Client, config: MockConfig, args) -> Recorder:
+    rec = Recorder()
+    for i in range(max(args.number // 10, 1)):
+        res = rec.timed(client.task_done if i % 2 else client.task_undone, "copy")
+        rec.items += len(res.data or []) if res.code == 200 else 0
+    return rec
+
+
+SCENARIOS = {
+    "list": bench_list,
+    "paged": bench_paged,
+    "stat": bench_stat,
+    "walk": bench_walk,
+    "upload": bench_upload,
+    "async": bench_async,
+    "tasks": bench_tasks,
+}
+
+
+def run(url: str, config: MockConfig, args) -> list[dict]:
+    client = Client(url, token="mock", trusted_server=args.trusted, record=args.record)
+    results = []
+    for name in args.scenario or SCENARIOS:
+        start = time.perf_counter()
+        rec = SCENARIOS[name](client, config, args)
+        results.append(rec.result(name, time.perf_counter() - start))
+    client.close()
+    return results
+
+
+def print_results(results: list[dict], baseline: dict[str, dict] = None):
+    cols = ["ops", "errors", "seconds", "ops_per_sec", "items_per_sec"]
+    cols += ["mb_per_sec", "p50_ms", "p95_ms"]
+    print(f"{'scenario':<10}" + "".join(f"{c:>14}" for c in cols))
+    for r in results:
+        line = f"{r['name']:<10}" + "".join(f"{r[c]:>14}" for c in cols)
+        if baseline and r["name"] in baseline and baseline[r["name"]]["seconds"]:
+            ratio = r["seconds"] / baseline[r["name"]]["seconds"]
+            line += f"  {ratio:.2f}x time vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "-s", "--scenario", action="append", choices=SCENARIOS, help="可以重复指定"
+    )
+    parser.add_argument("-n", "--number", type=int, default=200, help="操作次数基数")
+    parser.add_argument("-j", "--jobs", type=int, default=10, help="并发数")
+    parser.add_argument("--upload-size", type=int, default=64 * 1024)
+    parser.add_argument("--trusted", action="store_true", help="trusted_server模式")
+    parser.add_argument("--url", help="使用已经运行的模拟服务端，不在进程内启动")
+    parser.add_argument(
+        "--record", help="录制同步场景的请求，用于 replay_bench.py 回放"
+    )
+    parser.add_argument("-o", "--output", help="保存结果的JSON文件")
+    parser.add_argument("--compare", help="对比的基准JSON文件")
+    for name, default in asdict(MockConfig()).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=type(default), default=default
+        )
+    args = parser.parse_args()
+    config = MockConfig(**{k: getattr(args, k) for k in asdict(MockConfig())})
+
+    if args.url:
+        results = run(args.url, config, args)
+    else:
+        with MockAlistServer(config) as server:
+            results = run(server.url, config, args)
+
+    baseline = None
+    if args.compare:
+        data = json.loads(Path(args.compare).read_text())
+        baseline = {r["name"]: r for r in data["results"]}
+    print_results(results, baseline)
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps(
+                {
+                    "version": __version__,
+                    "python": platform.python_version(),
+                    "time": datetime.now().isoformat(timespec="seconds"),
+                    "config": asdict(config),
+                    "args": {
+                        k: v
+                        for k, v in vars(args).items()
+                        if k in ("number", "jobs", "upload_size", "trusted", "url")
+                    },
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
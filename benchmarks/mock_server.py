@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟的Alist服务端，用于基准测试
+
+目录树按照路径确定地生成：深度小于 depth 的目录包含 dirs 个子目录 d0..dN 和 files 个文件 f0.bin..fN.bin。
+支持的接口：
+    GET  /api/me
+    POST /api/fs/list  (支持 page / per_page)
+    POST /api/fs/get
+    PUT  /api/fs/put   (读取并丢弃请求体)
+    POST /api/fs/mkdir, /api/fs/remove, /api/fs/copy, /api/fs/move, /api/fs/rename
+    GET  /api/admin/task/{type}/done|undone
+    POST /api/admin/task/{type}/delete|cancel|retry|clear_done|clear_succeeded
+
+每个请求先等待 latency(+jitter) 秒，再以 error_rate 的概率返回 code=500。
+
+进程内启动：
+    with MockAlistServer(MockConfig(latency=0.005)) as server:
+        client = Client(server.url, token="mock")
+单独启动（避免与被测客户端竞争GIL）：
+    python benchmarks/mock_server.py --port 5244 --latency 0.005
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+MODIFIED = "2024-01-01T00:00:00+08:00"
+
+
+@dataclass(frozen=True)
+class MockConfig:
+    depth: int = 3  # 目录树深度
+    dirs: int = 5  # 每个目录的子目录数
+    files: int = 100  # 每个目录的文件数
+    file_size: int = 1024 * 1024
+    tasks: int = 100  # done 和 undone 中的任务数
+    latency: float = 0.0  # 每个请求的延迟（秒）
+    jitter: float = 0.0  # 延迟的随机抖动（秒）
+    error_rate: float = 0.0  # 返回 code=500 的概率
+    seed: int = 0
+
+
+def _item(name: str, is_dir: bool, size: int) -> dict:
+    return {
+        "name": name,
+        "size": 0 if is_dir else size,
+        "is_dir": is_dir,
+        "modified": MODIFIED,
+        "created": MODIFIED,
+        "sign": "",
+        "thumb": "",
+        "type": 1 if is_dir else 0,
+        "hashinfo": "null",
+        "hash_info": None,
+    }
+
+
+def _task(i: int, done: bool) -> dict:
+    return {
+        "id": f"task-{'d' if done else 'u'}{i}",
+        "name": f"copy [/src](/f{i}.bin) to [/dst](/)",
+        "state": 2 if done else 1,
+        "status": "" if done else "running",
+        "progress": 100 if done else 50,
+        "error": "",
+    }
+
+
+def _ok(data) -> dict:
+    return {"code": 200, "message": "success", "data": data}
+
+
+class MockAlist:
+    """与HTTP无关的接口实现，handle 返回响应体（HTTP状态码总是200，与Alist一致）"""
+
+    def __init__(self, config: MockConfig = MockConfig()):
+        self.config = config
+        self.requests = 0
+        self._rand = random.Random(config.seed)
+        self._lock = threading.Lock()
+        # 响应体只与参数有关，缓存后服务端几乎不消耗CPU
+        self._encode_list = lru_cache(maxsize=4096)(self._encode_list)
+
+    def _depth(self, path: str) -> int | None:
+        """目录的深度，路径不存在时返回None"""
+        parts = [p for p in path.split("/") if p]
+        for p in parts:
+            if not (p[0] == "d" and p[1:].isdigit() and int(p[1:]) < self.config.dirs):
+                return None
+        return len(parts) if len(parts) <= self.config.depth else None
+
+    def _is_file(self, path: str) -> bool:
+        parent, _, name = path.rstrip("/").rpartition("/")
+        return (
+            name.startswith("f")
+            and name.endswith(".bin")
+            and name[1:-4].isdigit()
+            and int(name[1:-4]) < self.config.files
+            and self._depth(parent or "/") is not None
+        )
+
+    def _children(self, depth: int) -> list[dict]:
+        c = self.config
+        res = [_item(f"d{i}", True, 0) for i in range(c.dirs if depth < c.depth else 0)]
+        res += [_item(f"f{i}.bin", False, c.file_size) for i in range(c.files)]
+        return res
+
+    def _encode_list(self, depth: int, page: int, per_page: int) -> bytes:
+        content = self._children(depth)
+        total = len(content)
+        if per_page > 0:
+            content = content[(page - 1) * per_page : page * per_page]
+        data = {
+            "content": content,
+            "total": total,
+            "readme": "",
+            "header": "",
+            "write": True,
+            "provider": "Mock",
+        }
+        return json.dumps(_ok(data)).encode()
+
+    def _error(self, message: str) -> bytes:
+        return json.dumps({"code": 500, "message": message, "data": None}).encode()
+
+    def handle(self, method: str, path: str, body: bytes) -> bytes:
+        c = self.config
+        with self._lock:
+            self.requests += 1
+            delay = c.latency + (self._rand.uniform(0, c.jitter) if c.jitter else 0)
+            failed = c.error_rate and self._rand.random() < c.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return self._error("mock error")
+
+        args = json.loads(body) if body and method == "POST" else {}
+        if path == "/api/me":
+            return json.dumps(
+                _ok(
+                    {
+                        "id": 1,
+                        "username": "admin",
+                        "password": "",
+                        "base_path": "/",
+                        "role": 2,
+                        "disabled": False,
+                        "permission": 0,
+                        "sso_id": "",
+                        "otp": False,
+                    }
+                )
+            ).encode()
+
+        if path == "/api/fs/list":
+            depth = self._depth(args.get("path", "/"))
+            if depth is None:
+                return self._error("object not found")
+            return self._encode_list(
+                depth, args.get("page") or 1, args.get("per_page") or 0
+            )
+
+        if path == "/api/fs/get":
+            p = args.get("path", "/")
+            is_dir = self._depth(p) is not None
+            if not is_dir and not self._is_file(p):
+                return self._error("object not found")
+            item = _item(p.rstrip("/").rpartition("/")[2] or "/", is_dir, c.file_size)
+            item.update(raw_url="", readme="", provider="Mock", related=None)
+            return json.dumps(_ok(item)).encode()
+
+        if path == "/api/fs/put":
+            return json.dumps(_ok(None)).encode()
+
+        if path.startswith("/api/fs/"):
+            return json.dumps(_ok(None)).encode()
+
+        if path.startswith("/api/admin/task/"):
+            action = path.rsplit("/", 1)[1]
+            if action in ("done", "undone"):
+                done = action == "done"
+                tasks = [_task(i, done) for i in range(c.tasks)]
+                return json.dumps(_ok(tasks)).encode()
+            return json.dumps(_ok(None)).encode()
+
+        return self._error(f"mock: unsupported api {path}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 保持连接，与真实服务端一致
+    disable_nagle_algorithm = (
+        True  # 响应头和响应体分两次写入，避免延迟确认带来的40ms等待
+    )
+    server: "MockAlistServer"
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        res = self.server.alist.handle(self.command, urlparse(self.path).path, body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(res)))
+        self.end_headers()
+        self.wfile.write(res)
+
+    do_GET = do_POST = do_PUT = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockAlistServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig = MockConfig(), host="127.0.0.1", port=0):
+        self.alist = MockAlist(config)
+        super().__init__((host, port), _Handler)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self) -> "MockAlistServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5244)
+    for name, default in asdict(MockConfig()).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=type(default), default=default
+        )
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    server = MockAlistServer(MockConfig(**args), host, port)
+    print(f"Mock Alist server: {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型解码基准，使用 tests/models_simple 中录制的真实响应，按照数量放大后测量解码速度
+
+    python benchmarks/model_decoding.py                 # 10, 1000, 100000
+    python benchmarks/model_decoding.py --full          # 10 ~ 1000000，需要数GB内存
+    python benchmarks/model_decoding.py --sizes 100,5000 -c "Resp /api/fs/list"
+    python benchmarks/model_decoding.py -o new.json --compare old.json
+
+用例：
+    Item / RawItem            N个对象的列表
+    Resp <api>                Resps.json 中的响应，列表类的data放大到N个元素，其他响应重复解码N次
+解码方式：
+    standard       Resp.model_validate / TypeAdapter.validate_python（先json.loads）
+    json           Resp.model_validate_json / TypeAdapter.validate_json
+    trusted        decode_resp(..., trusted=True)，Client(trusted_server=True) 使用的方式
+    construct      model_construct，不做校验，作为下限参考
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pydantic import TypeAdapter
+
+from alist_sdk import __version__
+from alist_sdk.models import Item, RawItem, Resp
+from alist_sdk.verify import decode_resp
+
+MODEL_SIMPLE = Path(__file__).parent.parent.joinpath("tests", "models_simple")
+DEFAULT_SIZES = [10, 1000, 100_000]
+FULL_SIZES = [10, 100, 1000, 10_000, 100_000, 1_000_000]
+
+
+def _cycle(items: list, n: int) -> list:
+    return (items * (n // len(items) + 1))[:n]
+
+
+def _scalable(data) -> list | None:
+    """data中可以放大的列表"""
+    if isinstance(data, list) and data:
+        return data
+    if isinstance(data, dict) and data.get("content"):
+        return data["content"]
+    return None
+
+
+class Case:
+    """一个用例：payload(n) 生成JSON bytes，decoders 为 {名称: bytes -> 解码结果}"""
+
+    def __init__(self, name: str, payload, decoders: dict[str, Callable], repeat_n):
+        self.name = name
+        self.payload = payload
+        self.decoders = decoders
+        # 不可放大的响应重复解码N次
+        self.repeat_n = repeat_n
+
+
+def _model_case(name: str, model, fixture: str) -> Case:
+    items = json.loads(MODEL_SIMPLE.joinpath(fixture).read_text())
+    adapter = TypeAdapter(list[model])
+    return Case(
+        name,
+        lambda n: json.dumps(_cycle(items, n)).encode(),
+        {
+            "standard": lambda raw: adapter.validate_python(json.loads(raw)),
+            "json": adapter.validate_json,
+            "construct": lambda raw: [
+                model.model_construct(**d) for d in json.loads(raw)
+            ],
+        },
+        repeat_n=False,
+    )
+
+
+def _resp_case(url: str, resp: dict) -> Case:
+    items = _scalable(resp["data"])
+
+    def payload(n):
+        if items is None:
+            return json.dumps(resp).encode()
+        data = _cycle(items, n)
+        if isinstance(resp["data"], dict):
+            data = dict(resp["data"], content=data, total=n)
+        return json.dumps(dict(resp, data=data)).encode()
+
+    return Case(
+        f"Resp {url}",
+        payload,
+        {
+            "standard": lambda raw: Resp.model_validate(json.loads(raw)),
+            "json": Resp.model_validate_json,
+            "trusted": lambda raw: decode_resp(url, json.loads(raw), trusted=True),
+        },
+        repeat_n=items is None,
+    )
+
+
+def load_cases() -> list[Case]:
+    cases = [
+        _model_case("Item", Item, "Items.json"),
+        _model_case("RawItem", RawItem, "RawItems.json"),
+    ]
+    seen = set()
+    for url, _, resp in json.loads(MODEL_SIMPLE.joinpath("Resps.json").read_text()):
+        if url not in seen and resp.get("code") == 200:
+            seen.add(url)
+            cases.append(_resp_case(url, resp))
+    return cases
+
+
+def measure(func: Callable, raw: bytes, times: int, min_time: float) -> float:
+    """多次运行取最快一次，返回单次（times次解码）的秒数"""
+    best = float("inf")
+    total = 0.0
+    while total < min_time or best == float("inf"):
+        start = time.perf_counter()
+        for _ in range(times):
+            func(raw)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+    return best
+
+
+def peak_memory(func: Callable, raw: bytes) -> int:
+    """解码过程的峰值内存（不包含payload本身）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        res = func(raw)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del res
+    return peak
+
+
+def run(cases: list[Case], sizes: list[int], min_time: float, memory_max: int):
+    for case in cases:
+        for n in sizes:
+            raw = case.payload(n)
+            times = n if case.repeat_n else 1
+            base = None
+            for mode, func in case.decoders.items():
+                seconds = measure(func, raw, times, min_time)
+                base = base or seconds
+                r = {
+                    "case": case.name,
+                    "n": n,
+                    "mode": mode,
+                    "seconds": seconds,
+                    "objects_per_sec": round(n / seconds, 1),
+                    "mb_per_sec": round(len(raw) * times / seconds / 1024**2, 2),
+                    "speedup": round(base / seconds, 2),
+                    "peak_mb": None,
+                }
+                if n <= memory_max and not case.repeat_n:
+                    r["peak_mb"] = round(peak_memory(func, raw) / 1024**2, 2)
+                yield r
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", help="逗号分隔的数量，默认 10,1000,100000")
+    parser.add_argument("--full", action="store_true", help="10 ~ 1000000")
+    parser.add_argument(
+        "-c", "--case", action="append", help="只运行名称包含该字符串的用例，可重复"
+    )
+    parser.add_argument("--min-time", type=float, default=0.2, help="每项最少运行秒数")
+    parser.add_argument(
+        "--memory-max",
+        type=int,
+        default=100_000,
+        help="只在数量不超过该值时测量峰值内存（tracemalloc很慢），0为不测量",
+    )
+    parser.add_argument("-o", "--output", help="保存结果的JSON文件")
+    parser.add_argument("--compare", help="对比的基准JSON文件")
+    args = parser.parse_args()
+
+    sizes = FULL_SIZES if args.full else DEFAULT_SIZES
+    if args.sizes:
+        sizes = [int(s) for s in args.sizes.split(",")]
+    cases = [
+        c for c in load_cases() if not args.case or any(k in c.name for k in args.case)
+    ]
+
+    baseline = {}
+    if args.compare:
+        for r in json.loads(Path(args.compare).read_text())["results"]:
+            baseline[(r["case"], r["n"], r["mode"])] = r
+
+    print(
+        f"{'case':<36}{'n':>9} {'mode':<10}{'objects/s':>14}{'MB/s':>10}"
+        f"{'peak MB':>10}{'speedup':>9}"
+    )
+    results = []
+    for r in run(cases, sizes, args.min_time, args.memory_max):
+        results.append(r)
+        line = (
+            f"{r['case']:<36}{r['n']:>9} {r['mode']:<10}{r['objects_per_sec']:>14}"
+            f"{r['mb_per_sec']:>10}{r['peak_mb'] if r['peak_mb'] is not None else '-':>10}"
+            f"{r['speedup']:>8}x"
+        )
+        if old := baseline.get((r["case"], r["n"], r["mode"])):
+            line += f"  {r['seconds'] / old['seconds']:.2f}x time vs baseline"
+        print(line, flush=True)
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps({"version": __version__, "results": results}, indent=2)
+        )
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
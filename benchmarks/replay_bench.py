@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回放录制的真实流量，测量SDK（解码、校验、缓存等）在离线环境中的性能
+
+    # 录制：Client(..., record="traffic.jsonl.gz")，或者 client_bench.py --record
+    python benchmarks/replay_bench.py traffic.jsonl.gz                 # 按照录制时的耗时回放
+    python benchmarks/replay_bench.py traffic.jsonl.gz --speed 0 -j 1  # 不等待，只测量SDK开销
+    python benchmarks/replay_bench.py traffic.jsonl.gz -o new.json --compare old.json
+
+录制的请求按照原顺序通过 Client.verify_request 重新发起，响应由 ReplayTransport 返回。
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from alist_sdk import Client, __version__
+from alist_sdk.metrics import endpoint_of
+from alist_sdk.replay import ReplayTransport, load_records, iter_requests
+
+
+def run(records: list[dict], speed: float, jobs: int, trusted: bool) -> list[dict]:
+    client = Client(
+        "http://replay",
+        transport=ReplayTransport(records, speed=speed),
+        trusted_server=trusted,
+    )
+    stats = defaultdict(lambda: {"ops": 0, "errors": 0, "seconds": 0.0})
+    lock = threading.Lock()
+
+    def _request(req):
+        method, url, content = req
+        start = time.perf_counter()
+        res = client.verify_request(method, url, content=content or None)
+        seconds = time.perf_counter() - start
+        with lock:
+            s = stats[endpoint_of(url.split("?", 1)[0])]
+            s["ops"] += 1
+            s["seconds"] += seconds
+            s["errors"] += getattr(res, "code", 200) != 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(jobs) as pool:
+        list(pool.map(_request, iter_requests(records)))
+    total = time.perf_counter() - start
+    client.close()
+
+    results = [
+        {"endpoint": e, **s, "seconds": round(s["seconds"], 4)}
+        for e, s in sorted(stats.items(), key=lambda i: -i[1]["seconds"])
+    ]
+    ops = sum(s["ops"] for s in stats.values())
+    recorded = sum(r["elapsed"] for r in records)
+    results.append(
+        {
+            "endpoint": "TOTAL",
+            "ops": ops,
+            "errors": sum(s["errors"] for s in stats.values()),
+            "seconds": round(total, 4),
+            "recorded_seconds": round(recorded, 4),
+        }
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("file", help="录制文件")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="回放速度倍数，0为不等待"
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=10, help="并发数")
+    parser.add_argument("--trusted", action="store_true", help="trusted_server模式")
+    parser.add_argument("-o", "--output", help="保存结果的JSON文件")
+    parser.add_argument("--compare", help="对比的基准JSON文件")
+    args = parser.parse_args()
+
+    records = load_records(args.file)
+    results = run(records, args.speed, args.jobs, args.trusted)
+
+    baseline = {}
+    if args.compare:
+        for r in json.loads(Path(args.compare).read_text())["results"]:
+            baseline[r["endpoint"]] = r
+
+    print(f"{'endpoint':<40}{'ops':>8}{'errors':>8}{'seconds':>12}")
+    for r in results:
+        line = f"{r['endpoint']:<40}{r['ops']:>8}{r['errors']:>8}{r['seconds']:>12}"
+        if (old := baseline.get(r["endpoint"])) and old["seconds"]:
+            line += f"  {r['seconds'] / old['seconds']:.2f}x time vs baseline"
+        print(line)
+    print(f"录制时的请求总耗时: {results[-1]['recorded_seconds']}s")
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps(
+                {"version": __version__, "file": args.file, "results": results},
+                indent=2,
+            )
+        )
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -337,6 +337,30 @@ class TestSyncClient:
         assert isinstance(res.data, list)
         # assert isinstance(res.data[0], models.Task)
 
+    def test_wait_for_tasks(self):
+        DATA_DIR.joinpath("test_wait_for_tasks.txt").write_text("abc")
+        res = self.client.copy("/local", "/local_dst", "test_wait_for_tasks.txt")
+        assert res.code == 200, res.message
+        tasks = list(
+            self.client.wait_for_tasks(
+                res.data.tasks, "copy", timeout=30, poll_interval=0.5
+            )
+        )
+        assert {t.id for t in tasks} == {t.id for t in res.data.tasks}
+        assert all(t.state == 2 for t in tasks)
+        assert DATA_DIR_DST.joinpath("test_wait_for_tasks.txt").exists()
+
+    def test_task_bulk(self):
+        res = self.run(
+            self.client.task_delete_many, "copy", ["test_task_bulk_not_exists"]
+        )
+        assert isinstance(res, models.BulkTaskResult)
+        assert res.succeeded == []
+        assert "test_task_bulk_not_exists" in res.failed
+
+        res = self.run(self.client.task_delete_many, "copy", state=2)
+        assert res.failed == {}
+
     def test_storage_list(self):
         res = self.run(self.client.admin_storage_list)
         assert res.code == 200
@@ -346,6 +370,12 @@ class TestSyncClient:
 
         assert "/local" in [s.mount_path for s in res.data.content]
 
+    def test_probe_storages(self):
+        probes = self.run(self.client.probe_storages, timeout=5)
+        local = [p for p in probes if p.mount_path == "/local"][0]
+        assert local.ok and local.latency is not None
+        assert probes == Client.sort_probes(probes)
+
     def test_storage_create(self):
         """测试创建存储器"""
         import time
@@ -414,3 +444,22 @@ class TestAsyncClient(TestSyncClient):
 
     def test_login_user(self):
         assert asyncio.run(self.client.login_username) == "admin"
+
+    def test_wait_for_tasks(self):
+        DATA_DIR.joinpath("test_wait_for_tasks.txt").write_text("abc")
+
+        async def _copy_and_wait():
+            client = self.client
+            res = await client.copy("/local", "/local_dst", "test_wait_for_tasks.txt")
+            assert res.code == 200, res.message
+            tasks = [
+                t
+                async for t in client.wait_for_tasks(
+                    res.data.tasks, "copy", timeout=30, poll_interval=0.5
+                )
+            ]
+            return res.data.tasks, tasks
+
+        created, tasks = asyncio.run(_copy_and_wait())
+        assert {t.id for t in tasks} == {t.id for t in created}
+        assert DATA_DIR_DST.joinpath("test_wait_for_tasks.txt").exists()
@@ -6,6 +6,7 @@ import pytest
 
 from alist_sdk.models import *
 from alist_sdk import models
+from alist_sdk.verify import decode_resp
 
 MODEL_SIMPLE = Path(__file__).parent.joinpath("models_simple")
 
@@ -78,3 +79,18 @@ class TestModel:
                 _resp.data[0] if isinstance(_resp.data, list) else _resp.data,
                 getattr(models, model),
             ), "Model 验证失败~"
+
+    @pytest.mark.parametrize(
+        "url, model, resp",
+        json.loads(MODEL_SIMPLE.joinpath("Resps.json").read_text()),
+        ids=lambda x: x if isinstance(x, str) else "",
+    )
+    def test_resp_trusted(self, url, model, resp):
+        _full = decode_resp(url, resp, trusted=False)
+        _trusted = decode_resp(url, resp, trusted=True)
+        assert _trusted.model_dump() == _full.model_dump()
+        if _trusted.code == 200 and _trusted.data:
+            assert isinstance(
+                _trusted.data[0] if isinstance(_trusted.data, list) else _trusted.data,
+                getattr(models, model),
+            ), "Model 验证失败~"
@@ -118,6 +118,19 @@ class TestAlistPath:
         DATA_DIR.joinpath("test_re_stat.txt").write_text("1234")
         assert path.re_stat().size == 4
 
+    def test_search(self):
+        DATA_DIR.joinpath("test_search").mkdir(exist_ok=True)
+        DATA_DIR.joinpath("test_search/a.mkv").write_text("123")
+        DATA_DIR.joinpath("test_search/sub").mkdir(exist_ok=True)
+        DATA_DIR.joinpath("test_search/sub/b.MKV").write_text("123")
+        DATA_DIR.joinpath("test_search/sub/c.txt").write_text("123")
+        path = AlistPath("http://localhost:5245/local/test_search")
+        res = {p.as_posix(): p.is_file() for p in path.search(".mkv", scope=2)}
+        assert res == {
+            "/local/test_search/a.mkv": True,
+            "/local/test_search/sub/b.MKV": True,
+        }
+
     def test_from_client(self):
         DATA_DIR.joinpath("test_from_client.txt").write_text("123")
         path = AlistPath.from_client(self.client, "/local/test_from_client.txt")
@@ -1,9 +1,1205 @@
-from alist_sdk.tools.models import Configs
+import gc
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from alist_sdk import Client, AsyncClient, AlistError, __version__
+
+from alist_sdk.models import Item, Resp, Task, StorageProbe
+from alist_sdk.tools.configs import (
+    import_configs_from_dict,
+    import_configs_from_jsonl,
+    export_configs_to_jsonl,
+    iter_configs_jsonl,
+    diff_configs,
+)
+from alist_sdk.tools.models import Configs, RetryPolicy
+from alist_sdk.tools.indexer import PathIndex
+from alist_sdk.tools.task_monitor import diff_tasks, TaskMonitor
+from alist_sdk.tools.task_retry import RetryController
+from alist_sdk.tools.mirror import diff_trees, collapse_missing_dirs, TreeMirror
+from alist_sdk.tools.usage import iter_usage, top_usage, render_tree
+from alist_sdk.tools.local_sync import (
+    scan_local,
+    download_url,
+    download_file,
+    _leaf_dirs,
+    DownloadSync,
+    UploadSync,
+)
+from alist_sdk.metrics import Metrics, endpoint_of
+from alist_sdk.tracing import Tracer, JsonLinesExporter, load_jsonl, render_spans
+from alist_sdk.replay import (
+    RecordingTransport,
+    ReplayTransport,
+    ReplayMiss,
+    load_records,
+    iter_requests,
+    decode_body,
+)
+from alist_sdk import profiling, alistpath
+from alist_sdk.cmd.session import SessionServer, request, is_forwardable
+
+MODEL_SIMPLE = Path(__file__).parent.joinpath("models_simple")
 
 
 def test_export():
     pass  # TODO
 
 
+class _RecordClient:
+    """记录请求顺序的客户端"""
+
+    def __init__(self):
+        self.calls = []
+
+    def verify_request(self, method, url, json=None):
+        self.calls.append((url, json))
+        return Resp(code=200, message="success", data=None)
+
+
 def test_import():
-    pass  # TODO
+    storage = {"id": 1, "mount_path": "/local", "driver": "Local"}
+    configs = {
+        "users": [{"id": 2, "username": "u"}],
+        "metas": [{"id": 3, "path": "/a"}],
+        "storages": [storage, {"id": 4, "mount_path": "/s3", "driver": "S3"}],
+        "settings": [{"key": "k", "value": "v"}],
+    }
+    client = _RecordClient()
+    result = import_configs_from_dict(client, configs)
+    urls = [c[0] for c in client.calls]
+    assert urls[:2] == ["/api/admin/setting/save", "/api/admin/storage/create"]
+    assert set(urls[2:]) == {"/api/admin/user/create", "/api/admin/meta/create"}
+    assert all("id" not in c[1] for c in client.calls[1:])
+    assert "id" in storage, "导入不应修改传入的配置"
+    assert [r.name for r in result.skipped] == ["/local"]
+    assert len(result.succeeded) == 4 and not result.failed
+
+
+def test_import_jsonl(tmp_path):
+    jsonl = tmp_path.joinpath("configs.jsonl")
+    rows = [
+        {"key": "settings", "data": {"key": "a", "value": "1"}},
+        {"key": "settings", "data": {"key": "b", "value": "2"}},
+        {"key": "storages", "data": {"id": 1, "mount_path": "/s1", "driver": "S3"}},
+        {"key": "storages", "data": {"id": 2, "mount_path": "/s2", "driver": "S3"}},
+        {"key": "metas", "data": {"id": 3, "path": "/a"}},
+        {"key": "users", "data": {"id": 4, "username": "u"}},
+    ]
+    jsonl.write_text("".join(json.dumps(r) + "\n" for r in rows))
+    progress = tmp_path.joinpath("configs.jsonl.progress")
+    progress.write_text(json.dumps({"line": 3}))
+
+    client = _RecordClient()
+    result = import_configs_from_jsonl(client, jsonl, batch_size=1)
+    assert [c[1].get("mount_path") for c in client.calls[:1]] == ["/s2"]
+    assert len(client.calls) == 3 and len(result.succeeded) == 3
+    assert not progress.exists()
+
+    client = _RecordClient()
+    import_configs_from_jsonl(client, jsonl)
+    assert client.calls[0] == (
+        "/api/admin/setting/save",
+        [{"key": "a", "value": "1"}, {"key": "b", "value": "2"}],
+    )
+
+
+def test_export_jsonl_paged(tmp_path):
+    storages = json.loads(MODEL_SIMPLE.joinpath("Storages.json").read_text())
+    user = {
+        "id": 1,
+        "username": "admin",
+        "password": "",
+        "base_path": "/",
+        "role": 2,
+        "disabled": False,
+        "permission": 0,
+        "sso_id": "",
+    }
+    lists = {"storage": storages, "user": [user], "meta": []}
+    requests = []
+
+    def handler(request: httpx.Request):
+        kind = request.url.path.split("/")[3]
+        if kind == "setting":
+            data = [
+                {
+                    "key": "k",
+                    "value": "v",
+                    "help": "",
+                    "type": "string",
+                    "options": "",
+                    "group": 1,
+                    "flag": 0,
+                }
+            ]
+        else:
+            page = int(request.url.params["page"])
+            per_page = int(request.url.params["per_page"])
+            requests.append((kind, page))
+            content = lists[kind][(page - 1) * per_page : page * per_page]
+            data = {"content": content, "total": len(lists[kind])}
+        return httpx.Response(
+            200, json={"code": 200, "message": "success", "data": data}
+        )
+
+    client = Client("http://localhost", transport=httpx.MockTransport(handler))
+    jsonl = tmp_path / "configs.jsonl"
+    assert export_configs_to_jsonl(client, jsonl, per_page=2) == 7
+    assert requests == [
+        ("storage", 1),
+        ("storage", 2),
+        ("storage", 3),
+        ("meta", 1),
+        ("user", 1),
+    ]
+    rows = list(iter_configs_jsonl(jsonl))
+    assert [key for _, key, _ in rows] == ["settings"] + ["storages"] * 5 + ["users"]
+    assert [d["mount_path"] for _, k, d in rows if k == "storages"] == [
+        s["mount_path"] for s in storages
+    ]
+
+
+def test_import_jsonl_bad_lines(tmp_path):
+    jsonl = tmp_path / "configs.jsonl"
+    jsonl.write_text(
+        '{"key": "plugins", "data": {}}\n{"key": "users", "data": {"username": "u"}}\n'
+    )
+    client = _RecordClient()
+    result = import_configs_from_jsonl(client, jsonl)
+    assert [(r.name, r.message) for r in result.skipped] == [
+        ("line 1", "未知的配置类型")
+    ]
+    assert len(result.succeeded) == 1
+
+    jsonl.write_text('{"key": "users", "data": {}}\n{"data": {}}\n')
+    with pytest.raises(ValueError, match="configs.jsonl:2"):
+        import_configs_from_jsonl(_RecordClient(), jsonl)
+
+
+def test_diff_configs():
+    storages = json.loads(MODEL_SIMPLE.joinpath("Storages.json").read_text())
+    storage = dict(storages[0], driver="S3")
+    meta = dict(
+        id=1,
+        path="/a",
+        password="",
+        p_sub=False,
+        write=False,
+        w_sub=False,
+        hide="",
+        h_sub=False,
+        readme="",
+        r_sub=False,
+        header="",
+        header_sub=False,
+    )
+    source = Configs(
+        storages=[dict(storage, id=1, remark="new")], metas=[dict(meta, id=1)]
+    )
+    target = Configs(
+        storages=[dict(storage, id=9, status="work")],
+        metas=[dict(meta, id=2, path="/b")],
+    )
+    changes = {(c.key, c.action, c.name): c for c in diff_configs(source, target)}
+    assert changes.keys() == {
+        ("storages", "update", storage["mount_path"]),
+        ("metas", "create", "/a"),
+    }
+    assert changes["storages", "update", storage["mount_path"]].target_id == 9
+
+    changes = diff_configs(source, target, delete=True)
+    assert [(c.action, c.target_id) for c in changes if c.name == "/b"] == [
+        ("delete", 2)
+    ]
+    assert diff_configs(source, source) == []
+
+
+class TestPathIndex:
+    server = "http://localhost:5245"
+
+    def setup_method(self):
+        items = json.loads(MODEL_SIMPLE.joinpath("Items.json").read_text())
+        self.index = PathIndex()
+        self.index._replace_children(
+            self.server,
+            "/",
+            [Item(**dict(items[0], name="media", is_dir=True))],
+        )
+        self.index._replace_children(
+            self.server,
+            "/media",
+            [
+                Item(**dict(items[0], name="Movie_1.MKV", is_dir=False)),
+                Item(**dict(items[0], name="sub", is_dir=True)),
+            ],
+        )
+        self.index._replace_children(
+            self.server,
+            "/media/sub",
+            [Item(**dict(items[0], name="movie_2.mkv", is_dir=False))],
+        )
+
+    def teardown_method(self):
+        self.index.close()
+
+    def test_find(self):
+        assert [r.path for r in self.index.find("movie", scope=2)] == [
+            "/media/Movie_1.MKV",
+            "/media/sub/movie_2.mkv",
+        ]
+        assert [r.path for r in self.index.find("e_1")] == ["/media/Movie_1.MKV"]
+        assert [r.uri for r in self.index.find("sub", scope=1)] == [
+            "http://localhost:5245/media/sub"
+        ]
+
+    def test_glob(self):
+        assert [r.path for r in self.index.glob("/media/sub/*.mkv")] == [
+            "/media/sub/movie_2.mkv"
+        ]
+
+    def test_remove_dir(self):
+        self.index._replace_children(self.server, "/media", [])
+        assert [r.path for r in self.index.find("")] == ["/media"]
+
+    def test_update_retry_failed(self):
+        tree = {
+            "/m": [{"name": "a", "is_dir": True}],
+            "/m/a": [{"name": "b", "is_dir": True}],
+            "/m/a/b": [{"name": "c", "is_dir": True}],
+            "/m/a/b/c": [{"name": "f.mkv", "is_dir": False}],
+        }
+        listed = []
+        handler = _tree_handler(tree)
+
+        def _handler(request: httpx.Request):
+            listed.append(json.loads(request.content)["path"])
+            return handler(request)
+
+        client = Client("http://localhost", transport=httpx.MockTransport(_handler))
+        dir_b = tree.pop("/m/a/b")  # 第2层的目录列出失败
+        result = self.index.update(client, "/m")
+        assert result.failed == 1 and "/m/a/b" in listed
+        assert list(self.index.find("f.mkv")) == []
+
+        tree["/m/a/b"] = dir_b
+        listed.clear()
+        result = self.index.update(client, "/m")
+        assert result.failed == 0
+        assert listed == ["/m", "/m/a", "/m/a/b", "/m/a/b/c"]
+        assert [r.path for r in self.index.find("f.mkv")] == ["/m/a/b/c/f.mkv"]
+
+        # 全部成功后恢复增量更新
+        listed.clear()
+        self.index.update(client, "/m")
+        assert listed == ["/m"]
+
+
+def _task(task_id, state, progress=0, error=""):
+    return Task(
+        id=task_id,
+        name=f"copy {task_id}",
+        state=state,
+        status="",
+        progress=progress,
+        error=error,
+    )
+
+
+def test_diff_tasks():
+    prev_undone = {"a": _task("a", 1, 10), "b": _task("b", 1, 50)}
+    undone = {"a": _task("a", 1, 20), "c": _task("c", 0)}
+    done = {"old": _task("old", 2), "b": _task("b", 3, error="x"), "d": _task("d", 7)}
+
+    events = diff_tasks("copy", prev_undone, {"old"}, undone, done)
+    assert [(e.kind, e.task.id) for e in events] == [
+        ("progress", "a"),
+        ("started", "c"),
+        ("failed", "b"),
+        ("canceled", "d"),
+    ]
+    assert events[2].previous.progress == 50
+
+    # 没有请求done时只产出undone中的变化
+    events = diff_tasks("copy", prev_undone, {"old"}, undone, None)
+    assert [e.kind for e in events] == ["progress", "started"]
+
+
+def test_task_monitor_restart():
+    import threading
+    import time
+
+    calls = []
+    entered, release = threading.Event(), threading.Event()
+
+    def handler(request: httpx.Request):
+        action = request.url.path.rsplit("/", 1)[1]
+        if action == "undone":
+            calls.append(1)
+            if len(calls) == 1:  # 第一个线程停在第一轮的请求中
+                entered.set()
+                release.wait(5)
+            data = [
+                {
+                    "id": "a",
+                    "name": "a",
+                    "state": 1,
+                    "status": "",
+                    "progress": 0,
+                    "error": "",
+                }
+            ]
+        else:
+            data = []
+        return httpx.Response(
+            200, json={"code": 200, "message": "success", "data": data}
+        )
+
+    client = Client("http://localhost", transport=httpx.MockTransport(handler))
+    monitor = TaskMonitor(client, task_types=["copy"], interval=0.05)
+    events = []
+    unsubscribe = monitor.subscribe(events.append)
+    assert entered.wait(5)
+    old_state = monitor._state
+    unsubscribe()
+    unsubscribe = monitor.subscribe(events.append)
+    try:
+        for _ in range(100):
+            if events:
+                break
+            time.sleep(0.01)
+        new_state = monitor._state
+        release.set()
+        monitor.forget("x")  # 与轮询线程并发时不会出错
+        time.sleep(0.2)
+    finally:
+        unsubscribe()
+    monitor._thread.join(2)
+
+    # 旧线程只修改自己的状态，新的一轮没有重复的事件
+    assert new_state is not old_state and old_state.rounds == 1
+    assert [(e.kind, e.task.id) for e in events] == [("started", "a")]
+
+
+def test_retry_policy():
+    policy = RetryPolicy(
+        max_retries=2,
+        backoff=10,
+        max_backoff=30,
+        allow_errors=["timeout", "reset"],
+        deny_errors=["403"],
+    )
+    assert [policy.delay(i) for i in (1, 2, 3)] == [10, 20, 30]
+    assert policy.should_retry("read timeout", 0)
+    assert policy.should_retry("connection reset", 1)
+    assert not policy.should_retry("read timeout", 2)
+    assert not policy.should_retry("403 timeout", 0)
+    assert not policy.should_retry("no space left", 0)
+    assert RetryPolicy().should_retry("anything", 0)
+
+
+def test_diff_trees():
+    items = json.loads(MODEL_SIMPLE.joinpath("Items.json").read_text())
+    _dir = Item(**dict(items[0], is_dir=True))
+    _file = Item(**dict(items[0], is_dir=False, size=10))
+    src = {
+        "a": _dir,
+        "a/1.txt": _file,
+        "b": _dir,
+        "b/2.txt": _file,
+        "b/3.txt": _file.model_copy(update={"size": 11}),
+        "c": _dir,
+    }
+    dst = {
+        "b": _dir,
+        "b/2.txt": _file,
+        "b/3.txt": _file,
+        "b/x": _dir,
+        "b/x/4.txt": _file,
+        "c/5.txt": _file,
+    }
+    actions = diff_trees(src, dst, delete=True, protect={"c"})
+    assert [(a.action, a.path, a.reason) for a in actions] == [
+        ("mkdir", "a", "missing"),
+        ("copy", "a/1.txt", "missing"),
+        ("copy", "b/3.txt", "size"),
+        ("mkdir", "c", "missing"),
+        ("delete", "b/x", "extra"),
+    ]
+    assert [(a.action, a.path) for a in collapse_missing_dirs(actions)] == [
+        ("copy", "a"),
+        ("copy", "b/3.txt"),
+        ("copy", "c"),
+        ("delete", "b/x"),
+    ]
+
+
+def test_diff_trees_type_conflict():
+    items = json.loads(MODEL_SIMPLE.joinpath("Items.json").read_text())
+    _dir = Item(**dict(items[0], is_dir=True))
+    _file = Item(**dict(items[0], is_dir=False, size=10))
+    # a: 源是目录，目标是文件；b: 源是文件，目标是目录
+    src = {"a": _dir, "a/1.txt": _file, "b": _file}
+    dst = {"a": _file, "b": _dir, "b/2.txt": _file}
+    for delete in (False, True):
+        actions = diff_trees(src, dst, delete=delete)
+        assert [(a.action, a.path, a.reason) for a in actions] == [
+            ("delete", "a", "type"),
+            ("mkdir", "a", "type"),
+            ("copy", "a/1.txt", "missing"),
+            ("delete", "b", "type"),
+            ("copy", "b", "type"),
+        ]
+    assert [(a.action, a.path) for a in collapse_missing_dirs(actions)] == [
+        ("delete", "a"),
+        ("copy", "a"),
+        ("delete", "b"),
+        ("copy", "b"),
+    ]
+
+
+def _tree_handler(tree: dict[str, list[dict]], files: dict[str, bytes] = None):
+    """/api/fs/list 返回tree中的内容，GET /d/... 返回files中的内容"""
+    items = json.loads(MODEL_SIMPLE.joinpath("Items.json").read_text())
+
+    def handler(request: httpx.Request):
+        if request.url.path.startswith("/d/"):
+            return httpx.Response(200, content=files[request.url.path[2:]])
+        path = json.loads(request.content)["path"]
+        if path not in tree:
+            return httpx.Response(
+                200, json={"code": 500, "message": "not found", "data": None}
+            )
+        content = [dict(items[0], sign="", **i) for i in tree[path]]
+        data = {
+            "content": content,
+            "total": len(content),
+            "readme": "",
+            "write": True,
+            "provider": "Local",
+        }
+        return httpx.Response(
+            200, json={"code": 200, "message": "success", "data": data}
+        )
+
+    return handler
+
+
+def test_upload_sync(tmp_path):
+    import os
+    import urllib.parse
+
+    items = json.loads(MODEL_SIMPLE.joinpath("Items.json").read_text())
+    mtime = Item(**items[0]).modified.timestamp()
+    tree = {
+        "/r": [
+            {"name": "same.txt", "is_dir": False, "size": 4},
+            {"name": "changed.txt", "is_dir": False, "size": 3},
+            {"name": "extra.txt", "is_dir": False, "size": 1},
+            {"name": "old", "is_dir": True, "size": 0},
+            {"name": "sub", "is_dir": True, "size": 0},
+        ],
+        "/r/old": [{"name": "o.txt", "is_dir": False, "size": 1}],
+        "/r/sub": [{"name": "keep.txt", "is_dir": False, "size": 2}],
+    }
+    list_handler = _tree_handler(tree)
+    calls = []
+
+    def handler(request: httpx.Request):
+        if request.url.path == "/api/fs/list":
+            return list_handler(request)
+        if request.url.path == "/api/fs/put":
+            path = urllib.parse.unquote_plus(request.headers["File-Path"])
+            calls.append(("put", path, request.read()))
+        else:
+            calls.append(
+                (request.url.path.rsplit("/", 1)[1], json.loads(request.content))
+            )
+        return httpx.Response(
+            200, json={"code": 200, "message": "success", "data": None}
+        )
+
+    local = tmp_path / "local"
+    for rel, content in [
+        ("same.txt", b"abcd"),
+        ("changed.txt", b"12345"),
+        ("new.txt", b"n"),
+        ("sub/keep.txt", b"xy"),
+        ("sub/new2.txt", b"n2"),
+    ]:
+        local.joinpath(rel).parent.mkdir(parents=True, exist_ok=True)
+        local.joinpath(rel).write_bytes(content)
+        if rel in ("same.txt", "sub/keep.txt"):
+            os.utime(local / rel, (mtime, mtime))  # 与远程相同，不上传
+    local.joinpath("empty").mkdir()
+
+    client = Client("http://localhost", transport=httpx.MockTransport(handler))
+    result = UploadSync(client, local, "/r").run()
+    assert result.failed == {} and result.deleted == 0
+    assert result.copied == 3 and result.bytes == 8 and result.mkdirs == 1
+    assert sorted(c[1:] for c in calls if c[0] == "put") == [
+        ("/r/changed.txt", b"12345"),
+        ("/r/new.txt", b"n"),
+        ("/r/sub/new2.txt", b"n2"),
+    ]
+    assert [c for c in calls if c[0] != "put"] == [("mkdir", {"path": "/r/empty"})]
+
+    calls.clear()
+    result = UploadSync(client, local, "/r", delete=True).run()
+    assert result.deleted == 2 and result.copied == 3
+    # 多余的目录整体删除，不单独删除其中的文件
+    assert [c for c in calls if c[0] == "remove"] == [
+        ("remove", {"names": ["extra.txt", "old"], "dir": "/r"})
+    ]
+
+
+def test_download_sync_type_conflict(tmp_path):
+    tree = {
+        "/r": [
+            {"name": "a", "is_dir": True, "size": 0},
+            {"name": "b.txt", "is_dir": False, "size": 3},
+        ],
+        "/r/a": [{"name": "x.txt", "is_dir": False, "size": 2}],
+    }
+    files = {"/r/b.txt": b"bbb", "/r/a/x.txt": b"xx"}
+    client = Client(
+        "http://localhost", transport=httpx.MockTransport(_tree_handler(tree, files))
+    )
+    tmp_path.joinpath("a").write_text("file")  # 远程是目录
+    tmp_path.joinpath("b.txt/sub").mkdir(parents=True)  # 远程是文件
+
+    result = DownloadSync(client, "/r", tmp_path, check_mtime=False).run()
+    assert result.failed == {}
+    assert tmp_path.joinpath("a/x.txt").read_bytes() == b"xx"
+    assert tmp_path.joinpath("b.txt").read_bytes() == b"bbb"
+    assert DownloadSync(client, "/r", tmp_path, check_mtime=False).plan() == []
+
+
+def test_tree_mirror_server_copy_state(tmp_path):
+    tree = {
+        "/s": [{"name": "a", "is_dir": True}, {"name": "b", "is_dir": True}],
+        "/s/a": [{"name": "1.txt", "is_dir": False, "size": 1}],
+        "/s/b": [{"name": "2.txt", "is_dir": False, "size": 1}],
+        "/t": [
+            {"name": "a", "is_dir": True},
+            {"name": "b", "is_dir": True},
+            {"name": "c.txt", "is_dir": False},
+        ],
+        "/t/a": [],
+        "/t/b": [],
+    }
+    list_handler = _tree_handler(tree)
+
+    def _task(i, state, error=""):
+        return {
+            "id": i,
+            "name": i,
+            "state": state,
+            "status": "",
+            "progress": 100,
+            "error": error,
+        }
+
+    def handler(request: httpx.Request):
+        path = request.url.path
+        if path == "/api/fs/copy":
+            task_id = json.loads(request.content)["src_dir"]
+            data = {"tasks": [_task(task_id, 0)]}
+        elif path.endswith("/undone"):
+            data = []
+        elif path.endswith("/done"):
+            data = [_task("/s/a", 2), _task("/s/b", 7, "disk full")]
+        elif path == "/api/fs/remove":
+            data = None
+        else:
+            return list_handler(request)
+        return httpx.Response(
+            200, json={"code": 200, "message": "success", "data": data}
+        )
+
+    client = Client("http://localhost", transport=httpx.MockTransport(handler))
+    state = tmp_path / "state.txt"
+    result = TreeMirror(client, "/s", client, "/t", delete=True, state_file=state).run()
+    assert result.copied == 1 and result.deleted == 1
+    assert (
+        list(result.failed) == ["b/2.txt"] and "disk full" in result.failed["b/2.txt"]
+    )
+    assert [line.split("\t")[:2] for line in state.read_text().splitlines()] == [
+        ["copy", "a/1.txt"]
+    ]
+
+    # 再次运行时只跳过成功的复制，删除和失败的复制重新执行
+    result = TreeMirror(client, "/s", client, "/t", delete=True, state_file=state).run()
+    assert (
+        result.skipped == 1
+        and result.deleted == 1
+        and list(result.failed) == ["b/2.txt"]
+    )
+
+    result = TreeMirror(
+        client, "/s", client, "/t", state_file=tmp_path / "s2.txt", wait=False
+    ).run()
+    assert result.copied == 2 and result.tasks == ["/s/a", "/s/b"]
+    assert not tmp_path.joinpath("s2.txt").exists()
+
+
+def test_scan_local(tmp_path):
+    tmp_path.joinpath("a/b").mkdir(parents=True)
+    tmp_path.joinpath("a/1.txt").write_text("12345")
+    tmp_path.joinpath("empty").mkdir()
+    items = scan_local(tmp_path)
+    assert sorted(items) == ["a", "a/1.txt", "a/b", "empty"]
+    assert items["a/1.txt"].size == 5 and not items["a/1.txt"].is_dir
+
+    actions = diff_trees(items, {"a": items["a"]})
+    assert [a.path for a in _leaf_dirs(actions)] == ["a/b", "empty"]
+    assert diff_trees(items, scan_local(tmp_path)) == []
+    assert sorted(scan_local(tmp_path, max_depth=0)) == ["a", "empty"]
+
+
+def test_download_url():
+    assert download_url("/a b/c#.txt") == "/d/a%20b/c%23.txt"
+    assert download_url("/a/c.txt", "xx:0") == "/d/a/c.txt?sign=xx:0"
+
+
+def test_download_file_parts(tmp_path):
+    body = bytes(range(256)) * 100
+    ranges = []
+
+    def handler(request: httpx.Request):
+        start, end = map(int, request.headers["Range"][6:].split("-"))
+        ranges.append((start, end))
+        return httpx.Response(206, content=body[start : end + 1])
+
+    client = Client("http://localhost", transport=httpx.MockTransport(handler))
+    items = json.loads(MODEL_SIMPLE.joinpath("Items.json").read_text())
+    item = Item(**dict(items[0], is_dir=False, size=len(body), sign="s"))
+
+    local = tmp_path.joinpath("file.bin")
+    size = download_file(client, "/a/file.bin", local, item, parts=3, min_part_size=1)
+    assert size == len(body) and local.read_bytes() == body
+    assert sorted(ranges) == [(0, 8533), (8534, 17067), (17068, 25599)]
+    assert local.stat().st_mtime == item.modified.timestamp()
+    assert list(tmp_path.iterdir()) == [local]
+
+
+def _list_client(tree: dict[str, list[dict]], **kwargs) -> Client:
+    """/api/fs/list 返回tree中的内容，不在tree中的目录返回错误"""
+    items = json.loads(MODEL_SIMPLE.joinpath("Items.json").read_text())
+
+    def handler(request: httpx.Request):
+        body = json.loads(request.content)
+        path = body["path"]
+        if path not in tree:
+            return httpx.Response(
+                200, json={"code": 500, "message": "failed", "data": None}
+            )
+        content = [dict(items[0], **i) for i in tree[path]]
+        if per_page := body.get("per_page"):
+            start = (body["page"] - 1) * per_page
+            page = content[start : start + per_page]
+        else:
+            page = content
+        return httpx.Response(
+            200,
+            json={
+                "code": 200,
+                "message": "success",
+                "data": {
+                    "content": page,
+                    "total": len(content),
+                    "readme": "",
+                    "write": True,
+                    "provider": "Local",
+                },
+            },
+        )
+
+    return Client("http://localhost", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_iter_usage():
+    client = _list_client(
+        {
+            "/r": [
+                {"name": "a.txt", "is_dir": False, "size": 10},
+                {"name": "sub", "is_dir": True},
+                {"name": "big", "is_dir": True},
+            ],
+            "/r/sub": [
+                {"name": "b.txt", "is_dir": False, "size": 5},
+                {"name": "fail", "is_dir": True},
+            ],
+            "/r/big": [{"name": "c.txt", "is_dir": False, "size": 100}],
+        }
+    )
+    usages = list(iter_usage(client, "/r", max_workers=2))
+    assert usages[-1].path == "/r"
+    assert {u.path: (u.size, u.files, u.dirs, u.incomplete) for u in usages} == {
+        "/r": (115, 3, 3, True),
+        "/r/sub": (5, 1, 1, True),
+        "/r/sub/fail": (0, 0, 0, True),
+        "/r/big": (100, 1, 0, False),
+    }
+    index = [u.path for u in usages]
+    assert index.index("/r/sub/fail") < index.index("/r/sub")
+
+    assert [u.path for u in top_usage(usages, 2, max_depth=1)] == ["/r/big", "/r/sub"]
+    assert list(render_tree(usages, max_depth=1)) == [
+        "/r [115, 3 files] [incomplete]",
+        "├── big [100, 1 files]",
+        "└── sub [5, 1 files] [incomplete]",
+    ]
+
+
+def _task_client(rounds: list[tuple[list[str], list[str]]], client_class=Client):
+    """第i次请求undone时返回rounds[i]的 (undone, done)，之后一直返回最后一项"""
+    calls = []
+
+    def _task(i, state):
+        return {
+            "id": i,
+            "name": i,
+            "state": state,
+            "status": "",
+            "progress": 0,
+            "error": "",
+        }
+
+    def handler(request: httpx.Request):
+        action = request.url.path.rsplit("/", 1)[1]
+        if action == "undone":
+            calls.append(1)
+        undone, done = rounds[min(len(calls), len(rounds)) - 1]
+        tasks = (
+            [_task(i, 1) for i in undone]
+            if action == "undone"
+            else [_task(i, 2) for i in done]
+        )
+        return httpx.Response(
+            200, json={"code": 200, "message": "success", "data": tasks}
+        )
+
+    return client_class("http://localhost", transport=httpx.MockTransport(handler))
+
+
+def test_wait_for_tasks_missing():
+    import asyncio
+
+    rounds = [(["a"], []), ([], ["a"])]  # b 从未出现，例如已被 clear_done 清除
+    client = _task_client(rounds)
+    finished = []
+    with pytest.raises(AlistError, match="b"):
+        for t in client.wait_for_tasks(["a", "b"], "copy", poll_interval=0):
+            finished.append(t.id)
+    assert finished == ["a"]
+
+    async def _wait():
+        res = []
+        async for t in _task_client(rounds, AsyncClient).wait_for_tasks(
+            ["a", "b"], "copy", poll_interval=0, max_missing=2
+        ):
+            res.append(t.id)
+        return res
+
+    with pytest.raises(AlistError, match="b"):
+        asyncio.run(_wait())
+
+    # 任务完成前短暂不存在时继续等待
+    rounds = [(["a"], []), ([], []), (["a"], []), ([], ["a"])]
+    tasks = _task_client(rounds).wait_for_tasks(["a"], "copy", poll_interval=0)
+    assert [t.id for t in tasks] == ["a"]
+
+
+def test_cp_wait_copy_tasks_timeout():
+    from alist_sdk.cmd.fs import _wait_copy_tasks
+
+    rounds = [(["a", "b"], []), (["b"], ["a"])]  # b 一直未完成
+    client = _task_client(rounds)
+    assert _wait_copy_tasks(client, ["a", "b"], timeout=0.5) == 1
+    assert _wait_copy_tasks(_task_client([([], ["a"])]), ["a"]) == 0
+
+
+def test_cp_exists_without_retry(tmp_path):
+    import time
+    from alist_sdk import AlistPath
+    from alist_sdk.cmd.fs import _exists
+    from alist_sdk.path_lib import ALIST_SERVER_INFO, login_server
+
+    raw = json.loads(MODEL_SIMPLE.joinpath("RawItems.json").read_text())[0]
+    requests = []
+
+    def handler(request: httpx.Request):
+        path = json.loads(request.content)["path"]
+        requests.append(path)
+        if path != "/d":
+            return httpx.Response(
+                200, json={"code": 500, "message": "object not found", "data": None}
+            )
+        data = dict(raw, name="d", is_dir=True)
+        return httpx.Response(
+            200, json={"code": 200, "message": "success", "data": data}
+        )
+
+    client = Client("http://cp-exists:5244", transport=httpx.MockTransport(handler))
+    login_server(client)
+    try:
+        start = time.perf_counter()
+        assert not _exists(AlistPath("http://cp-exists:5244/new"))
+        assert time.perf_counter() - start < 0.5  # 不会重试等待
+        path = AlistPath("http://cp-exists:5244/d")
+        assert _exists(path) and path.is_dir()
+        assert requests == ["/new", "/d"]  # is_dir使用缓存的结果
+        assert _exists(tmp_path) and not _exists(tmp_path / "x")
+    finally:
+        ALIST_SERVER_INFO.pop(client.server_info, None)
+
+
+def test_du_tree_reject_local_path(tmp_path, capsys):
+    import typer
+    from alist_sdk.cmd.fs import du, tree
+
+    for command in (du, tree):
+        with pytest.raises(typer.Exit):
+            command(str(tmp_path), max_depth=1, jobs=1)
+        assert "本地路径" in capsys.readouterr().err
+
+
+def test_save_config_keeps_stdout_clean(tmp_path, monkeypatch, capsys):
+    from alist_sdk.cmd import base
+
+    monkeypatch.setattr(base, "CONFIG_FILE_PATH", tmp_path / "alist_cli.json")
+    config = base.CmdConfig()
+    config.save_config(quiet=True)
+    assert capsys.readouterr() == ("", "")
+    config.save_config()
+    assert capsys.readouterr().out == ""
+    assert base.CmdConfig.load_config() == config
+    assert capsys.readouterr().out == ""
+
+
+def test_task_bulk_batches():
+    import asyncio
+
+    def _client(support_some: bool, client_class=Client):
+        requests = []
+
+        def handler(request: httpx.Request):
+            requests.append(request)
+            action = request.url.path.rsplit("/", 1)[1]
+            if action.endswith("_some"):
+                if not support_some:
+                    return httpx.Response(404, text="404 page not found")
+                ids = json.loads(request.content)
+                data = {i: "task not found" for i in ids if i.startswith("x")}
+                return httpx.Response(
+                    200, json={"code": 200, "message": "success", "data": data}
+                )
+            if request.url.params["tid"].startswith("x"):
+                return httpx.Response(
+                    200, json={"code": 500, "message": "task not found", "data": None}
+                )
+            return httpx.Response(
+                200, json={"code": 200, "message": "success", "data": None}
+            )
+
+        client = client_class(
+            "http://localhost", transport=httpx.MockTransport(handler)
+        )
+        return client, requests
+
+    ids = ["a", "b", "x1", "c", "x2"]
+    client, requests = _client(True)
+    res = client.task_bulk("cancel", "copy", ids, chunk_size=2)
+    assert res.succeeded == ["a", "b", "c"]
+    assert res.failed == {"x1": "task not found", "x2": "task not found"}
+    assert sorted(json.loads(r.content) for r in requests) == [
+        ["a", "b"],
+        ["x1", "c"],
+        ["x2"],
+    ]
+    assert {r.url.path for r in requests} == {"/api/admin/task/copy/cancel_some"}
+
+    client, requests = _client(False)
+    res = client.task_delete_many("copy", ids)
+    assert res.succeeded == ["a", "b", "c"] and list(res.failed) == ["x1", "x2"]
+    assert len(requests) == 1 + len(ids)
+
+    for support_some in (True, False):
+        client, _ = _client(support_some, AsyncClient)
+        res = asyncio.run(client.task_bulk("retry", "copy", ids, chunk_size=2))
+        assert res.succeeded == ["a", "b", "c"] and list(res.failed) == ["x1", "x2"]
+
+
+def test_retry_controller_stop_race():
+    import threading
+    import time
+
+    controller = RetryController(None, policies={}, monitor=object())
+    t = threading.Thread(target=controller._run, daemon=True)
+    with controller._cond:
+        t.start()
+        time.sleep(0.1)  # 线程已经通过了 while 检查，正在等待 _cond
+        controller.stop()
+    t.join(2)
+    assert not t.is_alive()
+
+
+def test_sort_probes():
+    def _probe(name, ok, latency):
+        return StorageProbe(
+            mount_path=name, driver="Local", status="work", ok=ok, latency=latency
+        )
+
+    probes = [
+        _probe("/ok_fast", True, 0.1),
+        _probe("/failed_fast", False, 0.2),
+        _probe("/timeout", False, None),
+        _probe("/ok_slow", True, 2.0),
+        _probe("/failed_slow", False, 1.0),
+    ]
+    assert [p.mount_path for p in Client.sort_probes(probes)] == [
+        "/timeout",
+        "/failed_slow",
+        "/failed_fast",
+        "/ok_slow",
+        "/ok_fast",
+    ]
+
+
+def test_probe_storages():
+    import asyncio
+
+    storages = json.loads(MODEL_SIMPLE.joinpath("Storages.json").read_text())[:3]
+    mount_paths = [s["mount_path"] for s in storages]
+    bodies = []
+
+    def handler(request: httpx.Request):
+        if request.url.path == "/api/admin/storage/list":
+            data = {"content": storages, "total": len(storages)}
+            return httpx.Response(
+                200, json={"code": 200, "message": "success", "data": data}
+            )
+        body = json.loads(request.content)
+        bodies.append(body)
+        if body["path"] == mount_paths[0]:
+            raise httpx.ConnectError("refused", request=request)
+        if body["path"] == mount_paths[1]:
+            raise httpx.ReadTimeout("timeout", request=request)
+        return httpx.Response(
+            200, json={"code": 500, "message": "failed", "data": None}
+        )
+
+    transport = httpx.MockTransport(handler)
+    for probes in (
+        Client("http://localhost", transport=transport).probe_storages(),
+        asyncio.run(
+            AsyncClient("http://localhost", transport=transport).probe_storages()
+        ),
+    ):
+        assert probes[0].mount_path == mount_paths[1]  # 只有超时排在最前
+        by_path = {p.mount_path: p for p in probes}
+        assert by_path[mount_paths[1]].latency is None
+        assert by_path[mount_paths[0]].latency is not None
+        assert by_path[mount_paths[0]].error.startswith("ConnectError")
+    assert all(b["refresh"] is True for b in bodies)
+
+
+def test_iter_files():
+    client = _list_client({"/d": [{"name": f"f{i}", "size": i} for i in range(25)]})
+    assert [i.name for i in client.iter_files("/d", per_page=10)] == [
+        f"f{i}" for i in range(25)
+    ]
+    assert len(list(client.iter_files("/d", per_page=0))) == 25
+    with pytest.raises(AlistError):
+        list(client.iter_files("/missing"))
+
+
+def test_metrics():
+    client = _list_client({"/metrics": []})
+    client.metrics = metrics = Metrics()
+    client.dict_files_items("/metrics", cache_empty=True)
+    client.dict_files_items("/metrics", cache_empty=True)  # 命中缓存，不发送请求
+    client.list_files("/missing")
+
+    assert metrics.requests == {("/api/fs/list", "POST", "200"): 2}
+    assert metrics.codes == {("/api/fs/list", 200): 1, ("/api/fs/list", 500): 1}
+    assert metrics.cache_hit_rate("dict_files_items") == 0.5
+    assert metrics.received["/api/fs/list"] > 0
+    assert [t[:2] for t in metrics.top()] == [("/api/fs/list", 2)]
+
+    text = metrics.render_prometheus()
+    assert (
+        'alist_sdk_requests_total{endpoint="/api/fs/list",method="POST",status="200"} 2'
+        in text
+    )
+    assert (
+        'alist_sdk_request_duration_seconds_bucket{endpoint="/api/fs/list",le="+Inf"} 2'
+        in text
+    )
+    assert (
+        'alist_sdk_cache_requests_total{cache="dict_files_items",result="hit"} 1'
+        in text
+    )
+    assert endpoint_of("/d/local/a.mp4") == "/d"
+    assert endpoint_of("/alist/api/fs/get") == "/api/fs/get"
+
+
+def test_tracing(tmp_path):
+    client = _list_client({"/d": []})
+    client.tracer = Tracer()
+    with client.tracer.span("job", name="test"):
+        client.list_files("/d")
+    with pytest.raises(ZeroDivisionError):
+        with client.tracer.span("fail"):
+            1 / 0
+
+    http, call, job, fail = client.tracer.exporter.spans
+    assert (http.name, call.name) == ("HTTP POST /api/fs/list", "Client.list_files")
+    assert http.parent_id == call.span_id and call.parent_id == job.span_id
+    assert http.trace_id == job.trace_id != fail.trace_id
+    assert http.attributes["status"] == 200
+    assert fail.error == "ZeroDivisionError: division by zero"
+
+    exporter = JsonLinesExporter(tmp_path / "spans.jsonl")
+    for span in client.tracer.exporter.spans:
+        exporter.export(span)
+    exporter.close()
+    lines = list(render_spans(load_jsonl(tmp_path / "spans.jsonl")))
+    assert lines[0].startswith("job ") and lines[0].endswith("name=test")
+    assert lines[1].startswith("└── Client.list_files ")
+    assert lines[2].startswith("    └── HTTP POST /api/fs/list ")
+    assert lines[3].startswith("fail ") and "ERROR ZeroDivisionError" in lines[3]
+
+
+def test_record_replay(tmp_path):
+    file = tmp_path / "traffic.jsonl.gz"
+    client = _list_client({"/d": [{"name": "a"}, {"name": "b"}]}, record=file)
+    client.list_files("/d")
+    client.list_files("/x")
+    client.close()
+
+    records = load_records(file)
+    assert [(r["method"], r["url"], r["status"]) for r in records] == [
+        ("POST", "/api/fs/list", 200),
+        ("POST", "/api/fs/list", 200),
+    ]
+    assert [json.loads(c)["path"] for _, _, c in iter_requests(records)] == [
+        "/d",
+        "/x",
+    ]
+
+    transport = ReplayTransport(records, speed=0)
+    replay = Client("http://other:5244", transport=transport)
+    assert [i.name for i in replay.list_files("/d").data.content] == ["a", "b"]
+    assert replay.list_files("/x").code == 500
+    with pytest.raises(ReplayMiss):
+        replay.get_item_info("/d")
+
+    records[0]["elapsed"] = 10
+    assert ReplayTransport(records, speed=1000).delay(records[0]) == 0.01
+
+
+def test_record_redact_and_flush(tmp_path):
+    def handler(request: httpx.Request):
+        data = {"token": "secret-token"} if "auth" in request.url.path else None
+        return httpx.Response(
+            200, json={"code": 200, "message": "success", "data": data}
+        )
+
+    file = tmp_path / "traffic.jsonl"
+    transport = RecordingTransport(httpx.MockTransport(handler), file)
+    client = httpx.Client(base_url="http://localhost", transport=transport)
+    client.post("/api/auth/login/hash", json={"password": "secret-password"})
+    client.get("/api/me")
+    client.post("/api/fs/list", json={"path": "/"})
+
+    # 未关闭时已经写入文件
+    records = load_records(file)
+    assert "secret" not in file.read_text()
+    assert [r["url"] for r in records] == [
+        "/api/auth/login/hash",
+        "/api/me",
+        "/api/fs/list",
+    ]
+    assert records[0]["sha1"] == "" and records[0]["request"]["redacted"] > 0
+    assert decode_body(records[1]["response"]) == b""
+    assert json.loads(decode_body(records[2]["request"])) == {"path": "/"}
+    client.close()
+
+    # gzip文件未close时，对象回收后同样可以读取
+    file = tmp_path / "traffic.jsonl.gz"
+    transport = RecordingTransport(httpx.MockTransport(handler), file)
+    httpx.Client(base_url="http://localhost", transport=transport).get("/api/me")
+    del transport
+    gc.collect()
+    assert [r["url"] for r in load_records(file)] == ["/api/me"]
+
+
+def test_profiling(tmp_path):
+    from alist_sdk.path_lib import PureAlistPath
+
+    splitroot = alistpath.splitroot
+    client = _list_client({"/d": [{"name": "a"}]})
+    profiler = profiling.enable(tmp_path / "prof.folded")
+    try:
+        client.list_files("/d")
+        assert PureAlistPath("http://localhost/d/a").name == "a"
+        assert profiling.enable() is profiler
+    finally:
+        assert profiling.disable() is profiler
+    assert alistpath.splitroot is splitroot
+    assert profiling.get_profiler() is None
+
+    stacks = set(profiler.calls)
+    assert {
+        ("Client.list_files", "semaphore"),
+        ("Client.list_files", "network"),
+        ("Client.list_files", "verify", "json"),
+        ("Client.list_files", "verify", "validate"),
+        ("path.parse", "path.splitroot"),
+    } <= stacks
+    summary = {
+        name: (calls, total, self_time)
+        for name, calls, total, self_time in profiler.summary()
+    }
+    calls, total, self_time = summary["Client.list_files"]
+    assert calls == 1 and 0 <= self_time <= total
+    assert "Client.list_files" in profiler.render_summary()
+
+    profiler.dump(tmp_path / "prof.folded")
+    for line in (tmp_path / "prof.folded").read_text().splitlines():
+        stack, us = line.rsplit(" ", 1)
+        assert tuple(stack.split(";")) in stacks and int(us) > 0
+
+
+def test_session_server(tmp_path):
+    import socket
+    import threading
+
+    tmp_path.joinpath("a.txt").write_text("abc")
+    server = SessionServer(tmp_path / "s.sock", idle_timeout=5)
+    t = threading.Thread(target=server.serve, daemon=True)
+    t.start()
+
+    def run(argv):
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(str(server.path))
+            msg = {"op": "run", "argv": argv, "cwd": str(tmp_path)}
+            sock.sendall(json.dumps({**msg, "version": __version__}).encode() + b"\n")
+            return [json.loads(line) for line in sock.makefile("rb")]
+
+    res = run(["fs", "ls", "."])
+    assert res[-1] == {"exit": 0}
+    assert "a.txt" in "".join(m.get("out", "") for m in res)
+    assert run(["fs", "ls", "--bogus"])[-1] == {"exit": 2}
+    assert run(["fs", "rm", "a.txt"]) == [{"reject": "command not allowed"}]
+    assert request("ping", server.path)["commands"] == 2
+
+    assert request("stop", server.path) == {"exit": 0}
+    t.join(5)
+    assert not server.path.exists()
+    assert is_forwardable(["fs", "ls", "/"]) and not is_forwardable(["fs", "cd"])